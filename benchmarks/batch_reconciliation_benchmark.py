@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Compares reconciliation of WorkLog objects with reconciliation of columnar batches
+by typed arrays and by NumPy (when it's installed).
+
+Run from the repository root:
+    python -m benchmarks.batch_reconciliation_benchmark
+"""
+
+from loguru import logger
+
+from j2toggl_core.reconciliation import WorkLogReconciler, reconcile_batches
+from j2toggl_core.worklog_batch import StringTable, WorkLogBatch, numpy
+
+from benchmarks.synthetic import make_mapping, make_worklog_pairs, measure, print_table
+
+SIZES = [10_000, 100_000, 300_000]
+
+
+def main():
+    logger.remove()
+
+    rows = []
+
+    for size in SIZES:
+        toggl_worklogs, tempo_worklogs = make_worklog_pairs(size)
+        second_ids = make_mapping(tempo_worklogs)
+
+        strings = StringTable()
+        toggl_batch = WorkLogBatch(strings)
+        toggl_batch.extend(toggl_worklogs)
+        tempo_batch = WorkLogBatch(strings)
+        tempo_batch.extend(tempo_worklogs)
+
+        objects = measure(lambda: WorkLogReconciler(tempo_worklogs).reconcile(toggl_worklogs, second_ids))
+        arrays = measure(lambda: reconcile_batches(toggl_batch, tempo_batch, second_ids, use_numpy=False))
+
+        row = ["{0:,}".format(size), "{0:.1f}".format(objects * 1000), "{0:.1f}".format(arrays * 1000)]
+
+        if numpy is not None:
+            vectorized = measure(lambda: reconcile_batches(toggl_batch, tempo_batch, second_ids, use_numpy=True))
+            row += ["{0:.1f}".format(vectorized * 1000), "{0:.1f}x".format(objects / vectorized)]
+        else:
+            row += ["-", "-"]
+
+        rows.append(row)
+
+    print_table(["Worklogs", "Objects, ms", "Arrays, ms", "NumPy, ms", "NumPy speedup"], rows)
+
+
+if __name__ == '__main__':
+    main()
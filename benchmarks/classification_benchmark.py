@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Measures classification of Toggl time entries into Jira keys and Tempo activities:
+the former hard-coded rules against the compiled rules with and without memoization.
+
+Run from the repository root:
+    python -m benchmarks.classification_benchmark
+"""
+
+import random
+import re
+
+from loguru import logger
+
+from j2toggl_core.classification_rules import ClassificationRules
+from j2toggl_core.configuration.rules_config import RulesConfig
+
+from benchmarks.synthetic import measure, print_table
+
+ENTRIES_COUNT = 100_000
+
+PROJECTS = ["Analysis", "BugFixing", "CodeReview", "Development", "Meetings", "Testing", "Support"]
+
+TEXTS = ["Development", "Code review fixes", "Investigation of failed tests", "Daily", "Planning"]
+
+_JIRA_KEY_RE = re.compile(r"\w+-\d+")
+
+
+def former_classify(project: str, tags: list, description: str) -> tuple:
+    # Toggl client code as it was before classification rules
+    key_tag = next((x for x in tags if x.startswith("key_")), None)
+
+    if key_tag is not None:
+        key = key_tag[key_tag.rfind('_') + 1:]
+        key, description = (key if _JIRA_KEY_RE.match(key) else None), description
+    else:
+        dot_index = description.find(".")
+        key = description[:dot_index] if dot_index >= 0 else None
+        if key is not None and _JIRA_KEY_RE.match(key):
+            description = description[dot_index + 1:].strip()
+        else:
+            key = None
+
+    if project in RulesConfig.DEFAULT_ACTIVITIES:
+        activity = RulesConfig.DEFAULT_ACTIVITIES[project]
+    else:
+        activity = "Other" if project is not None else None
+
+    return key, description, activity
+
+
+def make_entries(count: int, distinct_descriptions: bool, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+
+    entries = []
+    for i in range(count):
+        key = "TEST-{0}".format(rnd.randint(1, 500))
+        text = rnd.choice(TEXTS) if not distinct_descriptions else "{0} #{1}".format(rnd.choice(TEXTS), i)
+
+        # Every fifth entry keeps its key in tag
+        if rnd.random() < 0.2:
+            entries.append((rnd.choice(PROJECTS), ["key_" + key], text))
+        else:
+            entries.append((rnd.choice(PROJECTS), [], "{0}. {1}".format(key, text)))
+
+    return entries
+
+
+def main():
+    logger.remove()
+
+    rows = []
+    for name, distinct_descriptions in [("Repeated descriptions", False), ("Unique descriptions", True)]:
+        entries = make_entries(ENTRIES_COUNT, distinct_descriptions)
+        rules = ClassificationRules()
+
+        assert [former_classify(*x) for x in entries] == [rules.classify(x[0], tuple(x[1]), x[2]) for x in entries]
+
+        former = measure(lambda: [former_classify(*x) for x in entries])
+        compiled = measure(lambda: [rules._classify(x[0], tuple(x[1]), x[2]) for x in entries])
+
+        # Memoized rules start cold every run, as a new client does
+        def classify_memoized():
+            memoized_rules = ClassificationRules()
+            return [memoized_rules.classify(x[0], tuple(x[1]), x[2]) for x in entries]
+
+        memoized = measure(classify_memoized)
+
+        rows.append([name,
+                     "{0:,}".format(len(entries)),
+                     "{0:.0f}".format(former * 1000),
+                     "{0:.0f}".format(compiled * 1000),
+                     "{0:.0f}".format(memoized * 1000),
+                     "{0:,.0f}".format(len(entries) / memoized),
+                     "{0:.1f}x".format(former / memoized)])
+
+    print_table(["Entries", "Count", "Former, ms", "Rules, ms", "Memoized, ms", "Memoized, entries/s", "Speedup"],
+                rows)
+
+
+if __name__ == '__main__':
+    main()
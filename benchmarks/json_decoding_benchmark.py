@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compares decode time and peak memory of JSON backends on synthetic 5k-entry Toggl and Tempo pages.
+
+Run from the repository root:
+    python -m benchmarks.json_decoding_benchmark
+"""
+
+import json
+import tracemalloc
+
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+from j2toggl_core.utils import json_backend
+
+from benchmarks.synthetic import ACTIVITIES, measure, print_table
+
+ENTRIES_COUNT = 5_000
+
+
+def make_toggl_page(count: int) -> bytes:
+    start = datetime(2024, 1, 1, 9, 0)
+    data = [{
+        "id": 1_000_000 + i,
+        "pid": 100 + i % 10,
+        "project": ACTIVITIES[i % len(ACTIVITIES)],
+        "description": "TEST-{0}. Task description #{0}".format(i),
+        "start": (start + timedelta(minutes=15 * i)).isoformat() + "+03:00",
+        "end": (start + timedelta(minutes=15 * i + 15)).isoformat() + "+03:00",
+        "updated": (start + timedelta(minutes=15 * i + 15)).isoformat() + "+03:00",
+        "dur": 900_000,
+        "user": "User",
+        "use_stop": True,
+        "client": None,
+        "task": None,
+        "billable": None,
+        "is_billable": False,
+        "cur": None,
+        "tags": ["key_TEST-{0}".format(i)],
+    } for i in range(count)]
+
+    return json.dumps({"total_count": count, "per_page": count, "data": data}).encode("utf-8")
+
+
+def make_tempo_page(count: int) -> bytes:
+    start = datetime(2024, 1, 1, 9, 0)
+    results = [{
+        "self": "https://api.tempo.io/core/3/worklogs/{0}".format(5_000_000 + i),
+        "tempoWorklogId": 5_000_000 + i,
+        "jiraWorklogId": 6_000_000 + i,
+        "issue": {"self": "https://example.atlassian.net/rest/api/2/issue/TEST-{0}".format(i),
+                  "key": "TEST-{0}".format(i), "id": 10_000 + i},
+        "timeSpentSeconds": 900,
+        "billableSeconds": 900,
+        "startDate": (start + timedelta(minutes=15 * i)).strftime("%Y-%m-%d"),
+        "startTime": (start + timedelta(minutes=15 * i)).strftime("%H:%M:%S"),
+        "description": "Task description #{0}".format(i),
+        "createdAt": "2024-01-01T10:00:00Z",
+        "updatedAt": "2024-01-01T10:00:00Z",
+        "author": {"self": "https://example.atlassian.net/rest/api/2/user", "accountId": "account"},
+        "attributes": {"self": "https://api.tempo.io/core/3/worklogs/{0}/work-attribute-values".format(i),
+                       "values": [{"key": "_Activity_", "value": "Development"}]},
+    } for i in range(count)]
+
+    return json.dumps({"metadata": {"count": count, "offset": 0, "limit": count}, "results": results}).encode("utf-8")
+
+
+def measure_peak_memory(func) -> int:
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+
+    return peak
+
+
+def main():
+    logger.remove()
+
+    backends = [json_backend.STDLIB_BACKEND]
+    if json_backend.orjson is not None:
+        backends.append(json_backend.ORJSON_BACKEND)
+
+    pages = [("Toggl report", make_toggl_page(ENTRIES_COUNT)), ("Tempo worklogs", make_tempo_page(ENTRIES_COUNT))]
+
+    rows = []
+    for page_name, content in pages:
+        for backend in backends:
+            json_backend.select_backend(backend)
+
+            elapsed = measure(lambda: json_backend.loads(content), repeat=10)
+            peak = measure_peak_memory(lambda: json_backend.loads(content))
+
+            rows.append([page_name,
+                         "{0:.1f}".format(len(content) / 1024 / 1024),
+                         backend,
+                         "{0:.1f}".format(elapsed * 1000),
+                         "{0:.1f}".format(peak / 1024 / 1024)])
+
+    json_backend.select_backend()
+
+    print_table(["Page", "Size, MB", "Backend", "Decode, ms", "Peak memory, MB"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compares hash-indexed reconciliation with the former linear scan over Tempo worklogs.
+
+Run from the repository root:
+    python -m benchmarks.reconciliation_benchmark
+"""
+
+from loguru import logger
+
+from j2toggl_core.reconciliation import WorkLogReconciler
+from j2toggl_core.worklog_state import WorkLogState
+
+from benchmarks.synthetic import make_mapping, make_worklog_pairs, measure, print_table
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+# Linear scan is quadratic, so it isn't measured for the biggest sizes
+LINEAR_SCAN_LIMIT = 10_000
+
+
+def linear_scan(toggl_worklogs, tempo_worklogs, second_ids):
+    for toggl in toggl_worklogs:
+        second_id = second_ids.get(toggl.qualified_id)
+        if second_id is None:
+            toggl.state = WorkLogState.New
+            continue
+
+        tempo = next((x for x in tempo_worklogs if x.second_id == second_id), None)
+        if WorkLogReconciler.worklog_was_moved(toggl, tempo):
+            toggl.state = WorkLogState.Moved
+        elif WorkLogReconciler.worklog_was_updated(toggl, tempo):
+            toggl.state = WorkLogState.Updated
+        else:
+            toggl.state = WorkLogState.Synced
+
+
+def main():
+    logger.remove()
+
+    rows = []
+
+    for size in SIZES:
+        toggl_worklogs, tempo_worklogs = make_worklog_pairs(size)
+        second_ids = make_mapping(tempo_worklogs)
+
+        indexed = measure(lambda: WorkLogReconciler(tempo_worklogs).reconcile(toggl_worklogs, second_ids))
+
+        if size <= LINEAR_SCAN_LIMIT:
+            linear = measure(lambda: linear_scan(toggl_worklogs, tempo_worklogs, second_ids), repeat=1)
+            speedup = "{0:.1f}x".format(linear / indexed)
+            linear = "{0:.2f}".format(linear * 1000)
+        else:
+            linear = "-"
+            speedup = "-"
+
+        rows.append([size, linear, "{0:.2f}".format(indexed * 1000), speedup])
+
+    print_table(["worklogs", "linear, ms", "indexed, ms", "speedup"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Compares per-row and bulk lookup of Toggl -> Tempo mappings in SqliteStorage.
+
+Run from the repository root:
+    python -m benchmarks.storage_lookup_benchmark
+"""
+
+import tempfile
+
+from pathlib import Path
+
+from j2toggl_core.storage.sqlite_storage import SqliteStorage
+
+from benchmarks.synthetic import measure, print_table
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def fill_storage(storage: SqliteStorage, count: int):
+    storage._conn.executemany("INSERT INTO sync_key (master_key, second_key) VALUES (?, ?)",
+                              ((1_000_000 + i, 5_000_000 + i) for i in range(count)))
+    storage._conn.commit()
+
+
+def per_row_lookup(storage: SqliteStorage, master_ids: list):
+    return {master_id: storage.get_second_id(master_id) for master_id in master_ids}
+
+
+def main():
+    rows = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            storage = SqliteStorage(Path(directory).joinpath(f"benchmark-{size}.db"))
+            storage.open()
+            fill_storage(storage, size)
+
+            master_ids = [1_000_000 + i for i in range(size)]
+
+            per_row = measure(lambda: per_row_lookup(storage, master_ids))
+            bulk = measure(lambda: storage.get_second_ids(master_ids))
+
+            storage.close()
+
+            rows.append([size,
+                         "{0:.2f}".format(per_row * 1000),
+                         "{0:.2f}".format(bulk * 1000),
+                         "{0:.1f}x".format(per_row / bulk)])
+
+    print_table(["mappings", "per-row, ms", "bulk, ms", "speedup"], rows)
+
+
+if __name__ == '__main__':
+    main()
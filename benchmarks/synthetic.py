@@ -0,0 +1,79 @@
+import random
+import time
+
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from j2toggl_core.worklog import WorkLog
+
+WorkLogCollection = List[WorkLog]
+
+ACTIVITIES = ["Development", "Code Review", "Testing", "Design/Analysis", "Other"]
+
+
+def make_worklog_pairs(count: int, seed: int = 42) -> Tuple[WorkLogCollection, WorkLogCollection]:
+    """
+    Returns pair of Toggl and Tempo worklog collections with the realistic mix of states:
+    ~70% synced, ~10% updated, ~5% moved and ~15% new worklogs.
+    """
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1, 9, 0)
+
+    toggl_worklogs = []
+    tempo_worklogs = []
+
+    for i in range(count):
+        toggl = WorkLog()
+        toggl.master_id = 1_000_000 + i
+        toggl.key = "TEST-{0}".format(rnd.randint(1, max(count // 10, 1)))
+        toggl.project = "Development"
+        toggl.activity = rnd.choice(ACTIVITIES)
+        toggl.description = "Task description #{0}".format(i)
+        toggl.startTime = start + timedelta(minutes=15 * i)
+        toggl.duration = 15 * 60
+        toggl.endTime = toggl.startTime + timedelta(seconds=toggl.duration)
+        toggl.tags = []
+        toggl_worklogs.append(toggl)
+
+        dice = rnd.random()
+        if dice < 0.15:
+            continue
+
+        tempo = WorkLog()
+        tempo.master_id = None
+        tempo.second_id = 5_000_000 + i
+        tempo.key = toggl.key if dice >= 0.20 else "MOVED-{0}".format(i)
+        tempo.activity = toggl.activity
+        tempo.description = toggl.description if dice >= 0.30 else "Old description"
+        tempo.startTime = toggl.startTime
+        tempo.duration = toggl.duration
+        tempo.endTime = toggl.endTime
+        tempo_worklogs.append(tempo)
+
+    rnd.shuffle(tempo_worklogs)
+
+    return toggl_worklogs, tempo_worklogs
+
+
+def make_mapping(tempo_worklogs: WorkLogCollection) -> dict:
+    return {(None, tempo.second_id - 4_000_000): tempo.second_id for tempo in tempo_worklogs}
+
+
+def measure(func: Callable, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def print_table(header: List[str], rows: List[list]):
+    widths = [max(len(str(x)) for x in column) for column in zip(header, *rows)]
+    line = "  ".join("{{:>{0}}}".format(w) for w in widths)
+
+    print(line.format(*header))
+    for row in rows:
+        print(line.format(*row))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compares parsing of Toggl and Tempo report records by dateutil and by the fast-path timestamp parser.
+
+Run from the repository root:
+    python -m benchmarks.timestamp_parsing_benchmark
+"""
+
+from datetime import datetime, timedelta
+
+import dateutil.parser
+from loguru import logger
+
+from j2toggl_core.utils.timestamp_parser import parse_date_and_time, parse_timestamp
+
+from benchmarks.synthetic import measure, print_table
+
+RECORDS_COUNT = 100_000
+
+
+def make_records(count: int) -> (list, list):
+    start = datetime(2024, 1, 1, 9, 0)
+
+    toggl_records = []
+    tempo_records = []
+    for i in range(count):
+        started_at = start + timedelta(minutes=15 * i)
+        ended_at = started_at + timedelta(minutes=15)
+
+        toggl_records.append({
+            "start": started_at.isoformat() + "+03:00",
+            "end": ended_at.isoformat() + "+03:00",
+        })
+        tempo_records.append({
+            "startDate": started_at.strftime("%Y-%m-%d"),
+            "startTime": started_at.strftime("%H:%M:%S"),
+        })
+
+    return toggl_records, tempo_records
+
+
+def main():
+    logger.remove()
+
+    toggl_records, tempo_records = make_records(RECORDS_COUNT)
+
+    cases = [
+        ("Toggl start/end", toggl_records,
+         lambda tr: (dateutil.parser.parse(tr["start"]), dateutil.parser.parse(tr["end"])),
+         lambda tr: (parse_timestamp(tr["start"]), parse_timestamp(tr["end"]))),
+        ("Tempo startDate+startTime", tempo_records,
+         lambda tr: dateutil.parser.parse(tr["startDate"] + "T" + tr["startTime"]),
+         lambda tr: parse_date_and_time(tr["startDate"], tr["startTime"])),
+    ]
+
+    rows = []
+    for name, records, slow_parse, fast_parse in cases:
+        assert [slow_parse(x) for x in records[:100]] == [fast_parse(x) for x in records[:100]]
+
+        slow = measure(lambda: [slow_parse(x) for x in records], repeat=1)
+        fast = measure(lambda: [fast_parse(x) for x in records])
+
+        rows.append([name,
+                     "{0:,}".format(len(records)),
+                     "{0:.0f}".format(slow * 1000),
+                     "{0:.0f}".format(fast * 1000),
+                     "{0:.1f}x".format(slow / fast)])
+
+    print_table(["Records", "Count", "dateutil, ms", "Fast path, ms", "Speedup"], rows)
+
+
+if __name__ == '__main__':
+    main()
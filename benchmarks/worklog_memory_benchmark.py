@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Measures memory of worklogs by tracemalloc: the former dictionary-based WorkLog against the slotted one.
+
+Run from the repository root:
+    python -m benchmarks.worklog_memory_benchmark
+"""
+
+import gc
+import tracemalloc
+
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+from benchmarks.synthetic import ACTIVITIES, print_table
+
+SIZES = [10_000, 100_000, 300_000]
+
+PROJECTS = ["Analysis", "BugFixing", "CodeReview", "Development", "Meetings", "Testing"]
+
+
+class DictWorkLog:
+    # WorkLog with instance dictionary as it was before slots
+    def __init__(self):
+        self.state = WorkLogState.Unknown
+
+        self.workspace_id = None
+        self.master_id = None
+        self.second_id = None
+        self.key = None
+        self.activity = None
+
+        self.project = None
+        self.description = None
+        self.startTime = None
+        self.endTime = None
+        self.duration = None
+        self.tags = None
+
+        self.tooltip = None
+
+
+def make_worklogs(worklog_class, count: int) -> list:
+    start = datetime(2024, 1, 1, 9, 0)
+    worklogs = []
+
+    for i in range(count):
+        wl = worklog_class()
+        wl.master_id = 1_000_000 + i
+        wl.second_id = 5_000_000 + i
+        wl.key = "TEST-{0}".format(i % 1000)
+        # Values come from parsed JSON, so every record has its own string objects
+        wl.project = (PROJECTS[i % len(PROJECTS)] + " ")[:-1]
+        wl.activity = (ACTIVITIES[i % len(ACTIVITIES)] + " ")[:-1]
+        wl.description = "Task description #{0}".format(i)
+        wl.startTime = start + timedelta(minutes=15 * i)
+        wl.duration = 15 * 60
+        wl.endTime = wl.startTime + timedelta(seconds=wl.duration)
+        wl.tags = []
+        worklogs.append(wl)
+
+    return worklogs
+
+
+def measure_memory(worklog_class, count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        worklogs = make_worklogs(worklog_class, count)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del worklogs
+
+    return current
+
+
+def main():
+    logger.remove()
+
+    rows = []
+    for size in SIZES:
+        dict_size = measure_memory(DictWorkLog, size)
+        slots_size = measure_memory(WorkLog, size)
+
+        rows.append(["{0:,}".format(size),
+                     "{0:.1f}".format(dict_size / 1024 / 1024),
+                     "{0:.1f}".format(slots_size / 1024 / 1024),
+                     "{0:.0f}".format(dict_size / size),
+                     "{0:.0f}".format(slots_size / size),
+                     "{0:.1f}x".format(dict_size / slots_size)])
+
+    print_table(["Worklogs", "Dict, MB", "Slots, MB", "Dict, B/wl", "Slots, B/wl", "Saving"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import aiohttp
+
+from http import HTTPStatus
+from loguru import logger
+from typing import List, Optional
+
+from j2toggl_core.configuration.jira_config import JiraConfig
+from j2toggl_core.domain.jira_issue import JiraIssue
+from j2toggl_core.jira_api_client import JiraUser
+from j2toggl_core.utils import json_backend
+
+
+class AsyncJiraClient:
+    _jql_separator = ","
+
+    def __init__(self, config: JiraConfig, session: aiohttp.ClientSession):
+        self.__config = config
+        self.__auth = aiohttp.BasicAuth(config.user, config.token)
+        self._session = session
+        self._user: Optional[JiraUser] = None
+
+    async def login(self) -> bool:
+        if self._user is not None:
+            return True
+
+        # Basic Authentication with JIRA token
+        method_uri = self.__make_api_uri("myself")
+
+        async with self._session.get(method_uri, auth=self.__auth) as r:
+            if r.status != HTTPStatus.OK:
+                logger.error("{0}: status {1}, error {2}".format("Basic Authentication", r.status, await r.text()))
+                return False
+
+            self._user = JiraUser.parse(json_backend.loads(await r.read()))
+
+        return True
+
+    @property
+    def user(self) -> Optional[JiraUser]:
+        return self._user
+
+    async def search_issue(self, key: str) -> Optional[JiraIssue]:
+        method_uri = self.__make_api_uri("issue/{0}".format(key))
+        logger.debug("{0}: Request method: {1}".format("search_issue", method_uri))
+
+        async with self._session.get(method_uri, auth=self.__auth) as r:
+            if r.status != HTTPStatus.OK:
+                logger.error("{0}: status {1}, error {2}".format("search_issue", r.status, await r.text()))
+                return None
+
+            return JiraIssue.parse(json_backend.loads(await r.read()))
+
+    async def search_issues(self, keys) -> Optional[List[JiraIssue]]:
+        method_uri = self.__make_api_uri("search")
+        keys_str = self._jql_separator.join(keys)
+        body = dict(
+            jql=u"key IN (" + keys_str + ")",
+            fields=[
+                "key",
+                "summary",
+                "self"
+            ])
+
+        async with self._session.post(method_uri, json=body, auth=self.__auth) as r:
+            if r.status != HTTPStatus.OK:
+                logger.error("{0}: status {1}, error {2}".format("search_issues", r.status, await r.text()))
+                return None
+
+            search_result = json_backend.loads(await r.read())
+
+        return [JiraIssue.parse(issue) for issue in search_result["issues"]]
+
+    def __make_api_uri(self, relative_url: str):
+        return "{0}/rest/api/3/{1}".format(self.__config.host, relative_url)
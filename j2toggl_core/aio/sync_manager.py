@@ -0,0 +1,173 @@
+import aiohttp
+import asyncio
+import copy
+
+from datetime import date
+from loguru import logger
+from typing import Callable, List
+
+from j2toggl_core.aio.tempo_api_client import AsyncTempoClient
+from j2toggl_core.aio.toggl_api_client import AsyncTogglClient, create_async_toggl_client
+from j2toggl_core.configuration.config import Config
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.push_result import PushResult
+from j2toggl_core.storage.sqlite_storage import SqliteStorage
+from j2toggl_core.storage.storage import StorageBase
+from j2toggl_core.sync_bookkeeping import SyncBookkeeping
+from j2toggl_core.tempo_mirror import TempoMirror
+from j2toggl_core.utils.datetime_utils import date2datetime
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+WorkLogCollection = List[WorkLog]
+
+
+class AsyncSyncManager:
+    """
+    Headless asyncio counterpart of SyncManager: all requests are driven by one event loop.
+    Storage is changed by SyncBookkeeping like by SyncManager, so both keep the same journal, mappings and mirror.
+    Tempo worklogs are always reloaded completely, because plans aren't cached between runs.
+    """
+
+    # See SyncManager.STORAGE_COMMIT_CHUNK_SIZE
+    STORAGE_COMMIT_CHUNK_SIZE = 50
+
+    def __init__(self, config: Config, storage: StorageBase = None, on_status: Callable[[str], None] = None):
+        self.config = config
+        self.storage = storage if storage is not None else SqliteStorage()
+        self._on_status = on_status
+
+        self.worklogs: WorkLogCollection = []
+
+    def run(self, start_date: date, end_date: date, only_load: bool = False) -> bool:
+        return asyncio.run(self.sync(start_date, end_date, only_load))
+
+    async def sync(self, start_date: date, end_date: date, only_load: bool = False) -> bool:
+        connector = aiohttp.TCPConnector(limit=self.config.network.max_concurrency
+                                         + 2 * AsyncTogglClient._MAX_CONCURRENT_PAGES)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            toggl_client = create_async_toggl_client(self.config.toggl, session)
+            tempo_client = AsyncTempoClient(self.config.jira, self.config.tempo, session)
+
+            toggl_logged_in, tempo_logged_in = await asyncio.gather(toggl_client.login(), tempo_client.login())
+            if not toggl_logged_in:
+                self._change_status("Sorry, Toggl authentication failed. Please check log for more details.")
+                return False
+            if not tempo_logged_in:
+                self._change_status("Sorry, JIRA authentication failed. Please check log for more details.")
+                return False
+
+            start_datetime = date2datetime(start_date)
+            end_datetime = date2datetime(end_date)
+
+            self.storage.open()
+
+            try:
+                # See SyncManager._run
+                if toggl_client.primary_workspace_id is not None:
+                    self.storage.assign_unknown_workspace(toggl_client.primary_workspace_id)
+
+                tempo_mirror = TempoMirror(tempo_client, self.storage)
+                tempo_load = tempo_mirror.begin_load(start_datetime, end_datetime, full_reload=True)
+                bookkeeping = SyncBookkeeping(self.storage, tempo_mirror)
+
+                self._change_status("Load worklogs from Tempo and Toggl...")
+                worklogs_from_tempo, worklogs_from_toggl = await asyncio.gather(
+                    tempo_client.get_worklogs(start_datetime, end_datetime),
+                    toggl_client.get_detailed_report(start_datetime, end_datetime))
+                worklogs_from_tempo = tempo_mirror.complete_load(tempo_load, worklogs_from_tempo)
+
+                reconciler = bookkeeping.create_reconciler(worklogs_from_tempo)
+                resumed_count = bookkeeping.resume_journal(reconciler, start_date, end_date)
+                if resumed_count:
+                    self._change_status(f"Reconciled {resumed_count} operation(s) interrupted last time.")
+
+                bookkeeping.reconcile(reconciler, worklogs_from_toggl)
+                self.worklogs = worklogs_from_toggl
+
+                if only_load:
+                    self._change_status("Load completed.")
+                    return True
+
+                await self._sync_impl(tempo_client, bookkeeping, worklogs_from_toggl)
+            except SyncException as sync_exception:
+                error_message = f"Sync error occurred: {sync_exception.message}."
+                logger.error(error_message)
+                self._change_status(error_message)
+                return False
+            except aiohttp.ClientError as e:
+                error_message = f"Sync error occurred: {e}."
+                logger.error(error_message)
+                self._change_status(error_message)
+                return False
+            finally:
+                self.storage.close()
+
+        return True
+
+    async def _sync_impl(self, tempo_client: AsyncTempoClient, bookkeeping: SyncBookkeeping,
+                         worklogs: WorkLogCollection):
+        self._change_status("Sync in process...")
+
+        total_count = len(worklogs)
+        counter = {
+            "added": 0,
+            "updated": 0,
+            "skipped": 0,
+            "failed": 0
+        }
+
+        semaphore = asyncio.Semaphore(self.config.network.max_concurrency)
+
+        async def push(wl: WorkLog) -> PushResult:
+            async with semaphore:
+                return await self._push_worklog(tempo_client, wl)
+
+        worklogs_to_push = [x for x in worklogs
+                            if x.state in (WorkLogState.New, WorkLogState.Moved, WorkLogState.Updated)]
+        counter["skipped"] = total_count - len(worklogs_to_push)
+
+        # Results are written to storage only by this coroutine
+        with self.storage.transaction(chunk_size=self.STORAGE_COMMIT_CHUNK_SIZE):
+            bookkeeping.begin_push(worklogs_to_push)
+
+            for task in asyncio.as_completed([push(x) for x in worklogs_to_push]):
+                result = await task
+                bookkeeping.record_push(result)
+
+                counter[result.counter] += 1
+
+        self._change_status("Result: added {added}/{total_count},"
+                            " updated {updated}/{total_count},"
+                            " skipped {skipped}/{total_count},"
+                            " failed: {failed}/{total_count}."
+                            .format(total_count=total_count, **counter))
+
+    @staticmethod
+    async def _push_worklog(tempo_client: AsyncTempoClient, wl: WorkLog) -> PushResult:
+        result = PushResult(wl)
+
+        if wl.state == WorkLogState.New:
+            if await tempo_client.add_worklog(wl):
+                result.is_mapped = True
+                result.counter = "added"
+        elif wl.state == WorkLogState.Moved:
+            moved_from = copy.copy(wl)
+
+            if await tempo_client.move_worklog(wl):
+                result.moved_from = moved_from
+                result.counter = "updated"
+            elif wl.second_id is None:
+                result.removed_mapping = moved_from
+        elif wl.state == WorkLogState.Updated:
+            if await tempo_client.update_worklog(wl):
+                result.counter = "updated"
+
+        return result
+
+    def _change_status(self, message: str):
+        logger.info(message)
+
+        if self._on_status is not None:
+            self._on_status(message)
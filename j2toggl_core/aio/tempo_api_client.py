@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import aiohttp
+import asyncio
+
+from datetime import datetime
+from http import HTTPStatus
+from loguru import logger
+
+from j2toggl_core.aio.jira_api_client import AsyncJiraClient
+from j2toggl_core.configuration.jira_config import JiraConfig
+from j2toggl_core.configuration.tempo_config import TempoConfig
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.tempo_api_client import TempoApiBase
+from j2toggl_core.utils import json_backend
+from j2toggl_core.worklog import WorkLog
+from typing import List
+
+WorkLogCollection = List[WorkLog]
+
+
+class AsyncTempoClient(AsyncJiraClient, TempoApiBase):
+
+    _MAX_CONCURRENT_PAGES = 4
+
+    def __init__(self, jira_config: JiraConfig, tempo_config: TempoConfig, session: aiohttp.ClientSession):
+        AsyncJiraClient.__init__(self, jira_config, session)
+
+        self.__config = tempo_config
+        self.__headers = None
+
+    async def login(self) -> bool:
+        if not await super().login():
+            return False
+
+        self.__headers = {"Authorization": "Bearer " + self.__config.token}
+
+        return True
+
+    async def get_worklogs(self, start_date: datetime, end_date: datetime) -> WorkLogCollection:
+        first_report = await self._get_worklogs_page(start_date, end_date, 0, self.__config.page_size)
+        tsr_list = self._load_worklogs_page(first_report["results"])
+
+        if not first_report["metadata"].get("next"):
+            return tsr_list
+
+        # See TempoClient.get_worklogs: pages are requested ahead, because total count is unknown
+        page_size = first_report["metadata"]["limit"]
+        next_offset = page_size
+        pending = []
+
+        def request_next_page():
+            nonlocal next_offset
+            pending.append(asyncio.ensure_future(
+                self._get_worklogs_page(start_date, end_date, next_offset, page_size)))
+            next_offset += page_size
+
+        for _ in range(self._MAX_CONCURRENT_PAGES):
+            request_next_page()
+
+        try:
+            while pending:
+                report = await pending.pop(0)
+                tsr_list.extend(self._load_worklogs_page(report["results"]))
+
+                if not report["metadata"].get("next"):
+                    break
+
+                request_next_page()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return tsr_list
+
+    async def _get_worklogs_page(self, start_date: datetime, end_date: datetime, offset: int, limit: int) -> dict:
+        method_uri = self._make_tempo_api_uri(f"worklogs/user/{self._user.account_id}")
+
+        params = self._worklogs_page_params(start_date, end_date, offset, limit)
+
+        async with self._session.get(method_uri, params=params, headers=self.__headers) as r:
+            if r.status != HTTPStatus.OK:
+                error_message = "{method_name}: url: {url} status {error_code}, error {error_message}".format(
+                    method_name="get_worklogs",
+                    url=method_uri,
+                    error_code=r.status,
+                    error_message=await r.text())
+
+                logger.error(error_message)
+                raise SyncException(error_message)
+
+            report = json_backend.loads(await r.read())
+
+        self._check_worklogs_page(report)
+
+        return report
+
+    async def add_worklog(self, worklog: WorkLog) -> bool:
+        method_uri = self._make_tempo_api_uri("worklogs")
+
+        data = self._worklog_to_dict(worklog, self._user.account_id)
+        async with self._session.post(method_uri, json=data, headers=self.__headers) as r:
+            return await self.__read_worklog_answer("add_worklog", method_uri, worklog, r)
+
+    async def update_worklog(self, worklog: WorkLog) -> bool:
+        method_uri = self._make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
+
+        data = self._worklog_to_dict(worklog, self._user.account_id)
+        async with self._session.put(method_uri, json=data, headers=self.__headers) as r:
+            return await self.__read_worklog_answer("update_worklog", method_uri, worklog, r)
+
+    async def move_worklog(self, worklog: WorkLog) -> bool:
+        method_uri = self._make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
+
+        data = self._worklog_to_dict(worklog, self._user.account_id)
+        async with self._session.put(method_uri, json=data, headers=self.__headers) as r:
+            if r.status not in self._MOVE_FALLBACK_STATUSES:
+                return await self.__read_worklog_answer("move_worklog", method_uri, worklog, r)
+
+        if not await self.delete_worklog(worklog):
+            return False
+
+        # See TempoClient.move_worklog
+        worklog.second_id = None
+
+        try:
+            return await self.add_worklog(worklog)
+        except aiohttp.ClientError:
+            logger.exception("move_worklog: worklog {0} was deleted, but wasn't added again".format(worklog.master_id))
+            return False
+
+    async def delete_worklog(self, worklog: WorkLog) -> bool:
+        method_uri = self._make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
+
+        async with self._session.delete(method_uri, headers=self.__headers) as r:
+            if not r.ok:
+                logger.error("{method_name}: url: {url} status {error_code}, error {error_message}"
+                             .format(method_name="delete_worklog",
+                                     url=method_uri,
+                                     error_code=r.status,
+                                     error_message=await r.text()))
+
+            return r.ok
+
+    @staticmethod
+    async def __read_worklog_answer(method_name: str, method_uri: str, worklog: WorkLog,
+                                    r: aiohttp.ClientResponse) -> bool:
+        if r.status != HTTPStatus.OK:
+            logger.error("{method_name}: url: {url} status {error_code}, error {error_message}"
+                         .format(method_name=method_name,
+                                 url=method_uri,
+                                 error_code=r.status,
+                                 error_message=await r.text()))
+            return False
+
+        answer = json_backend.loads(await r.read())
+        worklog.second_id = int(answer["tempoWorklogId"])
+
+        return True
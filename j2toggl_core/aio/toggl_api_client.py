@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import aiohttp
+import asyncio
+import math
+
+from datetime import datetime
+from http import HTTPStatus
+from loguru import logger
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from j2toggl_core.configuration.toggl_config import TogglConfig
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.toggl_api_client import TogglApiBase
+from j2toggl_core.utils import json_backend
+from j2toggl_core.worklog import WorkLog
+
+WorkLogCollection = List[WorkLog]
+
+
+class AsyncTogglClient(TogglApiBase):
+    # Reports API allows only a few requests per second
+    _MAX_CONCURRENT_PAGES = 4
+
+    def __init__(self, config: TogglConfig, session: aiohttp.ClientSession):
+        super().__init__(config)
+
+        self._session = session
+        self._auth = aiohttp.BasicAuth(self._config.token or "", "api_token")
+
+        # (workspace id, page number, elapsed seconds) of the last loaded detailed report
+        self.page_timings: List[Tuple[int, int, float]] = []
+
+    async def login(self) -> bool:
+        if not self._config.validate():
+            return False
+
+        method_uri = self._make_api_uri("workspaces")
+        async with self._session.get(method_uri, auth=self._auth) as r:
+            if not r.ok:
+                return False
+
+            workspaces = json_backend.loads(await r.read())
+
+        return self._select_workspaces(workspaces)
+
+    async def get_detailed_report(self, start_date: datetime, end_date: datetime = None) -> WorkLogCollection:
+        since, until = self._report_range(start_date, end_date)
+
+        self.page_timings = []
+
+        # Pages of all workspaces share the limit of concurrent requests
+        semaphore = asyncio.Semaphore(self._MAX_CONCURRENT_PAGES)
+
+        reports = await asyncio.gather(*(self._get_workspace_report(semaphore, x, since, until)
+                                         for x in self._workspace_ids))
+
+        tsr_list = []
+        for workspace_id, workspace_reports in zip(self._workspace_ids, reports):
+            for report in workspace_reports:
+                tsr_list.extend(self._parse_report_record(tr, workspace_id) for tr in report["data"])
+
+        return tsr_list
+
+    async def _get_workspace_report(self, semaphore: asyncio.Semaphore, workspace_id: int,
+                                    since: datetime, until: datetime) -> List[dict]:
+        async def get_page(page_number: int) -> dict:
+            async with semaphore:
+                return await self._get_report_page(workspace_id, since, until, page_number)
+
+        first_report = await get_page(1)
+        pages_count = math.ceil(first_report["total_count"] / first_report["per_page"])
+
+        reports = [first_report]
+        reports.extend(await asyncio.gather(*(get_page(page) for page in range(2, pages_count + 1))))
+
+        logger.debug("Toggl report of workspace {workspace_id}: {pages} page(s), {count} worklogs"
+                     .format(workspace_id=workspace_id, pages=pages_count, count=first_report["total_count"]))
+
+        return reports
+
+    async def _get_report_page(self, workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+        method_uri = self._make_reports_api_url("details")
+        params = self._report_page_params(workspace_id, since, until, page_number)
+
+        started_at = perf_counter()
+        async with self._session.get(method_uri, params=params, auth=self._auth) as r:
+            await self._check_response("get_detailed_report", r)
+            report = json_backend.loads(await r.read())
+        self.page_timings.append((workspace_id, page_number, perf_counter() - started_at))
+
+        return report
+
+    @staticmethod
+    async def _check_response(method_name: str, r: aiohttp.ClientResponse):
+        # See TogglClient._check_response
+        if r.status == HTTPStatus.OK:
+            return
+
+        error_message = "{method_name}: url: {url} status {error_code}, error {error_message}".format(
+            method_name=method_name,
+            url=r.url,
+            error_code=r.status,
+            error_message=await r.text())
+
+        logger.error(error_message)
+        raise SyncException(error_message)
+
+
+class AsyncTogglReportsV3Client(AsyncTogglClient):
+    """
+    Loads detailed report by Reports API v3, see TogglReportsV3Client.
+    """
+
+    async def _get_workspace_report(self, semaphore: asyncio.Semaphore, workspace_id: int,
+                                    since: datetime, until: datetime) -> List[dict]:
+        # Rows refer projects and tags by ids, their names are loaded while the first page is requested
+        async with semaphore:
+            names_tasks = [asyncio.ensure_future(self._get_project_names(workspace_id)),
+                           asyncio.ensure_future(self._get_tag_names(workspace_id))]
+            try:
+                body = self._report_v3_first_body(since, until)
+                page_number = 0
+                pages = []
+
+                # Pages are continued by cursor, so they are requested one by one
+                while body is not None:
+                    page_number += 1
+                    rows, body = await self._get_report_v3_page(workspace_id, body, page_number)
+                    pages.append(rows)
+
+                project_names, tag_names = await asyncio.gather(*names_tasks)
+            finally:
+                # Names aren't needed after error of pages
+                for task in names_tasks:
+                    task.cancel()
+                await asyncio.gather(*names_tasks, return_exceptions=True)
+
+        reports = [{"data": self._rows_to_records(rows, project_names, tag_names)} for rows in pages]
+
+        logger.debug("Toggl report v3 of workspace {workspace_id}: {pages} page(s), {count} worklogs"
+                     .format(workspace_id=workspace_id, pages=page_number,
+                             count=sum(len(x["data"]) for x in reports)))
+
+        return reports
+
+    async def _get_report_v3_page(self, workspace_id: int, body: dict, page_number: int) \
+            -> (List[dict], Optional[dict]):
+        method_uri = self._make_reports_v3_api_url(f"workspace/{workspace_id}/search/time_entries")
+
+        started_at = perf_counter()
+        async with self._session.post(method_uri, json=body, auth=self._auth) as r:
+            await self._check_response("get_detailed_report", r)
+            rows = json_backend.loads(await r.read())
+            next_body = self._report_v3_next_body(body, r.headers)
+        self.page_timings.append((workspace_id, page_number, perf_counter() - started_at))
+
+        return rows, next_body
+
+    async def _get_project_names(self, workspace_id: int) -> Dict[int, str]:
+        method_uri = self._make_api_uri(f"workspaces/{workspace_id}/projects")
+
+        names = {}
+        page_number = 1
+        while True:
+            params = {"page": page_number, "per_page": self._PROJECTS_PAGE_SIZE}
+            async with self._session.get(method_uri, params=params, auth=self._auth) as r:
+                await self._check_response("get_projects", r)
+                projects = json_backend.loads(await r.read()) or []
+
+            names.update((x["id"], x["name"]) for x in projects)
+
+            if len(projects) < self._PROJECTS_PAGE_SIZE:
+                return names
+
+            page_number += 1
+
+    async def _get_tag_names(self, workspace_id: int) -> Dict[int, str]:
+        method_uri = self._make_api_uri(f"workspaces/{workspace_id}/tags")
+
+        async with self._session.get(method_uri, auth=self._auth) as r:
+            await self._check_response("get_tags", r)
+            tags = json_backend.loads(await r.read()) or []
+
+        return {x["id"]: x["name"] for x in tags}
+
+
+def create_async_toggl_client(config: TogglConfig, session: aiohttp.ClientSession) -> AsyncTogglClient:
+    # See create_toggl_client
+    if config.reports_api == TogglConfig.REPORTS_API_V2:
+        return AsyncTogglClient(config, session)
+
+    return AsyncTogglReportsV3Client(config, session)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import re
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from j2toggl_core.configuration.rules_config import RulesConfig
+
+# Key of Jira issue, for instance "TEST-1"
+JIRA_KEY_RE = re.compile(r"\w+-\d+")
+
+
+class ClassificationRules:
+    """
+    Gives Jira key, description and Tempo activity of Toggl time entry.
+    Rules are compiled once and results are memoized, since team reports repeat the same
+    projects, tags and descriptions many times.
+    """
+
+    MEMO_SIZE = 64 * 1024
+
+    def __init__(self, config: RulesConfig = None):
+        if config is None:
+            config = RulesConfig()
+
+        self._key_tag_prefixes = tuple(config.key_tag_prefixes)
+
+        # (pattern, whether it replaces description)
+        self._key_patterns = [(x, "description" in x.groupindex)
+                              for x in (re.compile(x, re.DOTALL) for x in config.key_patterns)]
+
+        self._activities = dict(config.activities)
+        self._default_activity = config.default_activity
+
+        self.classify = lru_cache(maxsize=self.MEMO_SIZE)(self._classify)
+
+    def _classify(self, project: Optional[str], tags: Tuple[str, ...], description: Optional[str]) \
+            -> (Optional[str], Optional[str], Optional[str]):
+        key, description = self.parse_key(tags, description)
+
+        if project is None:
+            return key, description, None
+
+        return key, description, self._activities.get(project, self._default_activity)
+
+    def parse_key(self, tags: Tuple[str, ...], description: Optional[str]) -> (Optional[str], Optional[str]):
+        # TODO: What occurs if we add more that one tag to worklog?
+        for tag in tags:
+            if tag.startswith(self._key_tag_prefixes):
+                prefix = next(x for x in self._key_tag_prefixes if tag.startswith(x))
+                key = tag[len(prefix):]
+
+                return (key if JIRA_KEY_RE.match(key) else None), description
+
+        if description is None:
+            return None, description
+
+        # Patterns define format of keys themselves, so keys of descriptions aren't checked again
+        for pattern, replaces_description in self._key_patterns:
+            match = pattern.match(description)
+            if match is None:
+                continue
+
+            if replaces_description:
+                key, matched_description = match.group("key", "description")
+
+                # Optional description group keeps the whole text, when it doesn't participate in the match
+                if matched_description is not None:
+                    return key, matched_description.strip()
+
+                return key, description
+
+            return match.group("key"), description
+
+        return None, description
+
+    def get_activity(self, project: Optional[str]) -> Optional[str]:
+        if project is None:
+            return None
+
+        return self._activities.get(project, self._default_activity)
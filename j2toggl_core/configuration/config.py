@@ -1,4 +1,5 @@
 from j2toggl_core.configuration.jira_config import JiraConfig
+from j2toggl_core.configuration.network_config import NetworkConfig
 from j2toggl_core.configuration.tempo_config import TempoConfig
 from j2toggl_core.configuration.toggl_config import TogglConfig
 
@@ -11,6 +12,7 @@ class Config:
         self.jira: JiraConfig = JiraConfig()
         self.toggl: TogglConfig = TogglConfig()
         self.tempo: TempoConfig = TempoConfig()
+        self.network: NetworkConfig = NetworkConfig()
 
     def load(self):
         raise NotImplementedError()
@@ -1,4 +1,5 @@
 import json
+import re
 from json import JSONDecodeError
 from pathlib import Path
 
@@ -7,8 +8,12 @@ import jsonschema
 from jsonschema import ValidationError
 from loguru import logger
 
-from j2toggl_core.app_paths import get_app_file_path, get_app_directory_path
+from j2toggl_core.app_paths import get_app_file_path
 from j2toggl_core.configuration.config import Config
+from j2toggl_core.configuration.network_config import NetworkConfig
+from j2toggl_core.configuration.rules_config import RulesConfig
+from j2toggl_core.configuration.tempo_config import TempoConfig
+from j2toggl_core.configuration.toggl_config import TogglConfig
 
 CONFIG_FILE_NAME = "app-config.json"
 
@@ -40,6 +45,11 @@ class JsonConfig(Config):
                 "type": "object",
                 "properties": {
                     "token": {"type": "string"},
+                    "pageSize": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": TempoConfig.MAX_PAGE_SIZE
+                    },
                 }
             },
             "toggl": {
@@ -47,6 +57,59 @@ class JsonConfig(Config):
                 "properties": {
                     "user_agent": {"type": "string"},
                     "token": {"type": "string"},
+                    "workspaces": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 1
+                    },
+                    "reportsApi": {"enum": list(TogglConfig.REPORTS_APIS)},
+                    "pageSize": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": TogglConfig.MAX_PAGE_SIZE
+                    },
+                    "apiUrl": {"type": "string"},
+                    "rules": {
+                        "type": "object",
+                        "properties": {
+                            "keyTagPrefixes": {
+                                "type": "array",
+                                "items": {"type": "string", "minLength": 1}
+                            },
+                            "keyPatterns": {
+                                "type": "array",
+                                "items": {"type": "string"}
+                            },
+                            "activities": {
+                                "type": "object",
+                                "additionalProperties": {"type": "string"}
+                            },
+                            "defaultActivity": {"type": "string"},
+                        }
+                    },
+                }
+            },
+            "network": {
+                "type": "object",
+                "properties": {
+                    "minConcurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": NetworkConfig.MAX_CONCURRENCY
+                    },
+                    "maxConcurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": NetworkConfig.MAX_CONCURRENCY
+                    },
+                    "connectTimeout": {
+                        "type": "number",
+                        "minimum": 1
+                    },
+                    "readTimeout": {
+                        "type": "number",
+                        "minimum": 1
+                    },
                 }
             },
         },
@@ -85,10 +148,18 @@ class JsonConfig(Config):
         except ValidationError as e:
             return False, f"JSON config is incorrect: {e.message}"
 
+        # Key patterns are compiled by Toggl client, so they are checked here
+        for pattern in data.get("toggl", {}).get("rules", {}).get("keyPatterns", []):
+            try:
+                if "key" not in re.compile(pattern).groupindex:
+                    return False, f"Key pattern '{pattern}' doesn't have group 'key'"
+            except re.error as e:
+                return False, f"Key pattern '{pattern}' is incorrect: {e}"
+
         return True, None
 
     def load(self):
-        config_path = get_app_file_path(CONFIG_FILE_NAME)
+        config_path = self.config_path
 
         logger.info(f"Load config from '{config_path}'")
 
@@ -113,16 +184,35 @@ class JsonConfig(Config):
 
             # Tempo settings
             self.tempo.token = data["tempo"]["token"]
+            self.tempo.page_size = data["tempo"].get("pageSize", TempoConfig.DEFAULT_PAGE_SIZE)
 
             # Toggl settings
             self.toggl.token = data["toggl"]["token"]
             self.toggl.user_agent = data["toggl"]["user_agent"]
+            self.toggl.workspaces = data["toggl"].get("workspaces")
+            self.toggl.reports_api = data["toggl"].get("reportsApi", TogglConfig.DEFAULT_REPORTS_API)
+            self.toggl.page_size = data["toggl"].get("pageSize", TogglConfig.DEFAULT_PAGE_SIZE)
+            self.toggl.api_url = data["toggl"].get("apiUrl")
 
-    def save(self):
-        config_dir = get_app_directory_path()
-        config_dir.mkdir(exist_ok=True)
+            # Classification rules
+            rules = data["toggl"].get("rules", {})
+            self.toggl.rules.key_tag_prefixes = rules.get("keyTagPrefixes", RulesConfig.DEFAULT_KEY_TAG_PREFIXES)
+            self.toggl.rules.key_patterns = rules.get("keyPatterns", RulesConfig.DEFAULT_KEY_PATTERNS)
+            self.toggl.rules.activities = rules.get("activities", RulesConfig.DEFAULT_ACTIVITIES)
+            self.toggl.rules.default_activity = rules.get("defaultActivity", RulesConfig.DEFAULT_ACTIVITY)
 
-        config_path = get_app_file_path(CONFIG_FILE_NAME)
+            # Network settings
+            network = data.get("network", {})
+            self.network.min_concurrency = network.get("minConcurrency", NetworkConfig.DEFAULT_MIN_CONCURRENCY)
+            max_concurrency = network.get("maxConcurrency", NetworkConfig.DEFAULT_MAX_CONCURRENCY)
+            self.network.max_concurrency = max(min(max_concurrency, NetworkConfig.MAX_CONCURRENCY),
+                                               self.network.min_concurrency)
+            self.network.connect_timeout = network.get("connectTimeout", NetworkConfig.DEFAULT_CONNECT_TIMEOUT)
+            self.network.read_timeout = network.get("readTimeout", NetworkConfig.DEFAULT_READ_TIMEOUT)
+
+    def save(self):
+        config_path = self.config_path
+        config_path.parent.mkdir(exist_ok=True)
 
         logger.info(f"Save config to '{config_path}'")
 
@@ -137,12 +227,33 @@ class JsonConfig(Config):
             },
             "tempo": {
                 "token": self.tempo.token,
+                "pageSize": self.tempo.page_size,
             },
             "toggl": {
                 "user_agent": self.toggl.user_agent,
                 "token": self.toggl.token,
+                "reportsApi": self.toggl.reports_api,
+                "pageSize": self.toggl.page_size,
+                "rules": {
+                    "keyTagPrefixes": self.toggl.rules.key_tag_prefixes,
+                    "keyPatterns": self.toggl.rules.key_patterns,
+                    "activities": self.toggl.rules.activities,
+                    "defaultActivity": self.toggl.rules.default_activity,
+                },
+            },
+            "network": {
+                "minConcurrency": self.network.min_concurrency,
+                "maxConcurrency": self.network.max_concurrency,
+                "connectTimeout": self.network.connect_timeout,
+                "readTimeout": self.network.read_timeout,
             }
         }
 
+        # Without the list all workspaces are synced
+        if self.toggl.workspaces is not None:
+            data["toggl"]["workspaces"] = self.toggl.workspaces
+        if self.toggl.api_url is not None:
+            data["toggl"]["apiUrl"] = self.toggl.api_url
+
         with config_path.open(mode="w") as config_file:
             json.dump(data, config_file, indent=4)
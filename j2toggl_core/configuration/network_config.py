@@ -0,0 +1,16 @@
+class NetworkConfig:
+    # Bounds of in-flight requests per host, the actual limit is tuned by response latency and errors
+    DEFAULT_MIN_CONCURRENCY = 1
+    DEFAULT_MAX_CONCURRENCY = 8
+    MAX_CONCURRENCY = 32
+
+    DEFAULT_CONNECT_TIMEOUT = 10.0
+    DEFAULT_READ_TIMEOUT = 60.0
+
+    def __init__(self):
+        self.min_concurrency = self.DEFAULT_MIN_CONCURRENCY
+        self.max_concurrency = self.DEFAULT_MAX_CONCURRENCY
+
+        # Seconds, hung connection fails the request instead of freezing sync
+        self.connect_timeout = self.DEFAULT_CONNECT_TIMEOUT
+        self.read_timeout = self.DEFAULT_READ_TIMEOUT
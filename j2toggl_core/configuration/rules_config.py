@@ -0,0 +1,39 @@
+from typing import Dict, List
+
+
+class RulesConfig:
+    """
+    Rules which give Jira key and Tempo activity of Toggl time entry, see ClassificationRules.
+    """
+
+    DEFAULT_KEY_TAG_PREFIXES = ["key_"]
+
+    # Key is text before the first dot, for instance "TEST-1. Development"
+    DEFAULT_KEY_PATTERNS = [r"(?P<key>\w+-\d+[^.]*)\.(?P<description>.*)"]
+
+    DEFAULT_ACTIVITIES = {
+        "Analysis": "Design/Analysis",
+        "BugFixing": "Bugfixing",
+        "CodeReview": "Code Review",
+        "CR Fixes": "Code Review Fixes",
+        "Development": "Development",
+        "Estimation": "Estimation",
+        "Interview": "Other",
+        "Meetings": "Other",
+        "Testing": "Testing",
+        "Environment Setup": "Environment Setup",
+        "Team Activities": "Other"
+    }
+    DEFAULT_ACTIVITY = "Other"
+
+    def __init__(self):
+        # Tag with one of the prefixes keeps the key after the prefix, it has priority over description
+        self.key_tag_prefixes: List[str] = list(self.DEFAULT_KEY_TAG_PREFIXES)
+
+        # Regular expressions matched from the beginning of description, the first matched one gives "key" group
+        # and optional "description" group replaces description
+        self.key_patterns: List[str] = list(self.DEFAULT_KEY_PATTERNS)
+
+        # Activity of project, projects out of the table get the default activity
+        self.activities: Dict[str, str] = dict(self.DEFAULT_ACTIVITIES)
+        self.default_activity = self.DEFAULT_ACTIVITY
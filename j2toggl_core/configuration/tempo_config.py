@@ -1,3 +1,8 @@
 class TempoConfig:
+    # Tempo API doesn't return more than 1000 worklogs per page
+    MAX_PAGE_SIZE = 1000
+    DEFAULT_PAGE_SIZE = MAX_PAGE_SIZE
+
     def __init__(self):
         self.token = None
+        self.page_size = self.DEFAULT_PAGE_SIZE
@@ -1,11 +1,36 @@
-from typing import Optional
+from typing import List, Optional
+
+from j2toggl_core.configuration.rules_config import RulesConfig
 
 
 class TogglConfig:
+    REPORTS_API_V2 = "v2"
+    REPORTS_API_V3 = "v3"
+    REPORTS_APIS = (REPORTS_API_V2, REPORTS_API_V3)
+    DEFAULT_REPORTS_API = REPORTS_API_V3
+
+    # Rows of Reports API v3 group time entries with the same description, project and tags,
+    # so a page usually keeps more worklogs than rows
+    MAX_PAGE_SIZE = 1000
+    DEFAULT_PAGE_SIZE = 50
+
     def __init__(self):
         self.token: Optional[str] = None
         self.user_agent: Optional[str] = None
 
+        # Ids of synced workspaces, all workspaces of the user are synced if it's None
+        self.workspaces: Optional[List[int]] = None
+
+        # Reports API of detailed report, v2 is kept as fallback
+        self.reports_api = self.DEFAULT_REPORTS_API
+        self.page_size = self.DEFAULT_PAGE_SIZE
+
+        # Toggl host is replaced only to test against local server
+        self.api_url: Optional[str] = None
+
+        # Rules of Jira keys and Tempo activities of time entries
+        self.rules = RulesConfig()
+
     def validate(self) -> bool:
         if self.token is None or \
            len(self.token) == 0 or \
@@ -9,15 +9,18 @@ from typing import Optional
 
 from j2toggl_core.configuration.jira_config import JiraConfig
 from j2toggl_core.domain.jira_issue import JiraIssue
+from j2toggl_core.net.http_transport import HttpTransport, default_transport
+from j2toggl_core.utils import json_backend
 
 
 class JiraClient:
     _cookieJarFileName = "jira.cookies"
     _jql_separator = ","
 
-    def __init__(self, config: JiraConfig):
+    def __init__(self, config: JiraConfig, transport: HttpTransport = None):
         self.__config = config
-        self.__session = requests.Session()
+        self.__auth = None
+        self._transport = transport if transport is not None else default_transport
         self._user: Optional[JiraUser] = None
 
     def login(self) -> bool:
@@ -27,10 +30,10 @@ class JiraClient:
         # Basic Authentication with JIRA token
         method_uri = self.__make_api_uri("myself")
 
-        r = self.__session.get(url=method_uri, auth=(self.__config.user, self.__config.token))
+        r = self._transport.get(method_uri, auth=(self.__config.user, self.__config.token))
         if r.status_code == HTTPStatus.OK:
-            self.__session.auth = (self.__config.user, self.__config.token)
-            self._user = JiraUser.parse(r.json())
+            self.__auth = (self.__config.user, self.__config.token)
+            self._user = JiraUser.parse(json_backend.loads(r.content))
         else:
             logger.error("{0}: status {1}, error {2}".format("Basic Authentication", r.status_code, r.text))
             return False
@@ -44,7 +47,7 @@ class JiraClient:
     def search_issue(self, key: str) -> Optional[JiraIssue]:
         method_uri = self.__make_api_uri("issue/{0}".format(key))
         logger.debug("{0}: Request method: {1}".format("search_issue", method_uri))
-        r = self.__session.get(url=method_uri)
+        r = self._transport.get(method_uri, auth=self.__auth)
 
         if r.status_code != 200:
             logger.error("{0}: status {1}, error {2}".format("search_issue", r.status_code, r.text))
@@ -63,12 +66,12 @@ class JiraClient:
                 "self"
             ])
 
-        r = self.__session.post(url=method_uri, json=body)
+        r = self._transport.post(method_uri, auth=self.__auth, json=body)
         if r.status_code != 200:
             logger.error("{0}: status {1}, error {2}".format("search_issues", r.status_code, r.text))
             return None
 
-        search_result = r.json()
+        search_result = json_backend.loads(r.content)
 
         for issue in search_result["issues"]:
             yield JiraIssue.parse(issue)
@@ -76,9 +79,13 @@ class JiraClient:
     def __make_api_uri(self, relative_url: str):
         return "{0}/rest/api/3/{1}".format(self.__config.host, relative_url)
 
+    @property
+    def user(self) -> Optional["JiraUser"]:
+        return self._user
+
     @property
     def get_session(self) -> requests.Session:
-        return self.__session
+        return self._transport.session
 
 
 class JiraUser:
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from typing import Callable, Dict
+
+from loguru import logger
+
+
+class ConcurrencyController:
+    """
+    AIMD limit of in-flight requests to a host: the limit grows by one per window of successful requests
+    and is halved on throttling, server errors or latency much higher than the best one observed.
+    Endpoints of the same host differ in latency a lot, e.g. a report page and a worklog update,
+    so the best latency is observed per endpoint.
+    """
+
+    INITIAL_LIMIT = 4
+
+    DECREASE_FACTOR = 0.5
+
+    # Latency above this multiple of the baseline means that the server is queueing requests
+    LATENCY_TOLERANCE = 3.0
+
+    # Baseline slowly forgets the best latency, so a server which became slower for good isn't punished forever
+    BASELINE_DRIFT = 0.01
+
+    def __init__(self, host: str, min_limit: int, max_limit: int, clock: Callable[[], float] = time.monotonic):
+        self.host = host
+        self.min_limit = None
+        self.max_limit = None
+
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._limit = float(self.INITIAL_LIMIT)
+        self._in_flight = 0
+        self._baseline_latencies: Dict[str, float] = {}
+        self._decreased_at = float("-inf")
+
+        self.set_bounds(min_limit, max_limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def set_bounds(self, min_limit: int, max_limit: int):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError(f"Incorrect concurrency bounds: {min_limit}..{max_limit}")
+
+        with self._condition:
+            self.min_limit = min_limit
+            self.max_limit = max_limit
+            self._limit = max(float(min_limit), min(self._limit, float(max_limit)))
+
+            self._condition.notify_all()
+
+    def acquire(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < int(self._limit))
+            self._in_flight += 1
+
+    def release(self, started_at: float, is_overloaded: bool = False, endpoint: str = ""):
+        latency = self._clock() - started_at
+
+        with self._condition:
+            self._in_flight -= 1
+            previous_limit = self.limit
+
+            if not is_overloaded:
+                baseline_latency = self._baseline_latencies.get(endpoint)
+                if baseline_latency is None or latency < baseline_latency:
+                    baseline_latency = latency
+                else:
+                    baseline_latency += (latency - baseline_latency) * self.BASELINE_DRIFT
+                self._baseline_latencies[endpoint] = baseline_latency
+
+                is_overloaded = latency > baseline_latency * self.LATENCY_TOLERANCE
+
+            if is_overloaded:
+                # Requests sent before the last decrease saw the old limit, they don't decrease it again
+                if started_at >= self._decreased_at:
+                    self._limit = max(float(self.min_limit), self._limit * self.DECREASE_FACTOR)
+                    self._decreased_at = self._clock()
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+            if self.limit != previous_limit:
+                logger.debug("Concurrency limit of {host}: {previous} -> {limit} (latency {latency:.0f} ms)"
+                             .format(host=self.host, previous=previous_limit, limit=self.limit,
+                                     latency=latency * 1000))
+
+            self._condition.notify_all()
@@ -0,0 +1,111 @@
+import threading
+
+from time import perf_counter
+from typing import Callable, List
+
+import requests
+from loguru import logger
+
+from j2toggl_core.configuration.network_config import NetworkConfig
+from j2toggl_core.net.request_scheduler import RequestScheduler, ScheduledHTTPAdapter, default_scheduler
+
+
+class RequestMetrics:
+    def __init__(self, method: str, url: str, status_code: int, elapsed: float, sent_bytes: int,
+                 received_bytes: int):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.elapsed = elapsed
+        self.sent_bytes = sent_bytes
+        self.received_bytes = received_bytes
+
+
+RequestHook = Callable[[RequestMetrics], None]
+
+
+class HttpTransport:
+    """
+    One HTTP session shared by all API clients: keep-alive connections are reused between clients,
+    every request has connect and read timeouts and goes through the request scheduler.
+    Clients pass their own credentials with each request.
+    """
+
+    # Hosts of Toggl, Tempo and Jira
+    POOL_CONNECTIONS = 4
+
+    def __init__(self, scheduler: RequestScheduler = default_scheduler, config: NetworkConfig = None):
+        self.scheduler = scheduler
+        self.session = requests.Session()
+
+        self._lock = threading.Lock()
+        self._hooks: List[RequestHook] = []
+        self._timeout = None
+        self._pool_size = None
+
+        self.configure(config if config is not None else NetworkConfig())
+
+    def configure(self, config: NetworkConfig):
+        with self._lock:
+            self._timeout = (config.connect_timeout, config.read_timeout)
+            self.scheduler.set_concurrency_bounds(config.min_concurrency, config.max_concurrency)
+
+            if self._pool_size == config.max_concurrency:
+                return
+
+            # Pool keeps a connection for every request in flight, so connections aren't opened and dropped
+            # when concurrency goes up. The scheduler never sends more requests than the upper bound.
+            self._pool_size = config.max_concurrency
+            adapter = ScheduledHTTPAdapter(self.scheduler,
+                                           pool_connections=self.POOL_CONNECTIONS,
+                                           pool_maxsize=self._pool_size)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def add_hook(self, hook: RequestHook):
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook):
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self._timeout)
+
+        started_at = perf_counter()
+        r = self.session.request(method, url, **kwargs)
+        elapsed = perf_counter() - started_at
+
+        if self._hooks:
+            body = r.request.body
+            metrics = RequestMetrics(method=method,
+                                     url=r.url,
+                                     status_code=r.status_code,
+                                     elapsed=elapsed,
+                                     sent_bytes=len(body) if body is not None else 0,
+                                     received_bytes=len(r.content))
+
+            for hook in list(self._hooks):
+                try:
+                    hook(metrics)
+                except Exception:
+                    logger.exception("Request hook failed")
+
+        return r
+
+
+# Clients of the process share connections and limits of the same hosts
+default_transport = HttpTransport()
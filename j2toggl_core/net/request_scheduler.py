@@ -0,0 +1,296 @@
+import random
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from j2toggl_core.configuration.network_config import NetworkConfig
+from j2toggl_core.net.concurrency_controller import ConcurrencyController
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of `capacity` requests and `rate` requests per second on average.
+    """
+
+    def __init__(self, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._paused_until = 0.0
+
+    def acquire(self) -> float:
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+
+                delay = max(self._paused_until - now, 0.0)
+                if delay == 0.0:
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return waited
+
+                    delay = (1.0 - self._tokens) / self.rate
+
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        # Server asked to slow down, so all threads sharing the bucket wait and start again without burst
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated_at = max(self._updated_at, self._paused_until)
+
+    def _refill(self, now: float):
+        if now <= self._updated_at:
+            return
+
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+class HostBudget:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+
+        # Statistics of the host
+        self._lock = threading.Lock()
+        self.requests_count = 0
+        self.throttled_count = 0
+        self.retries_count = 0
+        self.waited_seconds = 0.0
+
+    def record(self, requests_count: int = 0, throttled_count: int = 0, retries_count: int = 0,
+               waited_seconds: float = 0.0):
+        with self._lock:
+            self.requests_count += requests_count
+            self.throttled_count += throttled_count
+            self.retries_count += retries_count
+            self.waited_seconds += waited_seconds
+
+
+class RequestScheduler:
+    """
+    Spreads requests of all clients over per-host budgets and retries throttled or transiently failed requests.
+    Retry-After of the server is honoured, otherwise the delay grows exponentially with full jitter.
+    """
+
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 0.5
+    BACKOFF_CAP = 30.0
+    MAX_RETRY_AFTER = 120.0
+
+    TRANSIENT_STATUSES = (HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT)
+    OVERLOAD_STATUSES = (HTTPStatus.TOO_MANY_REQUESTS, ) + TRANSIENT_STATUSES
+
+    # Repeated POST can create a duplicate, so only these requests are retried after 5xx or connection error.
+    # Throttled request wasn't processed by server, so it's retried regardless of method.
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+    DEFAULT_BUDGET = (10.0, 10)
+
+    # Documented limits: Toggl allows about 1 request per second per token, Tempo about 5.
+    DEFAULT_HOST_BUDGETS = {
+        "api.track.toggl.com": (1.0, 3),
+        "api.tempo.io": (5.0, 10),
+    }
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._budgets: Dict[str, HostBudget] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._controllers: Dict[str, ConcurrencyController] = {}
+        self._shared_limits: Dict[str, Any] = {}
+        self._concurrency_bounds = (NetworkConfig.DEFAULT_MIN_CONCURRENCY, NetworkConfig.DEFAULT_MAX_CONCURRENCY)
+
+        for host, (rate, burst) in self.DEFAULT_HOST_BUDGETS.items():
+            self.set_budget(host, rate, burst)
+
+    @property
+    def budgets(self) -> Dict[str, HostBudget]:
+        with self._lock:
+            return dict(self._budgets)
+
+    def set_budget(self, host: str, rate: float, burst: int):
+        with self._lock:
+            self._budgets[host] = HostBudget(rate, burst)
+            self._buckets[host] = TokenBucket(rate, burst, self._clock, self._sleep)
+
+    def get_budget(self, host: str) -> HostBudget:
+        return self._get_host(host)[0]
+
+    def set_concurrency_bounds(self, min_limit: int, max_limit: int):
+        with self._lock:
+            self._concurrency_bounds = (min_limit, max_limit)
+
+            for controller in self._controllers.values():
+                controller.set_bounds(min_limit, max_limit)
+
+    def set_shared_limit(self, host: str, semaphore):
+        # Semaphore shared with other processes, it caps requests to the host across all of them
+        with self._lock:
+            self._shared_limits[host] = semaphore
+
+    def get_concurrency(self, host: str) -> ConcurrencyController:
+        return self._get_host(host)[2]
+
+    def send(self, method: str, url: str, send: Callable[[], requests.Response]) -> requests.Response:
+        host = urlsplit(url).hostname or ""
+        endpoint = self.endpoint_of(method, url)
+        budget, bucket, controller = self._get_host(host)
+        shared_limit = self._shared_limits.get(host)
+        is_idempotent = method.upper() in self.IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            controller.acquire()
+            waited_seconds = bucket.acquire()
+
+            # Slot of the team is taken after the own rate wait, so a throttled process doesn't hold it while sleeping
+            if shared_limit is not None:
+                shared_limit.acquire()
+            budget.record(requests_count=1, waited_seconds=waited_seconds)
+
+            started_at = self._clock()
+            response = None
+            try:
+                response = send()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not is_idempotent or attempt >= self.MAX_RETRIES:
+                    raise
+
+                delay = self.backoff_delay(attempt)
+                logger.warning("{method} {host}: {error}, retry in {delay:.1f} s"
+                               .format(method=method, host=host, error=e, delay=delay))
+            finally:
+                if shared_limit is not None:
+                    shared_limit.release()
+                controller.release(started_at, response is None or response.status_code in self.OVERLOAD_STATUSES,
+                                   endpoint)
+
+            if response is not None:
+                if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                    budget.record(throttled_count=1)
+                elif response.status_code not in self.TRANSIENT_STATUSES or not is_idempotent:
+                    return response
+
+                if attempt >= self.MAX_RETRIES:
+                    return response
+
+                retry_after = self.parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+
+                if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                    bucket.pause(delay)
+
+                logger.warning("{method} {host}: status {status}, retry in {delay:.1f} s"
+                               .format(method=method, host=host, status=response.status_code, delay=delay))
+
+                # Connection goes back to pool only when the answer is read
+                response.content
+                response.close()
+
+            attempt += 1
+            budget.record(retries_count=1)
+            self._sleep(delay)
+
+    def log_statistics(self):
+        with self._lock:
+            hosts = [(host, self._budgets[host], self._controllers.get(host)) for host in sorted(self._budgets)]
+
+        for host, budget, controller in hosts:
+            if budget.requests_count == 0:
+                continue
+
+            logger.info("{host}: {requests} request(s), {throttled} throttled, {retries} retried, "
+                        "waited for budget {waited:.1f} s, concurrency limit {limit}"
+                        .format(host=host,
+                                requests=budget.requests_count,
+                                throttled=budget.throttled_count,
+                                retries=budget.retries_count,
+                                waited=budget.waited_seconds,
+                                limit=controller.limit if controller is not None else "-"))
+
+    @staticmethod
+    def endpoint_of(method: str, url: str) -> str:
+        # Ids of worklogs and workspaces don't make other endpoints, so their latencies are compared together
+        path = "/".join("*" if x.isdigit() else x for x in urlsplit(url).path.split("/"))
+
+        return f"{method.upper()} {path}"
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** attempt))
+
+    @classmethod
+    def parse_retry_after(cls, value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+
+        return min(max(seconds, 0.0), cls.MAX_RETRY_AFTER)
+
+    def _get_host(self, host: str) -> (HostBudget, TokenBucket, ConcurrencyController):
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.DEFAULT_BUDGET
+                self._budgets[host] = HostBudget(rate, burst)
+                self._buckets[host] = TokenBucket(rate, burst, self._clock, self._sleep)
+
+            if host not in self._controllers:
+                min_limit, max_limit = self._concurrency_bounds
+                self._controllers[host] = ConcurrencyController(host, min_limit, max_limit, self._clock)
+
+            return self._budgets[host], self._buckets[host], self._controllers[host]
+
+
+class ScheduledHTTPAdapter(HTTPAdapter):
+    """
+    Transport adapter which sends every request of a session through the request scheduler.
+    """
+
+    def __init__(self, scheduler: RequestScheduler, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        send = super().send
+
+        return self.scheduler.send(request.method, request.url, lambda: send(request, **kwargs))
+
+
+# All clients of the process share budgets, because the limits are applied by servers per account
+default_scheduler = RequestScheduler()
+
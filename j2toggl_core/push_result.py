@@ -0,0 +1,13 @@
+from typing import Optional
+
+from j2toggl_core.worklog import WorkLog
+
+
+class PushResult:
+    def __init__(self, worklog: WorkLog):
+        self.worklog = worklog
+        self.counter = "failed"
+        self.is_mapped = False
+        self.removed_mapping: Optional[WorkLog] = None
+        # Worklog before move, its mapping is replaced by the moved one
+        self.moved_from: Optional[WorkLog] = None
@@ -0,0 +1,279 @@
+import time
+
+from array import array
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.storage.storage import QualifiedId
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_batch import MISSING, WorkLogBatch, numpy
+from j2toggl_core.worklog_state import WorkLogState
+
+WorkLogCollection = List[WorkLog]
+
+
+class ReconciliationResult:
+    def __init__(self, worklogs: WorkLogCollection):
+        self.worklogs = worklogs
+        self.counters: Dict[WorkLogState, int] = {state: 0 for state in WorkLogState}
+        self.has_incomplete_worklog = False
+        self.elapsed = 0.0
+
+
+class WorkLogReconciler:
+    """
+    Classifies Toggl worklogs against Tempo worklogs.
+    Tempo worklogs are indexed once, so every Toggl worklog is classified in O(1).
+    """
+
+    def __init__(self, tempo_worklogs: WorkLogCollection, mapped_second_ids: Iterable[int] = ()):
+        # Tempo worklogs which already have Toggl pair, they aren't reported as possible duplicates
+        self._mapped_second_ids = set(mapped_second_ids)
+
+        self._by_second_id: Dict[int, WorkLog] = {}
+        self._by_key: Dict[str, WorkLogCollection] = defaultdict(list)
+        self._by_start_date: Dict[date, WorkLogCollection] = defaultdict(list)
+
+        for tempo in tempo_worklogs:
+            self._by_second_id[tempo.second_id] = tempo
+            self._by_key[tempo.key].append(tempo)
+            self._by_start_date[tempo.startTime.date()].append(tempo)
+
+    def get_by_second_id(self, second_id: int) -> Optional[WorkLog]:
+        return self._by_second_id.get(second_id)
+
+    def mark_mapped(self, second_id: int):
+        self._mapped_second_ids.add(second_id)
+
+    def find_unmapped_match(self, toggl: WorkLog) -> Optional[WorkLog]:
+        # Use the smallest index bucket to look for Tempo worklog with the same content
+        by_key = self._by_key.get(toggl.key, ())
+        by_date = self._by_start_date.get(toggl.startTime.date(), ())
+        candidates = by_key if len(by_key) < len(by_date) else by_date
+
+        for tempo in candidates:
+            if tempo.second_id in self._mapped_second_ids:
+                continue
+
+            if tempo.key == toggl.key \
+                    and tempo.startTime == toggl.startTime \
+                    and tempo.duration == toggl.duration:
+                return tempo
+
+        return None
+
+    def reconcile(self, toggl_worklogs: WorkLogCollection, second_ids: Dict[QualifiedId, int],
+                  fingerprints: Dict[QualifiedId, str] = None) -> ReconciliationResult:
+        """
+        Mappings and fingerprints are keyed by Toggl ids qualified by workspace, see WorkLog.qualified_id.
+        """
+        started_at = time.perf_counter()
+
+        if fingerprints is None:
+            fingerprints = {}
+
+        result = ReconciliationResult(toggl_worklogs)
+        self._mapped_second_ids.update(second_ids.values())
+
+        for toggl in toggl_worklogs:
+            if toggl.is_invalid:
+                toggl.state = WorkLogState.Incomplete
+                result.has_incomplete_worklog = True
+            else:
+                second_id = second_ids.get(toggl.qualified_id)
+                if second_id is not None:
+                    toggl.second_id = second_id
+
+                    # The same content was synced last time, so Tempo worklog isn't consulted at all
+                    fingerprint = fingerprints.get(toggl.qualified_id)
+                    if fingerprint is not None and fingerprint == toggl.fingerprint:
+                        toggl.state = WorkLogState.Synced
+                        result.counters[toggl.state] += 1
+                        continue
+
+                    tempo = self._by_second_id.get(second_id)
+                    if tempo is None:
+                        raise SyncException(f"Tempo worklog [TempoId={second_id}] doesn't exists")
+
+                    if self.worklog_was_moved(toggl, tempo):
+                        toggl.state = WorkLogState.Moved
+                    elif self.worklog_was_updated(toggl, tempo):
+                        toggl.state = WorkLogState.Updated
+                    else:
+                        toggl.state = WorkLogState.Synced
+                else:
+                    toggl.state = WorkLogState.New
+
+                    duplicate = self.find_unmapped_match(toggl)
+                    if duplicate is not None:
+                        toggl.tooltip = "Possibly already logged in Tempo: TempoId={0}\r\n" \
+                            .format(duplicate.second_id)
+
+            result.counters[toggl.state] += 1
+
+        result.elapsed = time.perf_counter() - started_at
+
+        logger.debug("Reconciled {count} worklogs against {tempo_count} Tempo worklogs in {elapsed:.1f} ms"
+                     .format(count=len(toggl_worklogs),
+                             tempo_count=len(self._by_second_id),
+                             elapsed=result.elapsed * 1000))
+
+        return result
+
+    @staticmethod
+    def worklog_was_moved(toggl: WorkLog, tempo: WorkLog):
+        is_moved = False
+        description_of_changes = ""
+
+        if tempo.key != toggl.key:
+            is_moved = True
+            description_of_changes += "Task key was changed: {0} -> {1}\r\n".format(tempo.key, toggl.key)
+
+        if is_moved:
+            toggl.tooltip = description_of_changes
+
+        return is_moved
+
+    @staticmethod
+    def worklog_was_updated(toggl: WorkLog, tempo: WorkLog):
+        is_updated = False
+        description_of_changes = ""
+
+        if tempo.activity != toggl.activity:
+            is_updated = True
+            description_of_changes += "Activity: {0} -> {1}\r\n".format(tempo.activity, toggl.activity)
+        if tempo.startTime != toggl.startTime:
+            is_updated = True
+            description_of_changes += "Start time: {0} -> {1}\r\n".format(tempo.startTime, toggl.startTime)
+        if tempo.duration != toggl.duration:
+            is_updated = True
+            description_of_changes += "Duration: {0} -> {1}\r\n".format(tempo.duration, toggl.duration)
+        if tempo.description != toggl.description:
+            is_updated = True
+            description_of_changes += "Description: {0} -> {1}\r\n".format(tempo.description, toggl.description)
+
+        if is_updated:
+            toggl.tooltip = description_of_changes
+
+        return is_updated
+
+
+class BatchReconciliationResult:
+    def __init__(self, states, counters: Dict[WorkLogState, int]):
+        # WorkLogState values of Toggl batch rows
+        self.states = states
+        self.counters = counters
+        self.elapsed = 0.0
+
+
+def reconcile_batches(toggl: WorkLogBatch, tempo: WorkLogBatch, second_ids: Dict[QualifiedId, int],
+                      use_numpy: bool = None) -> BatchReconciliationResult:
+    """
+    Classifies Toggl batch against Tempo batch column by column, NumPy is used when it's installed.
+    Unlike WorkLogReconciler, fingerprints and possible duplicates aren't checked.
+    """
+    if toggl.strings is not tempo.strings:
+        raise ValueError("Batches should share the same string table")
+
+    if use_numpy is None:
+        use_numpy = numpy is not None
+
+    started_at = time.perf_counter()
+
+    if use_numpy:
+        result = _reconcile_batches_by_numpy(toggl, tempo, second_ids)
+    else:
+        result = _reconcile_batches_by_arrays(toggl, tempo, second_ids)
+
+    result.elapsed = time.perf_counter() - started_at
+
+    logger.debug("Reconciled batch of {count} worklogs against {tempo_count} Tempo worklogs in {elapsed:.1f} ms"
+                 .format(count=len(toggl), tempo_count=len(tempo), elapsed=result.elapsed * 1000))
+
+    return result
+
+
+def _reconcile_batches_by_arrays(toggl: WorkLogBatch, tempo: WorkLogBatch, second_ids: Dict[QualifiedId, int]) \
+        -> BatchReconciliationResult:
+    tempo_rows = {second_id: row for row, second_id in enumerate(tempo.second_ids)}
+    mapped_ids = [second_ids.get(x, MISSING) for x in toggl.iter_qualified_ids()]
+
+    incomplete, new, moved, updated, synced = (WorkLogState.Incomplete.value, WorkLogState.New.value,
+                                               WorkLogState.Moved.value, WorkLogState.Updated.value,
+                                               WorkLogState.Synced.value)
+    states = array("b")
+
+    for second_id, key, activity, project, description, start_time, duration in zip(
+            mapped_ids, toggl.key_codes, toggl.activity_codes, toggl.project_codes, toggl.description_codes,
+            toggl.start_times, toggl.durations):
+        if key == MISSING or activity == MISSING or project == MISSING or description == MISSING or duration <= 0:
+            states.append(incomplete)
+        elif second_id == MISSING:
+            states.append(new)
+        else:
+            row = tempo_rows.get(second_id)
+            if row is None:
+                raise SyncException(f"Tempo worklog [TempoId={second_id}] doesn't exists")
+
+            if key != tempo.key_codes[row]:
+                states.append(moved)
+            elif activity != tempo.activity_codes[row] \
+                    or start_time != tempo.start_times[row] \
+                    or duration != tempo.durations[row] \
+                    or description != tempo.description_codes[row]:
+                states.append(updated)
+            else:
+                states.append(synced)
+
+    counters = {state: states.count(state.value) for state in WorkLogState}
+
+    return BatchReconciliationResult(states, counters)
+
+
+def _reconcile_batches_by_numpy(toggl: WorkLogBatch, tempo: WorkLogBatch, second_ids: Dict[QualifiedId, int]) \
+        -> BatchReconciliationResult:
+    t = toggl.to_numpy()
+    s = tempo.to_numpy()
+
+    mapped_ids = numpy.fromiter((second_ids.get(x, MISSING) for x in toggl.iter_qualified_ids()),
+                                dtype=numpy.int64, count=len(toggl))
+
+    invalid = (t["key_codes"] == MISSING) | (t["activity_codes"] == MISSING) | (t["project_codes"] == MISSING) \
+        | (t["description_codes"] == MISSING) | (t["durations"] <= 0)
+    is_mapped = (mapped_ids != MISSING) & ~invalid
+
+    found = numpy.zeros(len(toggl), dtype=bool)
+    moved = numpy.zeros(len(toggl), dtype=bool)
+    updated = numpy.zeros(len(toggl), dtype=bool)
+
+    if len(tempo):
+        # Tempo rows of mapped Toggl rows are found by binary search over sorted Tempo ids
+        order = numpy.argsort(s["second_ids"], kind="stable")
+        sorted_ids = s["second_ids"][order]
+        positions = numpy.minimum(numpy.searchsorted(sorted_ids, mapped_ids), len(tempo) - 1)
+        found = sorted_ids[positions] == mapped_ids
+        rows = order[positions]
+
+        moved = t["key_codes"] != s["key_codes"][rows]
+        updated = (t["activity_codes"] != s["activity_codes"][rows]) \
+            | (t["start_times"] != s["start_times"][rows]) \
+            | (t["durations"] != s["durations"][rows]) \
+            | (t["description_codes"] != s["description_codes"][rows])
+
+    missing = is_mapped & ~found
+    if missing.any():
+        raise SyncException(f"Tempo worklog [TempoId={mapped_ids[missing][0]}] doesn't exists")
+
+    states = numpy.full(len(toggl), WorkLogState.Synced.value, dtype=numpy.int8)
+    states[updated] = WorkLogState.Updated.value
+    states[moved] = WorkLogState.Moved.value
+    states[~is_mapped] = WorkLogState.New.value
+    states[invalid] = WorkLogState.Incomplete.value
+
+    counters = {state: int(numpy.count_nonzero(states == state.value)) for state in WorkLogState}
+
+    return BatchReconciliationResult(states, counters)
@@ -1,13 +1,70 @@
+import json
 import sqlite3
 
-from typing import Optional
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from j2toggl_core.app_paths import get_app_file_path
-from j2toggl_core.storage.storage import StorageBase
+from j2toggl_core.storage.storage import QualifiedId, StorageBase
 from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
 
 DATABASE_FILE_NAME = "toggl-sync.db"
 
+# Default SQLITE_MAX_VARIABLE_NUMBER for SQLite versions before 3.32.0
+MAX_QUERY_PARAMETERS = 999
+
+# Workspace of mappings stored before workspaces were supported and of worklogs without workspace
+UNKNOWN_WORKSPACE_ID = 0
+
+_INSERT_SYNC_KEY_SQL = "INSERT INTO sync_key (workspace_id, master_key, second_key, fingerprint) VALUES (?, ?, ?, ?)"
+_UPDATE_FINGERPRINT_SQL = "UPDATE sync_key SET fingerprint = ? WHERE workspace_id = ? AND master_key = ?"
+_REPLACE_SECOND_KEY_SQL = '''UPDATE sync_key SET second_key = ?, fingerprint = ?
+                             WHERE workspace_id = ? AND master_key = ? AND second_key = ?'''
+_DELETE_SYNC_KEY_SQL = "DELETE FROM sync_key WHERE workspace_id = ? AND master_key = ? AND second_key = ?"
+_UPSERT_TEMPO_WORKLOG_SQL = '''INSERT OR REPLACE INTO tempo_worklog
+                               (tempo_worklog_id, account_id, start_date, start_time, duration,
+                                issue_key, activity, description)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
+_INSERT_OPERATION_SQL = '''INSERT INTO sync_journal (operation, workspace_id, master_key, second_key, payload,
+                                                     created_at)
+                           VALUES (?, ?, ?, ?, ?, ?)'''
+
+WorkLogCollection = List[WorkLog]
+
+
+def _iter_days(start_date: date, end_date: date) -> Iterator[date]:
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+
+def _worklog_payload(wl: WorkLog) -> str:
+    return json.dumps({
+        "key": wl.key,
+        "activity": wl.activity,
+        "description": wl.description,
+        "startTime": wl.startTime.isoformat(),
+        "duration": wl.duration,
+    })
+
+
+def _workspace_id(wl: WorkLog) -> int:
+    return _stored_workspace_id(wl.workspace_id)
+
+
+def _stored_workspace_id(workspace_id: Optional[int]) -> int:
+    return workspace_id if workspace_id is not None else UNKNOWN_WORKSPACE_ID
+
+
+def _mirrored_worklog_row(account_id: str, wl: WorkLog) -> tuple:
+    start_time = wl.startTime.replace(tzinfo=None)
+
+    return (wl.second_id, account_id, start_time.date().isoformat(), start_time.isoformat(), wl.duration,
+            wl.key, wl.activity, wl.description)
+
 
 class SqliteStorage(StorageBase):
     # TODO: replace errors with more suitable!!!
@@ -21,48 +78,167 @@ class SqliteStorage(StorageBase):
                                     CONSTRAINT unique_second_key UNIQUE (second_key)
                                 )'''
 
-    def __init__(self):
+    # Schema changes after the initial version, index + 1 is stored in "user_version" pragma
+    __migrations = [
+        # 1: Local mirror of Tempo worklogs
+        [
+            '''CREATE TABLE tempo_worklog
+               (
+                   tempo_worklog_id integer NOT NULL PRIMARY KEY,
+                   account_id text NOT NULL,
+                   start_date text NOT NULL,
+                   start_time text NOT NULL,
+                   duration integer NOT NULL,
+                   issue_key text,
+                   activity text,
+                   description text
+               )''',
+            "CREATE INDEX ix_tempo_worklog_start_date ON tempo_worklog (account_id, start_date)",
+            '''CREATE TABLE tempo_mirror_day
+               (
+                   account_id text NOT NULL,
+                   day text NOT NULL,
+                   revalidated_at text NOT NULL,
+                   CONSTRAINT pk_tempo_mirror_day PRIMARY KEY (account_id, day)
+               )''',
+        ],
+        # 2: Fingerprint of the last synced worklog content, see WorkLog.fingerprint
+        [
+            "ALTER TABLE sync_key ADD COLUMN fingerprint text",
+        ],
+        # 3: Journal of Tempo operations which are started, but not completed yet
+        [
+            '''CREATE TABLE sync_journal
+               (
+                   operation_id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+                   operation text NOT NULL,
+                   master_key integer NOT NULL,
+                   second_key integer,
+                   payload text NOT NULL,
+                   created_at text NOT NULL
+               )''',
+        ],
+        # 4: Toggl ids are qualified by workspace, the existing ones get the unknown workspace
+        [
+            '''CREATE TABLE sync_key_v4
+               (
+                   workspace_id integer NOT NULL,
+                   master_key integer NOT NULL,
+                   second_key integer NOT NULL,
+                   fingerprint text,
+                   CONSTRAINT pk_sync_key PRIMARY KEY (workspace_id, master_key),
+                   CONSTRAINT unique_second_key UNIQUE (second_key)
+               )''',
+            f'''INSERT INTO sync_key_v4 (workspace_id, master_key, second_key, fingerprint)
+                SELECT {UNKNOWN_WORKSPACE_ID}, master_key, second_key, fingerprint FROM sync_key''',
+            "DROP TABLE sync_key",
+            "ALTER TABLE sync_key_v4 RENAME TO sync_key",
+            "CREATE INDEX ix_sync_key_master_key ON sync_key (master_key)",
+            f"ALTER TABLE sync_journal ADD COLUMN workspace_id integer NOT NULL DEFAULT {UNKNOWN_WORKSPACE_ID}",
+        ],
+    ]
+
+    # WAL keeps readers unblocked and with synchronous=NORMAL fsync occurs only on checkpoints
+    __connection_pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    def __init__(self, database_path: Path = None):
+        self._database_path = database_path
         self._conn = None
 
+        # Pending changes of the current transaction, see transaction()
+        self._pending: Optional[List[Tuple[str, tuple]]] = None
+        self._chunk_size: Optional[int] = None
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self._conn:
             self._conn.close()
             self._conn = None
 
     def open(self):
-        storage_path = get_app_file_path(DATABASE_FILE_NAME)
+        if self._conn:
+            return
+
+        if self._database_path is not None:
+            storage_path = Path(self._database_path)
+        else:
+            storage_path = get_app_file_path(DATABASE_FILE_NAME)
 
         db_exists = storage_path.exists() and storage_path.is_file()
         self._conn = sqlite3.connect(str(storage_path))
 
+        for pragma in self.__connection_pragmas:
+            self._conn.execute(pragma)
+
         if not db_exists:
             self._conn.execute(self.__database_init_script)
             self._conn.commit()
 
+        self._migrate()
+
+    def _migrate(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for index in range(version, len(self.__migrations)):
+            with self._conn:
+                # sqlite3 begins transaction implicitly only before DML, so without explicit one
+                # DDL statements would be committed one by one and a crash would leave the migration half-done
+                self._conn.execute("BEGIN")
+                for statement in self.__migrations[index]:
+                    self._conn.execute(statement)
+                self._conn.execute(f"PRAGMA user_version = {index + 1}")
+
     def close(self):
         if self._conn:
             self._conn.close()
             self._conn = None
 
+    @contextmanager
+    def transaction(self, chunk_size: int = None):
+        if self._pending is not None:
+            raise RuntimeError("Nested storage transactions aren't supported")
+
+        self._pending = []
+        self._chunk_size = chunk_size
+        try:
+            yield self
+        finally:
+            # Pending changes reflect requests which were already done in Tempo,
+            # so they are committed even if sync was interrupted by an error.
+            try:
+                self._flush()
+                self._conn.commit()
+            finally:
+                self._pending = None
+                self._chunk_size = None
+
     def add(self, worklog: WorkLog):
         if worklog.master_id is None or worklog.second_id is None:
             raise TypeError()
 
-        self._conn.execute('''INSERT INTO sync_key (master_key, second_key) VALUES (?, ?)''',
-                           (worklog.master_id, worklog.second_id))
-        self._conn.commit()
+        self._execute(_INSERT_SYNC_KEY_SQL,
+                      (_workspace_id(worklog), worklog.master_id, worklog.second_id, worklog.fingerprint))
 
-    def get_second_id(self, master_id: int) -> Optional[int]:
-        cur = self._conn.cursor()
-        cur.execute("SELECT second_key FROM sync_key WHERE master_key = ?", (master_id,))
-        result = cur.fetchone()
+    def assign_unknown_workspace(self, workspace_id: int):
+        self._flush()
 
-        if result is not None:
-            return result[0]
+        with self._conn:
+            for table in ("sync_key", "sync_journal"):
+                self._conn.execute(f"UPDATE {table} SET workspace_id = ? WHERE workspace_id = ?",
+                                   (workspace_id, UNKNOWN_WORKSPACE_ID))
 
-        return None
+    def get_second_id(self, master_id: int, workspace_id: int = None) -> Optional[int]:
+        return self.get_second_ids([master_id], workspace_id).get(master_id)
+
+    def get_second_ids(self, master_ids: Iterable[int], workspace_id: int = None) -> Dict[int, int]:
+        return self._select_mappings("master_key", "second_key", master_ids, _stored_workspace_id(workspace_id))
 
     def get_master_id(self, second_id: int) -> Optional[int]:
+        self._flush()
+
         cur = self._conn.cursor()
         cur.execute("SELECT master_key FROM sync_key WHERE second_key = ?", (second_id,))
         result = cur.fetchone()
@@ -72,7 +248,177 @@ class SqliteStorage(StorageBase):
 
         return None
 
+    def get_master_ids(self, second_ids: Iterable[int]) -> Dict[int, int]:
+        return self._select_mappings("second_key", "master_key", second_ids)
+
+    def get_fingerprints(self, master_ids: Iterable[int], workspace_id: int = None) -> Dict[int, str]:
+        return self._select_mappings("master_key", "fingerprint", master_ids, _stored_workspace_id(workspace_id))
+
+    def update_fingerprints(self, worklogs: WorkLogCollection):
+        for wl in worklogs:
+            self._execute(_UPDATE_FINGERPRINT_SQL, (wl.fingerprint, _workspace_id(wl), wl.master_id))
+
+    def replace_second_id(self, worklog: WorkLog, previous_second_id: int):
+        # Single statement, so the mapping is never lost between delete and insert
+        self._execute(_REPLACE_SECOND_KEY_SQL, (worklog.second_id, worklog.fingerprint,
+                                                _workspace_id(worklog), worklog.master_id, previous_second_id))
+
     def delete(self, worklog: WorkLog):
+        self._execute(_DELETE_SYNC_KEY_SQL, (_workspace_id(worklog), worklog.master_id, worklog.second_id))
+
+    def begin_operations(self, worklogs: WorkLogCollection) -> Dict[QualifiedId, int]:
+        self._flush()
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        operation_ids = {}
+
+        # Operations must be durable before any request is sent, so they are committed immediately
+        with self._conn:
+            for wl in worklogs:
+                cur = self._conn.execute(_INSERT_OPERATION_SQL, (wl.state.name, _workspace_id(wl), wl.master_id,
+                                                                 wl.second_id, _worklog_payload(wl), created_at))
+                operation_ids[wl.qualified_id] = cur.lastrowid
+
+        return operation_ids
+
+    def complete_operation(self, operation_id: int):
+        self._execute("DELETE FROM sync_journal WHERE operation_id = ?", (operation_id,))
+
+    def get_pending_operations(self) -> List[Tuple[int, WorkLog]]:
+        self._flush()
+
+        cur = self._conn.cursor()
+        cur.execute("SELECT operation_id, operation, workspace_id, master_key, second_key, payload"
+                    " FROM sync_journal ORDER BY operation_id")
+
+        operations = []
+        for operation_id, operation, workspace_id, master_key, second_key, payload in cur.fetchall():
+            data = json.loads(payload)
+
+            wl = WorkLog()
+            wl.state = WorkLogState[operation]
+            wl.workspace_id = workspace_id if workspace_id != UNKNOWN_WORKSPACE_ID else None
+            wl.master_id = master_key
+            wl.second_id = second_key
+            wl.key = data["key"]
+            wl.activity = data["activity"]
+            wl.description = data["description"]
+            wl.startTime = datetime.fromisoformat(data["startTime"])
+            wl.duration = data["duration"]
+            wl.endTime = wl.startTime + timedelta(seconds=wl.duration)
+            operations.append((operation_id, wl))
+
+        return operations
+
+    def get_mirrored_worklogs(self, account_id: str, start_date: date, end_date: date) \
+            -> Optional[Tuple[WorkLogCollection, datetime]]:
+        self._flush()
+
+        days_count = (end_date - start_date).days + 1
+
+        cur = self._conn.cursor()
+        cur.execute("SELECT COUNT(*), MIN(revalidated_at) FROM tempo_mirror_day"
+                    " WHERE account_id = ? AND day BETWEEN ? AND ?",
+                    (account_id, start_date.isoformat(), end_date.isoformat()))
+        mirrored_days_count, revalidated_at = cur.fetchone()
+        if mirrored_days_count < days_count:
+            return None
+
+        cur.execute("SELECT tempo_worklog_id, issue_key, activity, start_time, duration, description"
+                    " FROM tempo_worklog WHERE account_id = ? AND start_date BETWEEN ? AND ?",
+                    (account_id, start_date.isoformat(), end_date.isoformat()))
+
+        worklogs = []
+        for second_id, key, activity, start_time, duration, description in cur.fetchall():
+            wl = WorkLog()
+            wl.second_id = second_id
+            wl.key = key
+            wl.activity = activity
+            wl.description = description
+            wl.startTime = datetime.fromisoformat(start_time)
+            wl.endTime = wl.startTime + timedelta(seconds=duration)
+            wl.duration = duration
+            worklogs.append(wl)
+
+        return worklogs, datetime.fromisoformat(revalidated_at)
+
+    def save_mirrored_worklogs(self, account_id: str, worklogs: WorkLogCollection):
+        for wl in worklogs:
+            self._execute(_UPSERT_TEMPO_WORKLOG_SQL, _mirrored_worklog_row(account_id, wl))
+
+    def delete_mirrored_worklog(self, second_id: int):
+        self._execute("DELETE FROM tempo_worklog WHERE tempo_worklog_id = ?", (second_id,))
+
+    def replace_mirrored_days(self, account_id: str, start_date: date, end_date: date,
+                              worklogs: WorkLogCollection, revalidated_at: datetime):
+        self._flush()
+
+        with self._conn:
+            self._conn.execute("DELETE FROM tempo_worklog WHERE account_id = ? AND start_date BETWEEN ? AND ?",
+                               (account_id, start_date.isoformat(), end_date.isoformat()))
+            self._conn.executemany(_UPSERT_TEMPO_WORKLOG_SQL, [_mirrored_worklog_row(account_id, x) for x in worklogs])
+            self._touch_mirrored_days(account_id, start_date, end_date, revalidated_at)
+
+    def update_mirrored_days(self, account_id: str, start_date: date, end_date: date,
+                             worklogs: WorkLogCollection, revalidated_at: datetime):
+        self._flush()
+
+        with self._conn:
+            self._conn.executemany(_UPSERT_TEMPO_WORKLOG_SQL, [_mirrored_worklog_row(account_id, x) for x in worklogs])
+            self._touch_mirrored_days(account_id, start_date, end_date, revalidated_at)
+
+    def _touch_mirrored_days(self, account_id: str, start_date: date, end_date: date, revalidated_at: datetime):
+        self._conn.executemany("INSERT OR REPLACE INTO tempo_mirror_day (account_id, day, revalidated_at)"
+                               " VALUES (?, ?, ?)",
+                               [(account_id, x.isoformat(), revalidated_at.isoformat())
+                                for x in _iter_days(start_date, end_date)])
+
+    def _select_mappings(self, key_column: str, value_column: str, keys: Iterable[int],
+                         workspace_id: int = None) -> Dict[int, int]:
+        self._flush()
+
+        keys = list(keys)
+        result = {}
+
+        # Toggl ids of different workspaces can be the same, so they are looked up only in one of them.
+        # Tempo ids are unique, so they are looked up without workspace.
+        if workspace_id is not None:
+            condition, parameters = "workspace_id = ? AND ", [workspace_id]
+        else:
+            condition, parameters = "", []
+
+        chunk_size = MAX_QUERY_PARAMETERS - len(parameters)
+
         cur = self._conn.cursor()
-        cur.execute("DELETE FROM sync_key WHERE master_key = ? AND second_key = ?",
-                    (worklog.master_id, worklog.second_id,))
+        for offset in range(0, len(keys), chunk_size):
+            chunk = keys[offset:offset + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+
+            cur.execute(f"SELECT {key_column}, {value_column} FROM sync_key"
+                        f" WHERE {condition}{key_column} IN ({placeholders})",
+                        parameters + chunk)
+            result.update(cur.fetchall())
+
+        return result
+
+    def _execute(self, sql: str, parameters: tuple):
+        if self._pending is None:
+            self._conn.execute(sql, parameters)
+            self._conn.commit()
+            return
+
+        self._pending.append((sql, parameters))
+
+        if self._chunk_size is not None and len(self._pending) >= self._chunk_size:
+            self._flush()
+            self._conn.commit()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        # Keep order of operations, but send each run of the same statement as one batch
+        for sql, group in groupby(self._pending, key=lambda x: x[0]):
+            self._conn.executemany(sql, [parameters for _, parameters in group])
+
+        self._pending.clear()
@@ -1,15 +1,104 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from j2toggl_core.worklog import WorkLog
 
+WorkLogCollection = List[WorkLog]
+
+# Toggl id qualified by its workspace: (workspace_id, master_id)
+QualifiedId = Tuple[Optional[int], int]
+
+
+def group_by_workspace(ids: Iterable[QualifiedId]) -> Dict[Optional[int], List[int]]:
+    # Toggl ids are stored qualified by workspace, so they are looked up workspace by workspace
+    groups = defaultdict(list)
+    for workspace_id, master_id in ids:
+        groups[workspace_id].append(master_id)
+
+    return groups
+
 
 class StorageBase:
+    def open(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def transaction(self, chunk_size: int = None):
+        raise NotImplementedError
+
     def add(self, worklog: WorkLog):
         raise NotImplementedError
 
-    def get_second_id(self, master_id: int) -> int:
+    def assign_unknown_workspace(self, workspace_id: int):
+        raise NotImplementedError
+
+    # Toggl ids without workspace belong to the unknown one, see assign_unknown_workspace
+    def get_second_id(self, master_id: int, workspace_id: int = None) -> int:
         raise NotImplementedError
 
+    def get_second_ids(self, master_ids: Iterable[int], workspace_id: int = None) -> Dict[int, int]:
+        raise NotImplementedError
+
+    def get_qualified_second_ids(self, ids: Iterable[QualifiedId]) -> Dict[QualifiedId, int]:
+        result = {}
+        for workspace_id, master_ids in group_by_workspace(ids).items():
+            result.update(((workspace_id, master_id), second_id)
+                          for master_id, second_id in self.get_second_ids(master_ids, workspace_id).items())
+
+        return result
+
     def get_master_id(self, second_id: int) -> int:
         raise NotImplementedError
 
+    def get_master_ids(self, second_ids: Iterable[int]) -> Dict[int, int]:
+        raise NotImplementedError
+
+    def get_fingerprints(self, master_ids: Iterable[int], workspace_id: int = None) -> Dict[int, str]:
+        raise NotImplementedError
+
+    def get_qualified_fingerprints(self, ids: Iterable[QualifiedId]) -> Dict[QualifiedId, str]:
+        result = {}
+        for workspace_id, master_ids in group_by_workspace(ids).items():
+            result.update(((workspace_id, master_id), fingerprint)
+                          for master_id, fingerprint in self.get_fingerprints(master_ids, workspace_id).items())
+
+        return result
+
+    def update_fingerprints(self, worklogs: WorkLogCollection):
+        raise NotImplementedError
+
+    def replace_second_id(self, worklog: WorkLog, previous_second_id: int):
+        raise NotImplementedError
+
     def delete(self, worklog: WorkLog):
         raise NotImplementedError
+
+    def begin_operations(self, worklogs: WorkLogCollection) -> Dict[QualifiedId, int]:
+        raise NotImplementedError
+
+    def complete_operation(self, operation_id: int):
+        raise NotImplementedError
+
+    def get_pending_operations(self) -> List[Tuple[int, WorkLog]]:
+        raise NotImplementedError
+
+    def get_mirrored_worklogs(self, account_id: str, start_date: date, end_date: date) \
+            -> Optional[Tuple[WorkLogCollection, datetime]]:
+        raise NotImplementedError
+
+    def save_mirrored_worklogs(self, account_id: str, worklogs: WorkLogCollection):
+        raise NotImplementedError
+
+    def delete_mirrored_worklog(self, second_id: int):
+        raise NotImplementedError
+
+    def replace_mirrored_days(self, account_id: str, start_date: date, end_date: date,
+                              worklogs: WorkLogCollection, revalidated_at: datetime):
+        raise NotImplementedError
+
+    def update_mirrored_days(self, account_id: str, start_date: date, end_date: date,
+                             worklogs: WorkLogCollection, revalidated_at: datetime):
+        raise NotImplementedError
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Dict, List
+
+from j2toggl_core.push_result import PushResult
+from j2toggl_core.reconciliation import ReconciliationResult, WorkLogReconciler
+from j2toggl_core.storage.storage import QualifiedId, StorageBase
+from j2toggl_core.sync_journal import SyncJournal
+from j2toggl_core.tempo_mirror import TempoMirror
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+WorkLogCollection = List[WorkLog]
+
+
+class SyncBookkeeping:
+    """
+    Storage side of a sync shared by SyncManager and AsyncSyncManager: reconciliation with stored mappings,
+    the journal of Tempo operations and the Tempo mirror. It must be used only by the thread owning storage.
+    """
+
+    def __init__(self, storage: StorageBase, tempo_mirror: TempoMirror):
+        self._storage = storage
+        self._tempo_mirror = tempo_mirror
+        self._journal = SyncJournal(storage)
+        self._operation_ids: Dict[QualifiedId, int] = {}
+
+    def create_reconciler(self, tempo_worklogs: WorkLogCollection) -> WorkLogReconciler:
+        mapped_second_ids = self._storage.get_master_ids(x.second_id for x in tempo_worklogs).keys()
+
+        return WorkLogReconciler(tempo_worklogs, mapped_second_ids)
+
+    def resume_journal(self, reconciler: WorkLogReconciler, start_date: date, end_date: date) -> int:
+        # Reconciler must keep completely reloaded Tempo worklogs, see TempoMirrorLoad.is_full_reload
+        return self._journal.resume(reconciler, start_date, end_date)
+
+    def reconcile(self, reconciler: WorkLogReconciler, toggl_worklogs: WorkLogCollection) -> ReconciliationResult:
+        # Mappings are keyed by Toggl ids with workspaces, the same id of another workspace is another worklog
+        ids = [x.qualified_id for x in toggl_worklogs if not x.is_invalid]
+        second_ids = self._storage.get_qualified_second_ids(ids)
+        fingerprints = self._storage.get_qualified_fingerprints(ids)
+
+        result = reconciler.reconcile(toggl_worklogs, second_ids, fingerprints)
+
+        # Worklogs synced before fingerprints were introduced get them after the first comparison with Tempo
+        outdated_fingerprints = [x for x in toggl_worklogs
+                                 if x.state == WorkLogState.Synced and fingerprints.get(x.qualified_id) != x.fingerprint]
+        if outdated_fingerprints:
+            with self._storage.transaction():
+                self._storage.update_fingerprints(outdated_fingerprints)
+
+        return result
+
+    def begin_push(self, worklogs: WorkLogCollection):
+        # All operations are journaled before the first request
+        self._operation_ids = self._journal.begin(worklogs)
+
+    def record_push(self, result: PushResult):
+        if result.removed_mapping is not None:
+            self._storage.delete(result.removed_mapping)
+        if result.moved_from is not None:
+            self._storage.replace_second_id(result.worklog, result.moved_from.second_id)
+        elif result.is_mapped:
+            self._storage.add(result.worklog)
+        elif result.counter == "updated":
+            self._storage.update_fingerprints([result.worklog])
+
+        self._tempo_mirror.record_push(result)
+        self._journal.complete(self._operation_ids[result.worklog.qualified_id])
@@ -0,0 +1,83 @@
+from datetime import date
+from typing import Dict, List
+
+from loguru import logger
+
+from j2toggl_core.reconciliation import WorkLogReconciler
+from j2toggl_core.storage.storage import QualifiedId, StorageBase
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+WorkLogCollection = List[WorkLog]
+
+
+class SyncJournal:
+    """
+    Write-ahead journal of Tempo operations.
+    Every operation is recorded before its request is sent and removed together with its mapping changes,
+    so operations interrupted by a crash can be reconciled with Tempo on the next run.
+    """
+
+    def __init__(self, storage: StorageBase):
+        self._storage = storage
+
+    def begin(self, worklogs: WorkLogCollection) -> Dict[QualifiedId, int]:
+        # Operation ids are keyed by WorkLog.qualified_id
+        return self._storage.begin_operations(worklogs)
+
+    def complete(self, operation_id: int):
+        self._storage.complete_operation(operation_id)
+
+    def resume(self, reconciler: WorkLogReconciler, start_date: date, end_date: date) -> int:
+        """
+        Reconciles interrupted operations of worklogs started within the dates loaded by the reconciler.
+        Tempo worklogs of other dates are unknown, so their operations are left for a later sync of those dates.
+        """
+        operations = [(operation_id, wl) for operation_id, wl in self._storage.get_pending_operations()
+                      if start_date <= wl.startTime.date() <= end_date]
+        if not operations:
+            return 0
+
+        with self._storage.transaction():
+            for operation_id, wl in operations:
+                if wl.state == WorkLogState.New:
+                    self._resume_add(reconciler, wl)
+                elif wl.state == WorkLogState.Moved:
+                    self._resume_move(reconciler, wl)
+
+                # Interrupted update is detected again by fingerprint, since it's changed only on completion
+                self.complete(operation_id)
+
+        logger.info(f"Sync journal: {len(operations)} interrupted operation(s) were reconciled with Tempo")
+
+        return len(operations)
+
+    def _resume_add(self, reconciler: WorkLogReconciler, wl: WorkLog):
+        if self._storage.get_second_id(wl.master_id, wl.workspace_id) is not None:
+            return
+
+        # Tempo worklog could be created before crash, then only its mapping is lost
+        tempo = reconciler.find_unmapped_match(wl)
+        if tempo is not None:
+            wl.second_id = tempo.second_id
+            self._storage.add(wl)
+            reconciler.mark_mapped(tempo.second_id)
+
+    def _resume_move(self, reconciler: WorkLogReconciler, wl: WorkLog):
+        if reconciler.get_by_second_id(wl.second_id) is not None:
+            # Tempo worklog wasn't deleted, the mapping is still correct. Move keeps id, when it's done by update
+            return
+
+        if self._storage.get_master_ids([wl.second_id]).get(wl.second_id) != wl.master_id:
+            # The mapping was already replaced
+            return
+
+        # Operation is within the loaded dates, so the missing worklog was deleted from Tempo
+        self._storage.delete(wl)
+
+        # Tempo worklog was deleted, but maybe re-added too
+        tempo = reconciler.find_unmapped_match(wl)
+        if tempo is not None:
+            wl.second_id = tempo.second_id
+            self._storage.add(wl)
+            reconciler.mark_mapped(tempo.second_id)
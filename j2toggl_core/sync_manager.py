@@ -1,15 +1,27 @@
+import copy
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt5.QtCore import QObject
 from PyQt5.QtCore import pyqtSignal
 from loguru import logger
+from time import perf_counter
 
 from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.net.http_transport import default_transport
 from j2toggl_core.configuration.config import Config
 from j2toggl_core.utils.datetime_utils import *
+from j2toggl_core.push_result import PushResult
+from j2toggl_core.reconciliation import reconcile_batches
 from j2toggl_core.storage.sqlite_storage import SqliteStorage
+from j2toggl_core.storage.storage import StorageBase
+from j2toggl_core.sync_bookkeeping import SyncBookkeeping
+from j2toggl_core.sync_plan import SyncPlan
 from j2toggl_core.tempo_api_client import TempoClient
-from j2toggl_core.toggl_api_client import TogglClient
+from j2toggl_core.tempo_mirror import TempoMirror
+from j2toggl_core.toggl_api_client import create_toggl_client
 from j2toggl_core.worklog import WorkLog
-from typing import List
+from j2toggl_core.worklog_batch import MISSING, StringTable, WorkLogBatch
+from typing import Callable, Dict, Iterator, List, Optional
 
 from j2toggl_core.worklog_state import WorkLogState
 
@@ -20,19 +32,29 @@ class SyncManager(QObject):
     changeStatus = pyqtSignal(str)
     showMessage = pyqtSignal(str, str, str)
     showWorklogList = pyqtSignal(list)
+    appendWorklogList = pyqtSignal(list)
+
+    # Mappings are committed in chunks to bound the work lost on crash of long sync
+    STORAGE_COMMIT_CHUNK_SIZE = 50
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, storage: StorageBase = None):
         super().__init__()
 
         self.config = config
-        self.toggl_client = TogglClient(self.config.toggl)
+        self.toggl_client = create_toggl_client(self.config.toggl)
         self.tempo_client = TempoClient(self.config.jira, self.config.tempo)
 
         # Init storage
-        self.storage = SqliteStorage()
+        self.storage = storage if storage is not None else SqliteStorage()
         self.storage.open()
         self.storage.close()
 
+        # Plan of the last load, it's applied by the next sync of the same dates
+        self.last_plan: Optional[SyncPlan] = None
+
+        # Counters of the last applied plan: added, updated, skipped and failed worklogs
+        self.last_counters: Dict[str, int] = {}
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.storage.close()
 
@@ -40,123 +62,224 @@ class SyncManager(QObject):
         if not self._login():
             return False
 
-        start_datetime = date2datetime(start_date)
-        end_datetime = date2datetime(end_date)
+        return self._run(lambda: self._sync_range(start_date, end_date, only_load))
 
-        try:
-            self.changeStatus.emit("Load worklogs from Tempo...")
-            worklogs_from_tempo = self.tempo_client.get_worklogs(start_datetime, end_datetime)
+    def apply(self, plan: SyncPlan) -> bool:
+        if not self._login():
+            return False
 
-            self.changeStatus.emit("Load worklogs from Toggl...")
-            worklogs_from_toggl = self.toggl_client.get_detailed_report(start_datetime, end_datetime)
+        def apply_plan():
+            if not self._plan_can_be_applied(plan, plan.start_date, plan.end_date):
+                raise SyncException("Sync plan is outdated, please load worklogs again")
 
-            # TODO: Add prepare search by issue keys to check that all tasks exist
-            self._calculate_worklogs_statuses(
-                toggl_worklogs=worklogs_from_toggl,
-                tempo_worklogs=worklogs_from_tempo)
+            self._apply_plan(plan)
+            return True
 
-            self.showWorklogList.emit(worklogs_from_toggl)
+        return self._run(apply_plan)
 
-            if only_load:
-                self.changeStatus.emit("Load completed.")
-                return False
+    def count_worklog_states(self, start_date: date, end_date: date) -> Optional[Dict[WorkLogState, int]]:
+        # Worklogs of big reports are compared as columnar batches without WorkLog objects and aren't shown
+        if not self._login():
+            return None
+
+        counters = None
+
+        def count():
+            nonlocal counters
+            counters = self._count_worklog_states(date2datetime(start_date), date2datetime(end_date))
+            return True
+
+        self._run(count)
 
-            self._sync_impl(worklogs_from_toggl)
+        return counters
+
+    def _run(self, action: Callable[[], bool]) -> bool:
+        default_transport.configure(self.config.network)
+
+        # Keep one storage connection for the whole sync
+        self.storage.open()
+
+        try:
+            # Mappings stored before workspaces were supported belong to the workspace which was synced then
+            if self.toggl_client.primary_workspace_id is not None:
+                self.storage.assign_unknown_workspace(self.toggl_client.primary_workspace_id)
+
+            return action()
         except SyncException as sync_exception:
             error_message = f"Sync error occurred: {sync_exception.message}."
             logger.error(error_message)
             self.changeStatus.emit(error_message)
             return False
+        finally:
+            self.storage.close()
+            default_transport.scheduler.log_statistics()
+
+    def _sync_range(self, start_date: date, end_date: date, only_load: bool) -> bool:
+        plan = self.last_plan
+
+        # Plan of the previous load is applied without loading worklogs again.
+        # Plan which is applied at once is made from all Tempo worklogs, so it doesn't need revalidation.
+        if only_load or not self._plan_can_be_applied(plan, start_date, end_date):
+            plan = self._load_plan(start_date, end_date, full_tempo_reload=not only_load)
+
+        if only_load:
+            self.changeStatus.emit("Load completed.")
+            return True
+
+        self._apply_plan(plan)
 
         return True
 
+    def _plan_can_be_applied(self, plan: Optional[SyncPlan], start_date: date, end_date: date) -> bool:
+        return plan is not None \
+            and plan.start_date == start_date \
+            and plan.end_date == end_date \
+            and plan.is_fresh(self.storage) \
+            and (plan.is_tempo_reloaded or self._revalidate_tempo(plan))
+
+    def _revalidate_tempo(self, plan: SyncPlan) -> bool:
+        self.changeStatus.emit("Check worklogs in Tempo...")
+
+        start_datetime = date2datetime(plan.start_date)
+        end_datetime = date2datetime(plan.end_date)
+
+        tempo_mirror = TempoMirror(self.tempo_client, self.storage)
+        tempo_load = tempo_mirror.begin_load(start_datetime, end_datetime, full_reload=True)
+        worklogs_from_tempo = self._load_worklogs_from("Tempo", tempo_load.iter_worklogs, start_datetime, end_datetime)
+
+        return tempo_mirror.complete_revalidation(tempo_load, worklogs_from_tempo)
+
+    def _load_plan(self, start_date: date, end_date: date, full_tempo_reload: bool = False) -> SyncPlan:
+        # TODO: Add prepare search by issue keys to check that all tasks exist
+        worklogs, is_tempo_reloaded = self._load_worklogs(date2datetime(start_date), date2datetime(end_date),
+                                                          full_tempo_reload)
+
+        self.last_plan = SyncPlan.create(start_date, end_date, worklogs, self.storage, is_tempo_reloaded)
+
+        return self.last_plan
+
+    def _apply_plan(self, plan: SyncPlan):
+        self.last_plan = None
+        self._sync_impl(plan)
+
     def _login(self):
-        # Login Toggl
-        self.changeStatus.emit("Toggl authentication...")
-        if not self.toggl_client.login():
+        self.changeStatus.emit("Toggl and JIRA authentication...")
+
+        # Both services are independent, so log in them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            toggl_future = executor.submit(self.toggl_client.login)
+            tempo_future = executor.submit(self.tempo_client.login)
+
+            toggl_logged_in = toggl_future.result()
+            tempo_logged_in = tempo_future.result()
+
+        if not toggl_logged_in:
             self.changeStatus.emit("Sorry, Toggl authentication failed. Please check log for more details.")
             return False
 
-        # Login JIRA Tempo
-        self.changeStatus.emit("JIRA authentication...")
-        if not self.tempo_client.login():
+        if not tempo_logged_in:
             self.changeStatus.emit("Sorry, JIRA authentication failed. Please check log for more details.")
             return False
 
         return True
 
-    def _calculate_worklogs_statuses(self, toggl_worklogs: WorkLogCollection, tempo_worklogs: WorkLogCollection):
-        has_incomplete_worklog = False
+    def _load_worklogs(self, start_datetime: datetime, end_datetime: datetime, full_tempo_reload: bool = False) \
+            -> (WorkLogCollection, bool):
+        self.changeStatus.emit("Load worklogs from Tempo and Toggl...")
+        self.showWorklogList.emit([])
 
-        self.storage.open()
+        started_at = perf_counter()
+        worklogs_from_toggl = []
+        reconciler = None
 
-        for toggl in toggl_worklogs:
-            if toggl.is_invalid:
-                toggl.state = WorkLogState.Incomplete
-                has_incomplete_worklog = True
-            else:
-                second_id = self.storage.get_second_id(toggl.master_id)
-                if second_id is not None:
-                    toggl.second_id = second_id
-
-                    tempo = next((x for x in tempo_worklogs if x.second_id == second_id), None)
-                    if tempo is None:
-                        raise SyncException(f"Tempo worklog [TempoId={second_id}] doesn't exists")
-
-                    if self._worklog_was_moved(toggl, tempo):
-                        toggl.state = WorkLogState.Moved
-                    elif self._worklog_was_updated(toggl, tempo):
-                        toggl.state = WorkLogState.Updated
-                    else:
-                        toggl.state = WorkLogState.Synced
-                else:
-                    toggl.state = WorkLogState.New
+        # Mirrored Tempo worklogs are read here, because storage can be used only by this thread
+        tempo_mirror = TempoMirror(self.tempo_client, self.storage)
+        tempo_load = tempo_mirror.begin_load(start_datetime, end_datetime, full_tempo_reload)
+        bookkeeping = SyncBookkeeping(self.storage, tempo_mirror)
 
-        self.storage.close()
+        # Tempo is loaded in background, while Toggl pages are reconciled and shown one by one
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tempo_future = executor.submit(self._load_worklogs_from, "Tempo", tempo_load.iter_worklogs,
+                                           start_datetime, end_datetime)
+
+            for page in self._iter_worklogs_from("Toggl", self.toggl_client.iter_detailed_report,
+                                                 start_datetime, end_datetime):
+                if reconciler is None:
+                    worklogs_from_tempo = tempo_mirror.complete_load(tempo_load, tempo_future.result())
+                    reconciler = bookkeeping.create_reconciler(worklogs_from_tempo)
+
+                    # Mirror keeps worklogs deleted since its revalidation, so interrupted operations are
+                    # reconciled only with completely reloaded Tempo worklogs and wait for such load otherwise
+                    if tempo_load.is_full_reload:
+                        resumed_count = bookkeeping.resume_journal(reconciler, start_datetime.date(),
+                                                                   end_datetime.date())
+                        if resumed_count:
+                            self.changeStatus.emit(f"Reconciled {resumed_count} operation(s) interrupted last time.")
+
+                bookkeeping.reconcile(reconciler, page)
+
+                if not worklogs_from_toggl and page:
+                    logger.debug("First worklogs are shown in {0:.0f} ms".format((perf_counter() - started_at) * 1000))
+
+                worklogs_from_toggl.extend(page)
+                self.appendWorklogList.emit(page)
 
-        return has_incomplete_worklog
+        # Executor waits for both sides, so an error of one side doesn't leave another one running
+        tempo_future.result()
 
-    @staticmethod
-    def _worklog_was_moved(toggl: WorkLog, tempo: WorkLog):
-        is_moved = False
-        description_of_changes = ""
+        return worklogs_from_toggl, tempo_load.is_full_reload
 
-        if tempo.key != toggl.key:
-            is_moved = True
-            description_of_changes += "Task key was changed: {0} -> {1}\r\n".format(tempo.key, toggl.key)
+    def _count_worklog_states(self, start_datetime: datetime, end_datetime: datetime) -> Dict[WorkLogState, int]:
+        self.changeStatus.emit("Load worklogs from Tempo and Toggl...")
 
-        if is_moved:
-            toggl.tooltip = description_of_changes
+        # Both batches share string codes, so keys and activities are compared as integers
+        strings = StringTable()
 
-        return is_moved
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tempo_future = executor.submit(self.tempo_client.get_worklogs_batch, start_datetime, end_datetime,
+                                           WorkLogBatch(strings))
+            toggl_batch = self.toggl_client.get_detailed_report_batch(start_datetime, end_datetime,
+                                                                      WorkLogBatch(strings))
+            tempo_batch = tempo_future.result()
 
-    @staticmethod
-    def _worklog_was_updated(toggl: WorkLog, tempo: WorkLog):
-        is_updated = False
-        description_of_changes = ""
+        second_ids = self.storage.get_qualified_second_ids(toggl_batch.iter_qualified_ids())
+        result = reconcile_batches(toggl_batch, tempo_batch, second_ids)
 
-        if tempo.activity != toggl.activity:
-            is_updated = True
-            description_of_changes += "Activity: {0} -> {1}\r\n".format(tempo.activity, toggl.activity)
-        if tempo.startTime != toggl.startTime:
-            is_updated = True
-            description_of_changes += "Start time: {0} -> {1}\r\n".format(tempo.startTime, toggl.startTime)
-        if tempo.duration != toggl.duration:
-            is_updated = True
-            description_of_changes += "Duration: {0} -> {1}\r\n".format(tempo.duration, toggl.duration)
-        if tempo.description != toggl.description:
-            is_updated = True
-            description_of_changes += "Description: {0} -> {1}\r\n".format(tempo.description, toggl.description)
+        self.changeStatus.emit("Loaded {toggl} worklogs from Toggl and {tempo} worklogs from Tempo."
+                               .format(toggl=len(toggl_batch), tempo=len(tempo_batch)))
 
-        if is_updated:
-            toggl.tooltip = description_of_changes
+        return result.counters
 
-        return is_updated
+    def _load_worklogs_from(self, source: str, iter_method, start_datetime: datetime, end_datetime: datetime) \
+            -> WorkLogCollection:
+        worklogs = []
+        for page in self._iter_worklogs_from(source, iter_method, start_datetime, end_datetime):
+            worklogs.extend(page)
 
-    def _sync_impl(self, worklogs: WorkLogCollection):
+        return worklogs
+
+    def _iter_worklogs_from(self, source: str, iter_method, start_datetime: datetime, end_datetime: datetime) \
+            -> Iterator[WorkLogCollection]:
+        count = 0
+
+        try:
+            for page in iter_method(start_datetime, end_datetime):
+                count += len(page)
+                yield page
+        except SyncException:
+            self.changeStatus.emit(f"Failed to load worklogs from {source}.")
+            raise
+        except Exception as e:
+            logger.exception(f"Failed to load worklogs from {source}")
+            self.changeStatus.emit(f"Failed to load worklogs from {source}.")
+            raise SyncException(f"Failed to load worklogs from {source}: {e}")
+
+        self.changeStatus.emit(f"Loaded {count} worklogs from {source}.")
+
+    def _sync_impl(self, plan: SyncPlan):
         self.changeStatus.emit("Sync in process...")
 
-        total_count = worklogs.__len__()
+        total_count = plan.total_count
         progress_counter = 0
         counter = {
             "added": 0,
@@ -165,43 +288,32 @@ class SyncManager(QObject):
             "failed": 0
         }
 
-        self.storage.open()
+        bookkeeping = SyncBookkeeping(self.storage, TempoMirror(self.tempo_client, self.storage))
 
-        for wl in worklogs:
-            self.changeStatus.emit("Progress: syncing {current}/{total}"
-                                   .format(current=progress_counter, total=total_count))
-
-            if wl.state == WorkLogState.New:
-                if self.tempo_client.add_worklog(wl):
-                    self.storage.add(wl)
-                    counter["added"] += 1
-                else:
-                    counter["failed"] += 1
-            elif wl.state == WorkLogState.Moved:
-                # Delete from Tempo
-                if not self.tempo_client.delete_worklog(wl):
-                    # TODO: Add exception raising and handling
-                    continue
-
-                # Delete from DB
-                self.storage.delete(wl)
-                wl.second_id = None
-
-                # Upload again
-                if self.tempo_client.add_worklog(wl):
-                    self.storage.add(wl)
-                    counter["updated"] += 1
-            elif wl.state == WorkLogState.Updated:
-                if self.tempo_client.update_worklog(wl):
-                    counter["updated"] += 1
-                else:
-                    counter["failed"] += 1
-            else:
-                counter["skipped"] += 1
-
-            progress_counter += 1
+        # In-flight requests are limited by adaptive concurrency of Tempo host, so the pool is sized by its upper bound
+        with self.storage.transaction(chunk_size=self.STORAGE_COMMIT_CHUNK_SIZE), \
+                ThreadPoolExecutor(max_workers=self.config.network.max_concurrency) as executor:
+            worklogs_to_push = plan.worklogs
 
-        self.storage.close()
+            counter["skipped"] = plan.skipped_count
+            progress_counter = counter["skipped"]
+
+            bookkeeping.begin_push(worklogs_to_push)
+
+            futures = [executor.submit(self._push_worklog, wl) for wl in worklogs_to_push]
+
+            # Results are written to storage only from this thread
+            for future in as_completed(futures):
+                result = future.result()
+                bookkeeping.record_push(result)
+
+                counter[result.counter] += 1
+                progress_counter += 1
+
+                self.changeStatus.emit("Progress: syncing {current}/{total}"
+                                       .format(current=progress_counter, total=total_count))
+
+        self.last_counters = counter
 
         self.changeStatus.emit("Result: added {added}/{total_count},"
                                " updated {updated}/{total_count},"
@@ -212,3 +324,27 @@ class SyncManager(QObject):
                                        updated=counter["updated"],
                                        skipped=counter["skipped"],
                                        failed=counter["failed"]))
+
+    def _push_worklog(self, wl: WorkLog) -> PushResult:
+        # Executed by worker threads, so it must not touch storage
+        result = PushResult(wl)
+
+        if wl.state == WorkLogState.New:
+            if self.tempo_client.add_worklog(wl):
+                result.is_mapped = True
+                result.counter = "added"
+        elif wl.state == WorkLogState.Moved:
+            moved_from = copy.copy(wl)
+
+            if self.tempo_client.move_worklog(wl):
+                result.moved_from = moved_from
+                result.counter = "updated"
+            elif wl.second_id is None:
+                # Tempo worklog was deleted by fallback, but wasn't added again
+                result.removed_mapping = moved_from
+        elif wl.state == WorkLogState.Updated:
+            if self.tempo_client.update_worklog(wl):
+                result.counter = "updated"
+
+        return result
+
@@ -0,0 +1,143 @@
+import hashlib
+import json
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List
+
+from j2toggl_core.storage.storage import QualifiedId, StorageBase
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+WorkLogCollection = List[WorkLog]
+
+PLAN_STATES = (WorkLogState.New, WorkLogState.Moved, WorkLogState.Updated)
+
+
+class SyncOperation:
+    def __init__(self, worklog: WorkLog):
+        self.worklog = worklog
+
+    @property
+    def state(self) -> WorkLogState:
+        return self.worklog.state
+
+    @property
+    def changes(self) -> str:
+        return self.worklog.tooltip
+
+    def to_dict(self) -> dict:
+        wl = self.worklog
+
+        return {
+            "state": wl.state.name,
+            "workspaceId": wl.workspace_id,
+            "masterId": wl.master_id,
+            "secondId": wl.second_id,
+            "key": wl.key,
+            "activity": wl.activity,
+            "description": wl.description,
+            "startTime": wl.startTime.isoformat(),
+            "duration": wl.duration,
+            "changes": wl.tooltip,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "SyncOperation":
+        wl = WorkLog()
+        wl.state = WorkLogState[data["state"]]
+        wl.workspace_id = data.get("workspaceId")
+        wl.master_id = data["masterId"]
+        wl.second_id = data["secondId"]
+        wl.key = data["key"]
+        wl.activity = data["activity"]
+        wl.description = data["description"]
+        wl.startTime = datetime.fromisoformat(data["startTime"])
+        wl.duration = data["duration"]
+        wl.endTime = wl.startTime + timedelta(seconds=wl.duration)
+        wl.tooltip = data["changes"]
+
+        return SyncOperation(wl)
+
+
+class SyncPlan:
+    """
+    Operations which should be applied to Tempo to sync the date range.
+    The freshness token is a digest of mappings stored for the operations, it detects plans outdated by another sync.
+    Plan made from mirrored Tempo worklogs isn't aware of deleted ones, so its days are revalidated before it's applied.
+    """
+
+    # Toggl and Tempo can be changed while plan waits, so an old plan is loaded again
+    TIME_TO_LIVE = timedelta(minutes=10)
+
+    def __init__(self, start_date: date, end_date: date, operations: List[SyncOperation], skipped_count: int,
+                 freshness_token: str, created_at: datetime = None, is_tempo_reloaded: bool = False):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.operations = operations
+        self.skipped_count = skipped_count
+        self.freshness_token = freshness_token
+        self.created_at = created_at if created_at is not None else datetime.now(timezone.utc)
+
+        # Tempo worklogs of all days were loaded, not only the updated ones
+        self.is_tempo_reloaded = is_tempo_reloaded
+
+    @staticmethod
+    def create(start_date: date, end_date: date, worklogs: WorkLogCollection, storage: StorageBase,
+               is_tempo_reloaded: bool = False) -> "SyncPlan":
+        operations = [SyncOperation(x) for x in worklogs if x.state in PLAN_STATES]
+        freshness_token = make_freshness_token(storage, (x.worklog.qualified_id for x in operations))
+
+        return SyncPlan(start_date, end_date, operations, len(worklogs) - len(operations), freshness_token,
+                        is_tempo_reloaded=is_tempo_reloaded)
+
+    @property
+    def worklogs(self) -> WorkLogCollection:
+        return [x.worklog for x in self.operations]
+
+    @property
+    def total_count(self) -> int:
+        return len(self.operations) + self.skipped_count
+
+    @property
+    def is_expired(self) -> bool:
+        return datetime.now(timezone.utc) - self.created_at > self.TIME_TO_LIVE
+
+    def is_fresh(self, storage: StorageBase) -> bool:
+        if self.is_expired:
+            return False
+
+        return self.freshness_token == make_freshness_token(storage, (x.worklog.qualified_id for x in self.operations))
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "startDate": self.start_date.isoformat(),
+            "endDate": self.end_date.isoformat(),
+            "createdAt": self.created_at.isoformat(),
+            "freshnessToken": self.freshness_token,
+            "tempoReloaded": self.is_tempo_reloaded,
+            "skippedCount": self.skipped_count,
+            "operations": [x.to_dict() for x in self.operations],
+        }, indent=4)
+
+    @staticmethod
+    def from_json(text: str) -> "SyncPlan":
+        data = json.loads(text)
+
+        return SyncPlan(start_date=date.fromisoformat(data["startDate"]),
+                        end_date=date.fromisoformat(data["endDate"]),
+                        operations=[SyncOperation.from_dict(x) for x in data["operations"]],
+                        skipped_count=data["skippedCount"],
+                        freshness_token=data["freshnessToken"],
+                        created_at=datetime.fromisoformat(data["createdAt"]),
+                        is_tempo_reloaded=data.get("tempoReloaded", False))
+
+
+def make_freshness_token(storage: StorageBase, ids: Iterable[QualifiedId]) -> str:
+    # Workspace is None for worklogs of unknown one, so it isn't compared with numbers
+    ids = sorted(ids, key=lambda x: (x[0] is not None, x[0] or 0, x[1]))
+    second_ids = storage.get_qualified_second_ids(ids)
+    fingerprints = storage.get_qualified_fingerprints(ids)
+
+    content = ";".join(f"{x[0]}:{x[1]}:{second_ids.get(x)}:{fingerprints.get(x)}" for x in ids)
+
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
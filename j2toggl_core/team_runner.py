@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import jsonschema
+from loguru import logger
+
+from j2toggl_core.configuration.json_config import JsonConfig
+from j2toggl_core.net.http_transport import default_transport
+from j2toggl_core.storage.sqlite_storage import DATABASE_FILE_NAME
+
+TEAM_FILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "maxProcesses": {"type": "integer", "minimum": 1},
+        "defaultHostLimit": {"type": "integer", "minimum": 1},
+        "hostLimits": {
+            "type": "object",
+            "additionalProperties": {"type": "integer", "minimum": 1}
+        },
+        "users": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "directory": {"type": "string"},
+                    "database": {"type": "string"},
+                },
+                "required": ["name", "directory"]
+            }
+        },
+    },
+    "required": ["users"],
+}
+
+COUNTER_NAMES = ("added", "updated", "skipped", "failed")
+
+
+class UserProfile:
+    """
+    Settings of one team member: directory with app-config.json (the same layout as the app directory)
+    and mapping database, by default toggl-sync.db in the same directory.
+    """
+
+    def __init__(self, name: str, directory: Path, database_path: Path = None):
+        self.name = name
+        self.directory = Path(directory)
+        self.database_path = Path(database_path) if database_path is not None \
+            else self.directory.joinpath(DATABASE_FILE_NAME)
+
+    def load_config(self) -> JsonConfig:
+        config = JsonConfig(self.directory)
+
+        is_valid, error_message = config.validate()
+        if not is_valid:
+            raise ValueError(f"Config of user '{self.name}' is incorrect: {error_message}")
+
+        config.load()
+
+        return config
+
+
+class UserSyncResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.is_succeeded = False
+        self.counters: Dict[str, int] = {x: 0 for x in COUNTER_NAMES}
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        self.elapsed = 0.0
+
+
+class TeamSyncSummary:
+    def __init__(self, results: List[UserSyncResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded_count(self) -> int:
+        return sum(1 for x in self.results if x.is_succeeded)
+
+    @property
+    def totals(self) -> Dict[str, int]:
+        return {name: sum(x.counters[name] for x in self.results) for name in COUNTER_NAMES}
+
+    def format(self) -> str:
+        header = ["User", "Result"] + [x.capitalize() for x in COUNTER_NAMES] + ["Time, s", "Details"]
+        rows = [[x.name, "ok" if x.is_succeeded else "failed"]
+                + [str(x.counters[name]) for name in COUNTER_NAMES]
+                + ["{0:.1f}".format(x.elapsed), x.error or x.status or ""]
+                for x in self.results]
+
+        totals = self.totals
+        rows.append(["Total", f"{self.succeeded_count}/{len(self.results)}"]
+                    + [str(totals[name]) for name in COUNTER_NAMES]
+                    + ["{0:.1f}".format(self.elapsed), ""])
+
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+
+        return "\n".join("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+                         for row in [header] + rows)
+
+
+class TeamSyncRunner:
+    """
+    Syncs worklogs of several users in parallel processes without UI.
+    Requests of all processes to the same API host are capped by a semaphore shared between processes,
+    while rate budgets stay per process, since APIs limit them per user token.
+    """
+
+    DEFAULT_HOST_LIMIT = 8
+
+    def __init__(self, profiles: List[UserProfile], max_processes: int = None,
+                 host_limits: Dict[str, int] = None, default_host_limit: int = DEFAULT_HOST_LIMIT):
+        self.profiles = profiles
+        self.max_processes = max_processes or min(len(profiles), multiprocessing.cpu_count()) or 1
+        self.host_limits = host_limits or {}
+        self.default_host_limit = default_host_limit
+
+    @staticmethod
+    def load(team_file_path: Path) -> "TeamSyncRunner":
+        team_file_path = Path(team_file_path)
+        with team_file_path.open() as team_file:
+            data = json.load(team_file)
+
+        jsonschema.validate(data, TEAM_FILE_SCHEMA)
+
+        # Paths are relative to the team file
+        base_path = team_file_path.parent
+        profiles = [UserProfile(name=x["name"],
+                                directory=base_path.joinpath(x["directory"]),
+                                database_path=base_path.joinpath(x["database"]) if "database" in x else None)
+                    for x in data["users"]]
+
+        return TeamSyncRunner(profiles,
+                              max_processes=data.get("maxProcesses"),
+                              host_limits=data.get("hostLimits"),
+                              default_host_limit=data.get("defaultHostLimit", TeamSyncRunner.DEFAULT_HOST_LIMIT))
+
+    def run(self, start_date: date, end_date: date, only_load: bool = False) -> TeamSyncSummary:
+        started_at = perf_counter()
+
+        # Processes are spawned, so they don't inherit threads and Qt state of the parent
+        context = multiprocessing.get_context("spawn")
+        host_semaphores = {host: context.BoundedSemaphore(limit) for host, limit in self._get_host_limits().items()}
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=self.max_processes, mp_context=context,
+                                 initializer=_init_worker, initargs=(host_semaphores,)) as executor:
+            # Profiles may share names, so results are identified by positions
+            futures = {executor.submit(sync_user, profile, start_date, end_date, only_load): index
+                       for index, profile in enumerate(self.profiles)}
+
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Worker process died, e.g. was killed
+                    result = UserSyncResult(self.profiles[index].name)
+                    result.error = f"Sync process failed: {e}"
+
+                logger.info(f"Team sync: user '{result.name}' finished, "
+                            f"{'ok' if result.is_succeeded else 'failed'}: {result.error or result.status}")
+                results[index] = result
+
+        # Summary keeps the order of profiles
+        return TeamSyncSummary([results[x] for x in range(len(self.profiles))], perf_counter() - started_at)
+
+    def _get_host_limits(self) -> Dict[str, int]:
+        hosts = {"api.track.toggl.com", "api.tempo.io"}
+
+        for profile in self.profiles:
+            try:
+                jira_host = urlsplit(profile.load_config().jira.host or "").hostname
+            except ValueError:
+                # Incorrect profile is reported by its worker
+                continue
+
+            if jira_host:
+                hosts.add(jira_host)
+
+        limits = {host: self.default_host_limit for host in hosts}
+        limits.update(self.host_limits)
+
+        return limits
+
+
+def _init_worker(host_semaphores: dict):
+    for host, semaphore in host_semaphores.items():
+        default_transport.scheduler.set_shared_limit(host, semaphore)
+
+
+def sync_user(profile: UserProfile, start_date: date, end_date: date, only_load: bool = False) -> UserSyncResult:
+    # Executed in worker process
+    from j2toggl_core.storage.sqlite_storage import SqliteStorage
+    from j2toggl_core.sync_manager import SyncManager
+
+    result = UserSyncResult(profile.name)
+    started_at = perf_counter()
+
+    try:
+        config = profile.load_config()
+        default_transport.configure(config.network)
+
+        sync_manager = SyncManager(config, SqliteStorage(profile.database_path))
+
+        def on_status(message: str):
+            logger.info(f"[{profile.name}] {message}")
+            result.status = message
+
+        sync_manager.changeStatus.connect(on_status)
+
+        result.is_succeeded = sync_manager.sync(start_date, end_date, only_load)
+        result.counters.update(sync_manager.last_counters)
+
+        if not result.is_succeeded:
+            result.error = result.status
+    except ValueError as e:
+        logger.error(str(e))
+        result.error = str(e)
+    except Exception as e:
+        logger.exception(f"Sync of user '{profile.name}' failed")
+        result.error = f"{type(e).__name__}: {e}"
+
+    result.elapsed = perf_counter() - started_at
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync worklogs of a team from Toggl to Tempo without UI.")
+    parser.add_argument("team_file", type=Path, help="JSON file with user profiles")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today(), help="first date, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last date, YYYY-MM-DD")
+    parser.add_argument("--only-load", action="store_true", help="load and reconcile worklogs without sync")
+    args = parser.parse_args()
+
+    runner = TeamSyncRunner.load(args.team_file)
+    summary = runner.run(args.start, args.end or args.start, args.only_load)
+
+    print(summary.format())
+
+    return 0 if summary.succeeded_count == len(summary.results) else 1
+
+
+if __name__ == '__main__':
+    exit(main())
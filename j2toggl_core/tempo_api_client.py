@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
 import datetime
-import dateutil.parser
 import requests
 import urllib.parse
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from loguru import logger
 
@@ -12,72 +13,47 @@ from j2toggl_core.exceptions.SyncException import SyncException
 from j2toggl_core.configuration.jira_config import JiraConfig
 from j2toggl_core.configuration.tempo_config import TempoConfig
 from j2toggl_core.jira_api_client import JiraClient
+from j2toggl_core.net.http_transport import HttpTransport
+from j2toggl_core.utils import json_backend
+from j2toggl_core.utils.timestamp_parser import parse_date_and_time
 from j2toggl_core.worklog import WorkLog
-from typing import List
+from j2toggl_core.worklog_batch import WorkLogBatch
+from typing import Iterator, List, Optional
 
 WorkLogCollection = List[WorkLog]
 
 
-class TempoClient(JiraClient):
+class TempoApiBase:
+    """
+    Common part of synchronous and asynchronous Tempo clients: URLs, request parameters and parsing.
+    """
 
-    __tempo_legacy_rest_api_url = "https://api.tempo.io/core"
-    __PAGE_SIZE = 50
+    _tempo_legacy_rest_api_url = "https://api.tempo.io/core"
 
-    def __init__(self, jira_config: JiraConfig, tempo_config: TempoConfig):
-        JiraClient.__init__(self, jira_config)
+    # Tempo rejects change of issue by update in these cases, e.g. when the new issue belongs to another project,
+    # then worklog is moved by delete and add
+    _MOVE_FALLBACK_STATUSES = (HTTPStatus.BAD_REQUEST, HTTPStatus.METHOD_NOT_ALLOWED)
 
-        self.__config = tempo_config
-        self.__session = requests.Session()
-
-    def login(self) -> bool:
-        if not super().login():
-            return False
-
-        self.__session.headers["Authorization"] = "Bearer " + self.__config.token
-
-        return True
-
-    def get_worklogs(self, start_date: datetime, end_date: datetime) -> WorkLogCollection:
-        method_uri = self.__make_tempo_api_uri(f"worklogs/user/{self._user.account_id}")
-
-        page_index = 0
-
-        tsr_list = []
-
-        while True:
-            params = {
-                "from": start_date.strftime("%Y-%m-%d"),  # only dates, for instance "2016-12-23"
-                "to": end_date.strftime("%Y-%m-%d"),
-                "offset": page_index * self.__PAGE_SIZE,
-                "limit": self.__PAGE_SIZE
-            }
-
-            r = self.__session.get(url=method_uri, params=params)
-            if r.status_code != HTTPStatus.OK:
-                error_message = "{method_name}: url: {url} status {error_code}, error {error_message}".format(
-                    method_name="get_worklogs",
-                    url=method_uri,
-                    error_code=r.status_code,
-                    error_message=r.text)
-
-                logger.error(error_message)
-                raise SyncException(error_message)
-
-            report = r.json()
-
-            records_count = report["metadata"]["count"]
-            if not isinstance(records_count, int):
-                raise SyncException("Page count metadata MUST BE integer")
-
-            worklogs_part = self._load_worklogs_page(report["results"])
-            tsr_list.extend(worklogs_part)
+    @staticmethod
+    def _worklogs_page_params(start_date: datetime, end_date: datetime, offset: int, limit: int,
+                              updated_from: datetime.date = None) -> dict:
+        params = {
+            "from": start_date.strftime("%Y-%m-%d"),  # only dates, for instance "2016-12-23"
+            "to": end_date.strftime("%Y-%m-%d"),
+            "offset": offset,
+            "limit": limit
+        }
 
-            page_index += 1
+        if updated_from is not None:
+            params["updatedFrom"] = updated_from.strftime("%Y-%m-%d")
 
-            if records_count < self.__PAGE_SIZE:
-                break
+        return params
 
-        return tsr_list
+    @staticmethod
+    def _check_worklogs_page(report: dict):
+        records_count = report["metadata"]["count"]
+        if not isinstance(records_count, int):
+            raise SyncException("Page count metadata MUST BE integer")
 
     @staticmethod
     def _load_worklogs_page(tempo_worklogs: dict) -> WorkLogCollection:
@@ -93,7 +69,7 @@ class TempoClient(JiraClient):
 
             # Times
             duration = tempo_record["timeSpentSeconds"]
-            start = dateutil.parser.parse(tempo_record["startDate"] + "T" + tempo_record["startTime"])
+            start = parse_date_and_time(tempo_record["startDate"], tempo_record["startTime"])
             end = start + datetime.timedelta(seconds=duration)
 
             wl.startTime = start
@@ -101,23 +77,169 @@ class TempoClient(JiraClient):
             wl.duration = duration
 
             # Attributes
-            if tempo_record["attributes"] and tempo_record["attributes"]["values"]:
-                attributes = tempo_record["attributes"]["values"]
-                activity_attr = next((x for x in attributes if x["key"] == "_Activity_"), None)
-                if activity_attr is not None:
-                    wl.activity = urllib.parse.unquote(activity_attr["value"])
+            wl.activity = TempoApiBase._get_activity(tempo_record)
 
             tsrs.append(wl)
 
         return tsrs
 
+    @staticmethod
+    def _fill_batch_from_worklogs_page(tempo_worklogs: dict, batch: WorkLogBatch):
+        # The same as _load_worklogs_page, but values go to batch columns without WorkLog objects
+        for tempo_record in tempo_worklogs:
+            batch.append(master_id=None,
+                         second_id=tempo_record["tempoWorklogId"],
+                         key=tempo_record["issue"]["key"],
+                         activity=TempoApiBase._get_activity(tempo_record),
+                         project=None,
+                         description=tempo_record["description"],
+                         start_time=parse_date_and_time(tempo_record["startDate"], tempo_record["startTime"]),
+                         duration=tempo_record["timeSpentSeconds"])
+
+    @staticmethod
+    def _get_activity(tempo_record: dict) -> Optional[str]:
+        if tempo_record["attributes"] and tempo_record["attributes"]["values"]:
+            attributes = tempo_record["attributes"]["values"]
+            activity_attr = next((x for x in attributes if x["key"] == "_Activity_"), None)
+            if activity_attr is not None:
+                return urllib.parse.unquote(activity_attr["value"])
+
+        return None
+
+    @staticmethod
+    def _worklog_to_dict(worklog: WorkLog, account_id: str) -> dict:
+        data = {
+            "issueKey": worklog.key,
+            "timeSpentSeconds": worklog.duration,
+            "startDate": worklog.startTime.strftime("%Y-%m-%d"),
+            "startTime": worklog.startTime.strftime("%H:%M:00"),
+            "description": worklog.description,
+            "authorAccountId": account_id,
+            "attributes": [
+                {
+                    "key": "_Activity_",
+                    # Tempo still required that attribute names should be encoded
+                    "value": urllib.parse.quote(worklog.activity, safe='')
+                },
+            ],
+        }
+
+        return data
+
+    def _make_tempo_api_uri(self, relative_url: str):
+        return "{host}/3/{relative_url}".format(
+            host=self._tempo_legacy_rest_api_url,
+            relative_url=relative_url)
+
+
+class TempoClient(JiraClient, TempoApiBase):
+
+    _MAX_CONCURRENT_PAGES = 4
+
+    def __init__(self, jira_config: JiraConfig, tempo_config: TempoConfig, transport: HttpTransport = None):
+        JiraClient.__init__(self, jira_config, transport)
+
+        self.__config = tempo_config
+        self.__headers = {}
+
+    def login(self) -> bool:
+        if not super().login():
+            return False
+
+        self.__headers["Authorization"] = "Bearer " + self.__config.token
+
+        return True
+
+    def get_worklogs(self, start_date: datetime, end_date: datetime,
+                     updated_from: datetime.date = None) -> WorkLogCollection:
+        tsr_list = []
+        for page in self.iter_worklogs(start_date, end_date, updated_from):
+            tsr_list.extend(page)
+
+        return tsr_list
+
+    def iter_worklogs(self, start_date: datetime, end_date: datetime,
+                      updated_from: datetime.date = None) -> Iterator[WorkLogCollection]:
+        for report in self._iter_worklogs_pages(start_date, end_date, updated_from):
+            yield self._load_worklogs_page(report["results"])
+
+    def get_worklogs_batch(self, start_date: datetime, end_date: datetime,
+                           batch: WorkLogBatch = None) -> WorkLogBatch:
+        if batch is None:
+            batch = WorkLogBatch()
+
+        for report in self._iter_worklogs_pages(start_date, end_date):
+            self._fill_batch_from_worklogs_page(report["results"], batch)
+
+        return batch
+
+    def _iter_worklogs_pages(self, start_date: datetime, end_date: datetime,
+                             updated_from: datetime.date = None) -> Iterator[dict]:
+        first_report = self._get_worklogs_page(start_date, end_date, 0, self.__config.page_size, updated_from)
+        yield first_report
+
+        if not first_report["metadata"].get("next"):
+            return
+
+        # Tempo doesn't tell total count of worklogs, so the next pages are requested ahead
+        # and the requests after the last page are wasted.
+        page_size = first_report["metadata"]["limit"]
+        next_offset = page_size
+
+        with ThreadPoolExecutor(max_workers=self._MAX_CONCURRENT_PAGES) as executor:
+            pending = deque()
+
+            def request_next_page():
+                nonlocal next_offset
+                pending.append(executor.submit(self._get_worklogs_page, start_date, end_date,
+                                               next_offset, page_size, updated_from))
+                next_offset += page_size
+
+            for _ in range(self._MAX_CONCURRENT_PAGES):
+                request_next_page()
+
+            try:
+                while pending:
+                    report = pending.popleft().result()
+                    yield report
+
+                    if not report["metadata"].get("next"):
+                        break
+
+                    request_next_page()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _get_worklogs_page(self, start_date: datetime, end_date: datetime, offset: int, limit: int,
+                           updated_from: datetime.date = None) -> dict:
+        method_uri = self._make_tempo_api_uri(f"worklogs/user/{self._user.account_id}")
+
+        params = self._worklogs_page_params(start_date, end_date, offset, limit, updated_from)
+
+        r = self._transport.get(method_uri, headers=self.__headers, params=params)
+        if r.status_code != HTTPStatus.OK:
+            error_message = "{method_name}: url: {url} status {error_code}, error {error_message}".format(
+                method_name="get_worklogs",
+                url=method_uri,
+                error_code=r.status_code,
+                error_message=r.text)
+
+            logger.error(error_message)
+            raise SyncException(error_message)
+
+        report = json_backend.loads(r.content)
+        self._check_worklogs_page(report)
+
+        return report
+
     def add_worklog(self, worklog: WorkLog):
-        method_uri = self.__make_tempo_api_uri("worklogs")
+        method_uri = self._make_tempo_api_uri("worklogs")
 
-        data = self.__worklog_to_dict(worklog)
-        r = self.__session.post(url=method_uri, json=data)
+        data = self._worklog_to_dict(worklog, self._user.account_id)
+        r = self._transport.post(method_uri, headers=self.__headers, json=data)
         if r.status_code == HTTPStatus.OK:
-            answer = r.json()
+            answer = json_backend.loads(r.content)
             worklog.second_id = int(answer["tempoWorklogId"])
         else:
             logger.error("{method_name}: url: {url} status {error_code}, error {error_message}"
@@ -130,49 +252,60 @@ class TempoClient(JiraClient):
         return True
 
     def update_worklog(self, worklog: WorkLog):
-        method_uri = self.__make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
+        return self._put_worklog(worklog).status_code == HTTPStatus.OK
 
-        data = self.__worklog_to_dict(worklog)
-        r = self.__session.put(url=method_uri, json=data)
+    def move_worklog(self, worklog: WorkLog):
+        # Issue key is changed in place, so the worklog exists in Tempo all the time
+        r = self._put_worklog(worklog, log_errors=False)
         if r.status_code == HTTPStatus.OK:
-            answer = r.json()
-            worklog.second_id = int(answer["tempoWorklogId"])
-        else:
-            logger.error("{method_name}: url: {url} status {error_code}, error {error_message}"
-                         .format(method_name="add_worklog",
-                                 url=method_uri,
-                                 error_code=r.status_code,
-                                 error_message=r.text))
+            return True
+
+        if r.status_code not in self._MOVE_FALLBACK_STATUSES:
+            self._log_request_error("move_worklog", r)
             return False
 
-        return True
+        logger.debug("move_worklog: Tempo rejected issue change of worklog {0} ({1}), it's deleted and added again"
+                     .format(worklog.second_id, r.status_code))
 
-    def delete_worklog(self, worklog: WorkLog):
-        method_uri = self.__make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
+        if not self.delete_worklog(worklog):
+            return False
 
-        r = self.__session.delete(url=method_uri)
-        return r.ok
+        # Tempo worklog is deleted now, so the move just fails without one and its mapping is removed by caller,
+        # then the worklog is added again as a new one by the next sync
+        worklog.second_id = None
 
-    def __worklog_to_dict(self, worklog: WorkLog) -> dict:
-        data = {
-            "issueKey": worklog.key,
-            "timeSpentSeconds": worklog.duration,
-            "startDate": worklog.startTime.strftime("%Y-%m-%d"),
-            "startTime": worklog.startTime.strftime("%H:%M:00"),
-            "description": worklog.description,
-            "authorAccountId": self._user.account_id,
-            "attributes": [
-                {
-                    "key": "_Activity_",
-                    # Tempo still required that attribute names should be encoded
-                    "value": urllib.parse.quote(worklog.activity, safe='')
-                },
-            ],
-        }
+        try:
+            return self.add_worklog(worklog)
+        except requests.RequestException:
+            logger.exception("move_worklog: worklog {0} was deleted, but wasn't added again".format(worklog.master_id))
+            return False
 
-        return data
+    def _put_worklog(self, worklog: WorkLog, log_errors: bool = True) -> requests.Response:
+        method_uri = self._make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
 
-    def __make_tempo_api_uri(self, relative_url: str):
-        return "{host}/3/{relative_url}".format(
-            host=self.__tempo_legacy_rest_api_url,
-            relative_url=relative_url)
+        data = self._worklog_to_dict(worklog, self._user.account_id)
+        r = self._transport.put(method_uri, headers=self.__headers, json=data)
+        if r.status_code == HTTPStatus.OK:
+            answer = json_backend.loads(r.content)
+            worklog.second_id = int(answer["tempoWorklogId"])
+        elif log_errors:
+            self._log_request_error("update_worklog", r)
+
+        return r
+
+    @staticmethod
+    def _log_request_error(method_name: str, r: requests.Response):
+        logger.error("{method_name}: url: {url} status {error_code}, error {error_message}"
+                     .format(method_name=method_name,
+                             url=r.url,
+                             error_code=r.status_code,
+                             error_message=r.text))
+
+    def delete_worklog(self, worklog: WorkLog):
+        method_uri = self._make_tempo_api_uri("worklogs/{worklog_id}".format(worklog_id=worklog.second_id))
+
+        r = self._transport.delete(method_uri, headers=self.__headers)
+        if not r.ok:
+            self._log_request_error("delete_worklog", r)
+
+        return r.ok
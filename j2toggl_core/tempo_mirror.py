@@ -0,0 +1,126 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from loguru import logger
+
+from j2toggl_core.push_result import PushResult
+from j2toggl_core.storage.storage import StorageBase
+from j2toggl_core.tempo_api_client import TempoClient
+from j2toggl_core.utils.datetime_utils import get_local_zone
+from j2toggl_core.worklog import WorkLog
+
+WorkLogCollection = List[WorkLog]
+
+
+class TempoMirrorLoad:
+    """
+    Network part of mirror loading. It doesn't touch storage, so it can be executed by a worker thread.
+    """
+
+    def __init__(self, tempo_client: TempoClient, start_date: datetime, end_date: datetime,
+                 mirrored_worklogs: Optional[WorkLogCollection], updated_from: Optional[date]):
+        self._tempo_client = tempo_client
+        self.start_date = start_date
+        self.end_date = end_date
+        self.mirrored_worklogs = mirrored_worklogs
+        self.updated_from = updated_from
+        self.started_at = datetime.now(timezone.utc)
+
+    @property
+    def is_full_reload(self) -> bool:
+        return self.mirrored_worklogs is None
+
+    def iter_worklogs(self, start_date: datetime, end_date: datetime) -> Iterator[WorkLogCollection]:
+        return self._tempo_client.iter_worklogs(start_date, end_date, self.updated_from)
+
+
+class TempoMirror:
+    """
+    Local copy of Tempo worklogs kept in storage.
+    Repeated loads of the same days request only worklogs updated since the last revalidation.
+    Deleted worklogs aren't reported that way, so days are revalidated completely before their plan is applied.
+    """
+
+    # Tempo can't report deleted worklogs, so the mirrored days are reloaded completely from time to time
+    FULL_RELOAD_INTERVAL = timedelta(hours=24)
+
+    def __init__(self, tempo_client: TempoClient, storage: StorageBase):
+        self._tempo_client = tempo_client
+        self._storage = storage
+
+    @property
+    def _account_id(self) -> str:
+        return self._tempo_client.user.account_id
+
+    def get_worklogs(self, start_date: datetime, end_date: datetime, full_reload: bool = False) -> WorkLogCollection:
+        load = self.begin_load(start_date, end_date, full_reload)
+
+        fetched_worklogs = []
+        for page in load.iter_worklogs(start_date, end_date):
+            fetched_worklogs.extend(page)
+
+        return self.complete_load(load, fetched_worklogs)
+
+    def begin_load(self, start_date: datetime, end_date: datetime, full_reload: bool = False) -> TempoMirrorLoad:
+        mirrored = None
+        if not full_reload:
+            mirrored = self._storage.get_mirrored_worklogs(self._account_id, start_date.date(), end_date.date())
+
+        if mirrored is None or datetime.now(timezone.utc) - mirrored[1] > self.FULL_RELOAD_INTERVAL:
+            return TempoMirrorLoad(self._tempo_client, start_date, end_date, None, None)
+
+        # Tempo filters by date only and its zone can differ from the local one,
+        # so worklogs updated since the day before the revalidation are requested again
+        worklogs, revalidated_at = mirrored
+        updated_from = revalidated_at.astimezone(get_local_zone()).date() - timedelta(days=1)
+
+        return TempoMirrorLoad(self._tempo_client, start_date, end_date, worklogs, updated_from)
+
+    def complete_load(self, load: TempoMirrorLoad, fetched_worklogs: WorkLogCollection) -> WorkLogCollection:
+        start_date = load.start_date.date()
+        end_date = load.end_date.date()
+
+        if load.is_full_reload:
+            self._storage.replace_mirrored_days(self._account_id, start_date, end_date,
+                                                fetched_worklogs, load.started_at)
+
+            logger.debug(f"Tempo mirror: reloaded {len(fetched_worklogs)} worklogs")
+
+            return fetched_worklogs
+
+        self._storage.update_mirrored_days(self._account_id, start_date, end_date,
+                                           fetched_worklogs, load.started_at)
+
+        logger.debug(f"Tempo mirror: {len(load.mirrored_worklogs)} mirrored worklogs,"
+                     f" {len(fetched_worklogs)} changed")
+
+        worklogs_by_id = {x.second_id: x for x in load.mirrored_worklogs}
+        worklogs_by_id.update((x.second_id, x) for x in fetched_worklogs)
+
+        return list(worklogs_by_id.values())
+
+    def complete_revalidation(self, load: TempoMirrorLoad, fetched_worklogs: WorkLogCollection) -> bool:
+        """
+        Completes full reload of the days.
+        Returns False, when mirrored worklogs of the days were deleted or moved to other days.
+        """
+        mirrored = self._storage.get_mirrored_worklogs(self._account_id, load.start_date.date(), load.end_date.date())
+        worklogs = self.complete_load(load, fetched_worklogs)
+
+        if mirrored is None:
+            return False
+
+        missing_ids = {x.second_id for x in mirrored[0]}.difference(x.second_id for x in worklogs)
+        if missing_ids:
+            logger.info(f"Tempo mirror: {len(missing_ids)} mirrored worklogs don't exist anymore")
+
+        return not missing_ids
+
+    def record_push(self, result: PushResult):
+        if result.removed_mapping is not None:
+            self._storage.delete_mirrored_worklog(result.removed_mapping.second_id)
+        if result.moved_from is not None and result.moved_from.second_id != result.worklog.second_id:
+            self._storage.delete_mirrored_worklog(result.moved_from.second_id)
+
+        if result.counter != "failed":
+            self._storage.save_mirrored_worklogs(self._account_id, [result.worklog])
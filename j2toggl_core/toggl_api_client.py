@@ -1,151 +1,417 @@
 #!/usr/bin/env python3
 
-import dateutil.parser
-import re
-import requests.utils
+import math
+import queue
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import *
+from http import HTTPStatus
+from loguru import logger
+from time import perf_counter
 
+from j2toggl_core.classification_rules import ClassificationRules
 from j2toggl_core.configuration.toggl_config import TogglConfig
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.net.http_transport import HttpTransport, default_transport
+from j2toggl_core.utils import json_backend
 from j2toggl_core.utils.datetime_utils import *
+from j2toggl_core.utils.timestamp_parser import parse_timestamp
 from j2toggl_core.worklog import WorkLog
-from typing import List
+from j2toggl_core.worklog_batch import WorkLogBatch
+from typing import Dict, Iterator, List, Optional, Tuple
 
 WorkLogCollection = List[WorkLog]
 
 
-class TogglClient:
-    _workspace_id = None
+class TogglApiBase:
+    """
+    Common part of synchronous and asynchronous Toggl clients: URLs, request parameters and parsing.
+    """
 
-    __toggl_url = "https://api.track.toggl.com"
+    _toggl_url = "https://api.track.toggl.com"
 
-    _jira_key_re = re.compile("\w+-\d+")
+    _PROJECTS_PAGE_SIZE = 200
 
-    _projects_to_activities_map = {
-        "Analysis": "Design/Analysis",
-        "BugFixing": "Bugfixing",
-        "CodeReview": "Code Review",
-        "CR Fixes": "Code Review Fixes",
-        "Development": "Development",
-        "Estimation": "Estimation",
-        "Interview": "Other",
-        "Meetings": "Other",
-        "Testing": "Testing",
-        "Environment Setup": "Environment Setup",
-        "Team Activities": "Other"
+    # Response headers of Reports API v3 cursor and request fields which continue it
+    _CURSOR_FIELDS = {
+        "X-Next-ID": "first_id",
+        "X-Next-Row-Number": "first_row_number",
+        "X-Next-Timestamp": "first_timestamp",
     }
 
     def __init__(self, config: TogglConfig):
         self._config = config
-        self._session = requests.Session()
-        self._session.auth = (self._config.token, "api_token")
+        self._rules = ClassificationRules(config.rules)
 
-    def login(self) -> bool:
-        if not self._config.validate():
-            return False
+        if config.api_url:
+            self._toggl_url = config.api_url.rstrip("/")
 
-        method_uri = self.__make_api_uri("workspaces")
-        r = self._session.get(url=method_uri)
-        if not r.ok:
+        # Workspaces whose reports are loaded, they are selected by login
+        self._workspace_ids: List[int] = []
+
+        # The first workspace of the user, it was the only synced one before workspaces became configurable
+        self.primary_workspace_id: Optional[int] = None
+
+    def _select_workspaces(self, workspaces: List[dict]) -> bool:
+        available_ids = [x["id"] for x in workspaces]
+        if not available_ids:
+            logger.error("Toggl user doesn't have any workspace")
             return False
 
-        workspaces = r.json()
-        self._workspace_id = workspaces[0]["id"]
+        self.primary_workspace_id = available_ids[0]
+
+        if self._config.workspaces is None:
+            self._workspace_ids = available_ids
+        else:
+            unknown_ids = [x for x in self._config.workspaces if x not in available_ids]
+            if unknown_ids:
+                logger.warning(f"Toggl workspaces {unknown_ids} aren't available to the user, they are skipped")
+
+            self._workspace_ids = [x for x in self._config.workspaces if x in available_ids]
+            if not self._workspace_ids:
+                logger.error("None of configured Toggl workspaces is available to the user")
+                return False
+
+        logger.debug(f"Toggl workspaces: {self._workspace_ids}")
 
         return True
 
-    def get_detailed_report(self, start_date: datetime, end_date: datetime = None) -> WorkLogCollection:
+    @staticmethod
+    def _report_range(start_date: datetime, end_date: datetime = None) -> (datetime, datetime):
         if end_date is None:
             end_date = start_date
 
-        method_uri = self.__make_reports_api_url("details")
         since = shrink_time(start_date) + timedelta(0, 1)
         until = shrink_time(end_date) + timedelta(1, -1)
-        page_number = 0
 
-        tsr_list = []
+        return since, until
 
-        while True:
-            page_number += 1
+    def _report_page_params(self, workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+        return {
+            'user_agent': self._config.user_agent,
+            'workspace_id': workspace_id,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'page': page_number,
+        }
+
+    def _parse_report_record(self, tr: dict, workspace_id: int = None) -> WorkLog:
+        start = parse_timestamp(tr["start"])
+        start = start.replace(second=0, microsecond=0, tzinfo=None)
 
-            params = {
-                'user_agent': self._config.user_agent,
-                'workspace_id': self._workspace_id,
-                'since': since.isoformat(),
-                'until': until.isoformat(),
-                'page': page_number,
-            }
+        end = parse_timestamp(tr["end"])
+        end = end.replace(second=0, microsecond=0, tzinfo=None)
 
-            r = self._session.get(url=method_uri, params=params)
-            report = r.json()
+        wl = WorkLog()
+        wl.workspace_id = workspace_id
+        wl.master_id = tr["id"]
+        wl.project = tr["project"]
+        wl.description = tr["description"]
+        wl.startTime = start
+        wl.endTime = end
+        wl.duration = tr["dur"] // 1000  # convert to seconds
+        wl.tags = tr["tags"]
 
-            per_page = report["per_page"]
-            total_count = report["total_count"]
+        wl.key, wl.description, activity = self._rules.classify(wl.project, tuple(wl.tags), wl.description)
+        if activity is not None:
+            wl.activity = activity
 
-            for tr in report["data"]:
-                start = dateutil.parser.parse(tr["start"])
-                start = start.replace(second=0, microsecond=0, tzinfo=None)
+        return wl
+
+    def _calculate_key(self, wl: WorkLog):
+        wl.key, wl.description = self._rules.parse_key(tuple(wl.tags), wl.description)
 
-                end = dateutil.parser.parse(tr["end"])
-                end = end.replace(second=0, microsecond=0, tzinfo=None)
+    def _calculate_activity(self, wl: WorkLog):
+        activity = self._rules.get_activity(wl.project)
+        if activity is not None:
+            wl.activity = activity
+
+    def _fill_batch_from_report_page(self, records: List[dict], batch: WorkLogBatch, workspace_id: int = None):
+        # The same as _parse_report_record, but values go to batch columns without WorkLog objects
+        for tr in records:
+            start = parse_timestamp(tr["start"]).replace(second=0, microsecond=0, tzinfo=None)
+            key, description, activity = self._rules.classify(tr["project"], tuple(tr["tags"]), tr["description"])
+
+            batch.append(master_id=tr["id"],
+                         second_id=None,
+                         key=key,
+                         activity=activity,
+                         project=tr["project"],
+                         description=description,
+                         start_time=start,
+                         duration=tr["dur"] // 1000,
+                         workspace_id=workspace_id)
+
+    def _report_v3_first_body(self, since: datetime, until: datetime) -> dict:
+        return {
+            "start_date": since.strftime("%Y-%m-%d"),
+            "end_date": until.strftime("%Y-%m-%d"),
+            "page_size": self._config.page_size,
+            "order_by": "date",
+            "order_dir": "ASC",
+        }
+
+    def _report_v3_next_body(self, body: dict, headers) -> Optional[dict]:
+        # The last page doesn't have the next cursor
+        if not headers.get("X-Next-ID"):
+            return None
+
+        next_body = dict(body)
+        for header, field in self._CURSOR_FIELDS.items():
+            value = headers.get(header)
+            if value is not None:
+                next_body[field] = int(value)
+
+        return next_body
+
+    @staticmethod
+    def _rows_to_records(rows: List[dict], project_names: Dict[int, str], tag_names: Dict[int, str]) -> List[dict]:
+        # Time entries of rows are converted to records of Reports API v2, so both APIs are parsed the same way
+        records = []
+
+        for row in rows:
+            project = project_names.get(row["project_id"]) if row["project_id"] is not None else None
+            tags = [tag_names[x] for x in row["tag_ids"] or () if x in tag_names]
+
+            for time_entry in row["time_entries"]:
+                # Running time entry isn't finished yet, so it isn't reported by Reports API v2 too
+                if time_entry["stop"] is None:
+                    continue
+
+                records.append({
+                    "id": time_entry["id"],
+                    "project": project,
+                    "description": row["description"],
+                    "tags": tags,
+                    "start": time_entry["start"],
+                    "end": time_entry["stop"],
+                    "dur": time_entry["seconds"] * 1000,
+                })
+
+        return records
+
+    def _make_reports_api_url(self, relative_url: str):
+        return "{0}/reports/api/v2/{1}".format(self._toggl_url, relative_url)
+
+    def _make_reports_v3_api_url(self, relative_url: str):
+        return "{0}/reports/api/v3/{1}".format(self._toggl_url, relative_url)
+
+    def _make_api_uri(self, relative_url: str):
+        return "{0}/api/v9/{1}".format(self._toggl_url, relative_url)
+
+
+class TogglClient(TogglApiBase):
+    # Reports API allows only a few requests per second
+    _MAX_CONCURRENT_PAGES = 4
+
+    def __init__(self, config: TogglConfig, transport: HttpTransport = None):
+        super().__init__(config)
+
+        self._transport = transport if transport is not None else default_transport
+
+        # (workspace id, page number, elapsed seconds) of the last loaded detailed report
+        self.page_timings: List[Tuple[int, int, float]] = []
 
-                wl = WorkLog()
-                wl.master_id = tr["id"]
-                wl.project = tr["project"]
-                wl.description = tr["description"]
-                wl.startTime = start
-                wl.endTime = end
-                wl.duration = tr["dur"] // 1000  # convert to seconds
-                wl.tags = tr["tags"]
+    def login(self) -> bool:
+        if not self._config.validate():
+            return False
 
-                self._calculate_key(wl)
-                self._calculate_activity(wl)
+        method_uri = self._make_api_uri("workspaces")
+        r = self._transport.get(method_uri, auth=self._auth)
+        if not r.ok:
+            return False
 
-                tsr_list.append(wl)
+        return self._select_workspaces(json_backend.loads(r.content))
 
-            if (per_page * page_number) >= total_count:
-                break
+    def get_detailed_report(self, start_date: datetime, end_date: datetime = None) -> WorkLogCollection:
+        tsr_list = []
+        for page in self.iter_detailed_report(start_date, end_date):
+            tsr_list.extend(page)
 
         return tsr_list
 
-    def _calculate_key(self, wl: WorkLog):
-        # TODO: What occurs if we add more that one tag to worklog?
-        key_tag = next((x for x in wl.tags if x.startswith("key_")), None)
-
-        if key_tag is not None:
-            dot_index = key_tag.rfind('_')
-            if dot_index < 0:
-                wl.key = None
-                return
-
-            key = key_tag[dot_index+1:]
-            if self._key_is_correct(key):
-                wl.key = key
-            else:
-                wl.key = None
-        else:
-            dot_index = wl.description.find(".")
-            if dot_index < 0:
-                wl.key = None
-                return
+    def iter_detailed_report(self, start_date: datetime, end_date: datetime = None) -> Iterator[WorkLogCollection]:
+        for workspace_id, report in self._iter_report_pages(start_date, end_date):
+            yield [self._parse_report_record(tr, workspace_id) for tr in report["data"]]
+
+    def get_detailed_report_batch(self, start_date: datetime, end_date: datetime = None,
+                                  batch: WorkLogBatch = None) -> WorkLogBatch:
+        if batch is None:
+            batch = WorkLogBatch()
+
+        for workspace_id, report in self._iter_report_pages(start_date, end_date):
+            self._fill_batch_from_report_page(report["data"], batch, workspace_id)
+
+        return batch
+
+    def _iter_report_pages(self, start_date: datetime, end_date: datetime = None) -> Iterator[Tuple[int, dict]]:
+        since, until = self._report_range(start_date, end_date)
+
+        self.page_timings = []
+
+        # Reports of workspaces are loaded concurrently and their pages are yielded in order of arrival
+        pages = queue.Queue()
+        is_stopped = threading.Event()
+
+        def load_workspace_report(workspace_id: int):
+            try:
+                for report in self._iter_workspace_report_pages(workspace_id, since, until):
+                    if is_stopped.is_set():
+                        break
+
+                    pages.put((workspace_id, report))
+            except BaseException as e:
+                # SyncException isn't derived from Exception, but it must fail the report too
+                pages.put(e)
+            finally:
+                pages.put(None)
+
+        with ThreadPoolExecutor(max_workers=len(self._workspace_ids) or 1) as executor:
+            for workspace_id in self._workspace_ids:
+                executor.submit(load_workspace_report, workspace_id)
+
+            try:
+                loading_count = len(self._workspace_ids)
+                while loading_count:
+                    item = pages.get()
+                    if item is None:
+                        loading_count -= 1
+                    elif isinstance(item, BaseException):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                # Reports of other workspaces aren't needed after error
+                is_stopped.set()
+
+    def _iter_workspace_report_pages(self, workspace_id: int, since: datetime, until: datetime) -> Iterator[dict]:
+        # The first page tells how many pages are left, so the rest of them are requested concurrently
+        first_report = self._get_report_page(workspace_id, since, until, 1)
+        pages_count = math.ceil(first_report["total_count"] / first_report["per_page"])
+
+        yield first_report
+
+        if pages_count > 1:
+            with ThreadPoolExecutor(max_workers=min(self._MAX_CONCURRENT_PAGES, pages_count - 1)) as executor:
+                yield from executor.map(lambda page: self._get_report_page(workspace_id, since, until, page),
+                                        range(2, pages_count + 1))
+
+        logger.debug("Toggl report of workspace {workspace_id}: {pages} page(s), {count} worklogs, "
+                     "page timings: {timings}"
+                     .format(workspace_id=workspace_id,
+                             pages=pages_count,
+                             count=first_report["total_count"],
+                             timings=", ".join("#{0} {1:.0f} ms".format(page, elapsed * 1000)
+                                               for workspace, page, elapsed in sorted(self.page_timings)
+                                               if workspace == workspace_id)))
+
+    @property
+    def _auth(self) -> (str, str):
+        return self._config.token, "api_token"
+
+    def _get_report_page(self, workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+        method_uri = self._make_reports_api_url("details")
+        params = self._report_page_params(workspace_id, since, until, page_number)
+
+        started_at = perf_counter()
+        r = self._transport.get(method_uri, auth=self._auth, params=params)
+        self._check_response("get_detailed_report", r)
+        report = json_backend.loads(r.content)
+        self.page_timings.append((workspace_id, page_number, perf_counter() - started_at))
+
+        return report
+
+    @staticmethod
+    def _check_response(method_name: str, r: requests.Response):
+        if r.status_code == HTTPStatus.OK:
+            return
+
+        error_message = "{method_name}: url: {url} status {error_code}, error {error_message}".format(
+            method_name=method_name,
+            url=r.url,
+            error_code=r.status_code,
+            error_message=r.text)
+
+        logger.error(error_message)
+        raise SyncException(error_message)
+
+
+class TogglReportsV3Client(TogglClient):
+    """
+    Loads detailed report by Reports API v3. Its pages are requested one by one by cursor,
+    but every row keeps all time entries with the same description, project and tags,
+    so long ranges take less requests than by page numbers of Reports API v2.
+    """
+
+    def _iter_workspace_report_pages(self, workspace_id: int, since: datetime, until: datetime) -> Iterator[dict]:
+        # Rows refer projects and tags by ids, their names are loaded while the first page is requested
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            projects_future = executor.submit(self._get_project_names, workspace_id)
+            tags_future = executor.submit(self._get_tag_names, workspace_id)
+
+            body = self._report_v3_first_body(since, until)
+            page_number = 0
+            count = 0
+
+            while body is not None:
+                page_number += 1
+                rows, body = self._get_report_v3_page(workspace_id, body, page_number)
+
+                records = self._rows_to_records(rows, projects_future.result(), tags_future.result())
+                count += len(records)
+
+                yield {"data": records}
+
+        logger.debug("Toggl report v3 of workspace {workspace_id}: {pages} page(s), {count} worklogs, "
+                     "page timings: {timings}"
+                     .format(workspace_id=workspace_id,
+                             pages=page_number,
+                             count=count,
+                             timings=", ".join("#{0} {1:.0f} ms".format(page, elapsed * 1000)
+                                               for workspace, page, elapsed in sorted(self.page_timings)
+                                               if workspace == workspace_id)))
+
+    def _get_report_v3_page(self, workspace_id: int, body: dict, page_number: int) -> (List[dict], Optional[dict]):
+        method_uri = self._make_reports_v3_api_url(f"workspace/{workspace_id}/search/time_entries")
+
+        started_at = perf_counter()
+        r = self._transport.post(method_uri, auth=self._auth, json=body)
+        self._check_response("get_detailed_report", r)
+        rows = json_backend.loads(r.content)
+        self.page_timings.append((workspace_id, page_number, perf_counter() - started_at))
+
+        return rows, self._report_v3_next_body(body, r.headers)
+
+    def _get_project_names(self, workspace_id: int) -> Dict[int, str]:
+        method_uri = self._make_api_uri(f"workspaces/{workspace_id}/projects")
+
+        names = {}
+        page_number = 1
+        while True:
+            r = self._transport.get(method_uri, auth=self._auth,
+                                    params={"page": page_number, "per_page": self._PROJECTS_PAGE_SIZE})
+            self._check_response("get_projects", r)
+            projects = json_backend.loads(r.content) or []
 
-            key = wl.description[:dot_index]
-            if self._key_is_correct(key):
-                wl.key = key
-                wl.description = wl.description[dot_index + 1:].strip()
-            else:
-                wl.key = None
+            names.update((x["id"], x["name"]) for x in projects)
 
-    def _key_is_correct(self, issue_key: str):
-        return self._jira_key_re.match(issue_key)
+            if len(projects) < self._PROJECTS_PAGE_SIZE:
+                return names
+
+            page_number += 1
+
+    def _get_tag_names(self, workspace_id: int) -> Dict[int, str]:
+        method_uri = self._make_api_uri(f"workspaces/{workspace_id}/tags")
+
+        r = self._transport.get(method_uri, auth=self._auth)
+        self._check_response("get_tags", r)
+
+        return {x["id"]: x["name"] for x in json_backend.loads(r.content) or []}
 
-    def _calculate_activity(self, wl: WorkLog):
-        if wl.project in self._projects_to_activities_map:
-            wl.activity = self._projects_to_activities_map[wl.project]
-        elif wl.project is not None:
-            wl.activity = "Other"
 
-    def __make_reports_api_url(self, relative_url: str):
-        return "{0}/reports/api/v2/{1}".format(self.__toggl_url, relative_url)
+def create_toggl_client(config: TogglConfig, transport: HttpTransport = None) -> TogglClient:
+    if config.reports_api == TogglConfig.REPORTS_API_V2:
+        return TogglClient(config, transport)
 
-    def __make_api_uri(self, relative_url: str):
-        return "{0}/api/v9/{1}".format(self.__toggl_url, relative_url)
+    return TogglReportsV3Client(config, transport)
@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 
 
-from datetime import datetime, date
+from datetime import datetime, date, tzinfo
+from functools import lru_cache
 import pytz
 import tzlocal
 
 
+@lru_cache(maxsize=None)
+def get_local_zone() -> tzinfo:
+    # tzlocal reads system settings on every call, zone isn't changed while app works
+    return tzlocal.get_localzone()
+
+
 def get_now_with_timezone():
     utc_now = datetime.utcnow()
-    local_zone = tzlocal.get_localzone()
+    local_zone = get_local_zone()
     local_now = utc_now.replace(tzinfo=pytz.utc).astimezone(local_zone)
 
     return local_now
@@ -20,6 +27,6 @@ def shrink_time(dt: datetime):
 
 
 def date2datetime(d: date):
-    local_zone = tzlocal.get_localzone()
+    local_zone = get_local_zone()
     result = datetime(year=d.year, month=d.month, day=d.day, tzinfo=local_zone)
     return result
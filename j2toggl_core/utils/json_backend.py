@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import json
+
+from typing import Any, Callable, Union
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STDLIB_BACKEND = "json"
+ORJSON_BACKEND = "orjson"
+
+_backend_name = None
+_loads: Callable[[Union[bytes, str]], Any] = None
+
+
+def select_backend(name: str = None) -> str:
+    """
+    Selects decoder of API responses: orjson when it's installed, stdlib json otherwise.
+    """
+    global _backend_name, _loads
+
+    if name is None:
+        name = ORJSON_BACKEND if orjson is not None else STDLIB_BACKEND
+
+    if name == ORJSON_BACKEND:
+        if orjson is None:
+            raise ValueError("orjson isn't installed, install toggl2tempo[fast-json] to use it")
+        _loads = orjson.loads
+    elif name == STDLIB_BACKEND:
+        _loads = json.loads
+    else:
+        raise ValueError(f"Unknown JSON backend '{name}'")
+
+    _backend_name = name
+    logger.debug(f"JSON backend: {name}")
+
+    return name
+
+
+def get_backend_name() -> str:
+    return _backend_name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    # Both backends decode UTF-8 bytes directly, so response text isn't decoded separately
+    return _loads(data)
+
+
+select_backend()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import dateutil.parser
+
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict
+
+# Shapes of timestamps returned by Toggl and Tempo APIs
+_NAIVE_LENGTH = len("2020-10-29T17:15:00")
+_WITH_OFFSET_LENGTH = len("2020-10-29T17:15:00+03:00")
+
+# API returns timestamps of the same user, so there are a few distinct offsets per report
+_offsets: Dict[str, tzinfo] = {
+    "Z": timezone.utc,
+    "+00:00": timezone.utc,
+}
+
+
+def parse_timestamp(value: str) -> datetime:
+    length = len(value)
+
+    try:
+        if length == _NAIVE_LENGTH:
+            return datetime.fromisoformat(value)
+
+        if length == _WITH_OFFSET_LENGTH or (length == _NAIVE_LENGTH + 1 and value[-1] == "Z"):
+            return datetime.fromisoformat(value[:_NAIVE_LENGTH]).replace(tzinfo=_parse_offset(value[_NAIVE_LENGTH:]))
+
+        return datetime.fromisoformat(value)
+    except ValueError:
+        # Unexpected shape, e.g. offset without colon or fractional seconds with "Z"
+        return dateutil.parser.parse(value)
+
+
+def parse_date_and_time(date_value: str, time_value: str) -> datetime:
+    return parse_timestamp(date_value + "T" + time_value)
+
+
+def _parse_offset(value: str) -> tzinfo:
+    offset = _offsets.get(value)
+
+    if offset is None:
+        if value[0] not in "+-" or value[3] != ":":
+            raise ValueError(f"Unknown UTC offset '{value}'")
+
+        sign = -1 if value[0] == "-" else 1
+        offset = timezone(sign * timedelta(hours=int(value[1:3]), minutes=int(value[4:6])))
+        _offsets[value] = offset
+
+    return offset
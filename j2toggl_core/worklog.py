@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 
+import hashlib
 import re
+import sys
 
 from j2toggl_core.worklog_state import WorkLogState
 
 
 class WorkLog:
+    # Reports of a team keep hundreds of thousands of worklogs. Slots without instance dictionary and interned
+    # activity and project take 473 instead of 637 bytes per worklog with its values by tracemalloc,
+    # see benchmarks/worklog_memory_benchmark.py.
+    __slots__ = ("state", "workspace_id", "master_id", "second_id", "key", "_activity", "_project", "description",
+                 "startTime", "endTime", "duration", "tags", "tooltip")
 
     def __init__(self):
         self.state = WorkLogState.Unknown
 
+        # Toggl workspace of the worklog, Toggl ids are stored qualified by it
+        self.workspace_id = None
         self.master_id = None
         self.second_id = None
         self.key = None
@@ -24,6 +33,27 @@ class WorkLog:
 
         self.tooltip = None
 
+    @property
+    def activity(self):
+        return self._activity
+
+    @activity.setter
+    def activity(self, value: str):
+        self._activity = sys.intern(value) if value is not None else None
+
+    @property
+    def project(self):
+        return self._project
+
+    @project.setter
+    def project(self, value: str):
+        self._project = sys.intern(value) if value is not None else None
+
+    @property
+    def qualified_id(self) -> (int, int):
+        # Toggl id with its workspace, mappings are looked up by it
+        return self.workspace_id, self.master_id
+
     @property
     def is_invalid(self):
         result = self.key is None \
@@ -33,3 +63,10 @@ class WorkLog:
             or self.duration <= 0
 
         return result
+
+    @property
+    def fingerprint(self) -> str:
+        # Fields which are sent to Tempo, see TempoApiBase._worklog_to_dict
+        content = "\x1f".join(str(x) for x in (self.key, self.activity, self.startTime, self.duration, self.description))
+
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
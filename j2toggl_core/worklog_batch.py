@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import threading
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from j2toggl_core.worklog import WorkLog
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WorkLogCollection = List[WorkLog]
+
+MISSING = -1
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+class StringTable:
+    """
+    Interns strings of worklog batches into integer codes.
+    Batches which are compared with each other must share the same table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+
+        code = self._codes.get(value)
+        if code is None:
+            # Toggl and Tempo pages are parsed by different threads
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(value)
+                    self._codes[value] = code
+
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self._values[code] if code != MISSING else None
+
+
+class WorkLogBatch:
+    """
+    Columnar collection of worklogs: ids, start times (epoch seconds), durations and string codes
+    are kept in typed arrays instead of WorkLog objects. Missing values are stored as -1.
+    """
+
+    def __init__(self, strings: StringTable = None):
+        self.strings = strings if strings is not None else StringTable()
+
+        self.workspace_ids = array("q")
+        self.master_ids = array("q")
+        self.second_ids = array("q")
+        self.key_codes = array("q")
+        self.activity_codes = array("q")
+        self.project_codes = array("q")
+        self.description_codes = array("q")
+        self.start_times = array("q")
+        self.durations = array("q")
+
+    def __len__(self):
+        return len(self.master_ids)
+
+    def append(self, master_id: Optional[int], second_id: Optional[int], key: Optional[str],
+               activity: Optional[str], project: Optional[str], description: Optional[str],
+               start_time: datetime, duration: int, workspace_id: Optional[int] = None):
+        encode = self.strings.encode
+
+        self.workspace_ids.append(workspace_id if workspace_id is not None else MISSING)
+        self.master_ids.append(master_id if master_id is not None else MISSING)
+        self.second_ids.append(second_id if second_id is not None else MISSING)
+        self.key_codes.append(encode(key))
+        self.activity_codes.append(encode(activity))
+        self.project_codes.append(encode(project))
+        self.description_codes.append(encode(description))
+        self.start_times.append((start_time.replace(tzinfo=None) - _EPOCH) // _SECOND)
+        self.durations.append(duration)
+
+    def extend(self, worklogs: Iterable[WorkLog]):
+        for wl in worklogs:
+            self.append(wl.master_id, wl.second_id, wl.key, wl.activity, wl.project, wl.description,
+                        wl.startTime, wl.duration, wl.workspace_id)
+
+    def iter_qualified_ids(self) -> Iterator[Tuple[Optional[int], int]]:
+        # The same as WorkLog.qualified_id of the rows
+        return ((workspace_id if workspace_id != MISSING else None, master_id)
+                for workspace_id, master_id in zip(self.workspace_ids, self.master_ids))
+
+    def get_worklog(self, row: int) -> WorkLog:
+        decode = self.strings.decode
+
+        wl = WorkLog()
+        wl.workspace_id = self.workspace_ids[row] if self.workspace_ids[row] != MISSING else None
+        wl.master_id = self.master_ids[row] if self.master_ids[row] != MISSING else None
+        wl.second_id = self.second_ids[row] if self.second_ids[row] != MISSING else None
+        wl.key = decode(self.key_codes[row])
+        wl.activity = decode(self.activity_codes[row])
+        wl.project = decode(self.project_codes[row])
+        wl.description = decode(self.description_codes[row])
+        wl.startTime = _EPOCH + timedelta(seconds=self.start_times[row])
+        wl.duration = self.durations[row]
+        wl.endTime = wl.startTime + timedelta(seconds=wl.duration)
+
+        return wl
+
+    def to_worklogs(self) -> WorkLogCollection:
+        return [self.get_worklog(row) for row in range(len(self))]
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        if numpy is None:
+            raise RuntimeError("numpy isn't installed, install toggl2tempo[columnar] to use it")
+
+        # Arrays support buffer protocol, so columns aren't copied
+        return {name: numpy.frombuffer(getattr(self, name), dtype=numpy.int64) if len(self)
+                else numpy.empty(0, dtype=numpy.int64)
+                for name in ("workspace_ids", "master_ids", "second_ids", "key_codes", "activity_codes",
+                             "project_codes", "description_codes", "start_times", "durations")}
@@ -99,6 +99,7 @@ class MainWindow(QWidget):
         # Sync process events
         self._sync_manager.showMessage.connect(self.show_warning)
         self._sync_manager.showWorklogList.connect(self.update_worklog_list)
+        self._sync_manager.appendWorklogList.connect(self.append_worklog_list)
         self._sync_manager.changeStatus.connect(self.change_status)
 
     def _init_data(self):
@@ -165,3 +166,7 @@ class MainWindow(QWidget):
     @pyqtSlot(list)
     def update_worklog_list(self, worklogs: WorkLogCollection):
         self.wlList.init_data(worklogs)
+
+    @pyqtSlot(list)
+    def append_worklog_list(self, worklogs: WorkLogCollection):
+        self.wlList.append_data(worklogs)
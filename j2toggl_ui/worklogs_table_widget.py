@@ -49,7 +49,9 @@ class WorkLogsTableWidget(QWidget):
 
     def init_data(self, worklogs: WorkLogCollection):
         self.table.setRowCount(0)
+        self.append_data(worklogs)
 
+    def append_data(self, worklogs: WorkLogCollection):
         for wl in worklogs:
             row_position = self.table.rowCount()
             self.table.insertRow(row_position)
@@ -43,6 +43,16 @@ REQUIRED = [
     "loguru >=0.7.2,<0.8.0",
 ]
 
+# What packages are optional?
+EXTRAS = {
+    # asyncio clients, see j2toggl_core.aio
+    "async": ["aiohttp >=3.8,<4.0"],
+    # faster decoding of API responses, see j2toggl_core.utils.json_backend
+    "fast-json": ["orjson >=3.6"],
+    # vectorized reconciliation of worklog batches, see j2toggl_core.worklog_batch
+    "columnar": ["numpy >=1.20"],
+}
+
 here = os.path.abspath(os.path.dirname(__file__))
 
 # Read version
@@ -74,9 +84,10 @@ setup(
     author_email=EMAIL,
     python_requires=REQUIRES_PYTHON,
     url=URL,
-    packages=find_packages(exclude=["tests", "*.tests", "*.tests.*", "tests.*"]),
+    packages=find_packages(exclude=["tests", "*.tests", "*.tests.*", "tests.*", "benchmarks", "benchmarks.*"]),
     include_package_data=True,
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
     entry_points=ENTRY_POINTS,
     license='GPLv3',
     classifiers=[
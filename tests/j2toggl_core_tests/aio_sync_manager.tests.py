@@ -0,0 +1,268 @@
+import json
+import tempfile
+import threading
+import unittest
+
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from parameterized import parameterized
+
+from j2toggl_core.aio.sync_manager import AsyncSyncManager
+from j2toggl_core.aio.tempo_api_client import AsyncTempoClient
+from j2toggl_core.configuration.config import Config
+from j2toggl_core.configuration.toggl_config import TogglConfig
+from j2toggl_core.storage.sqlite_storage import SqliteStorage
+from j2toggl_core.sync_journal import SyncJournal
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+WORKSPACE_ID = 10
+ACCOUNT_ID = "account"
+
+
+def make_row(toggl_id: int, key: str, hour: int) -> dict:
+    return {"project_id": 1, "description": f"{key}. Development", "tag_ids": [], "time_entries": [
+        {"id": toggl_id, "start": f"2020-10-29T{hour:02}:00:00+03:00", "stop": f"2020-10-29T{hour:02}:15:00+03:00",
+         "seconds": 900}]}
+
+
+def make_tempo_record(tempo_id: int, key: str, hour: int, description: str = "Development") -> dict:
+    return {"tempoWorklogId": tempo_id, "issue": {"key": key}, "description": description,
+            "timeSpentSeconds": 900, "startDate": "2020-10-29", "startTime": f"{hour:02}:00:00",
+            "attributes": {"values": [{"key": "_Activity_", "value": "Development"}]}}
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    """
+    Toggl, Jira and Tempo APIs of one host.
+    """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        self.server.requests.append(("GET", url.path))
+
+        if url.path == "/api/v9/workspaces":
+            self.send_json([{"id": WORKSPACE_ID}])
+        elif url.path == f"/api/v9/workspaces/{WORKSPACE_ID}/projects":
+            self.send_json([{"id": 1, "name": "Development"}] if params["page"] == ["1"] else [])
+        elif url.path == f"/api/v9/workspaces/{WORKSPACE_ID}/tags":
+            self.send_json([])
+        elif url.path == "/reports/api/v2/details":
+            if self.server.report_status != 200:
+                self.send_json({"error": "failed"}, status=self.server.report_status)
+                return
+
+            records = [{"id": te["id"], "project": "Development", "description": row["description"], "tags": [],
+                        "start": te["start"], "end": te["stop"], "dur": te["seconds"] * 1000}
+                       for row in self.server.rows for te in row["time_entries"]]
+            self.send_json({"total_count": len(records), "per_page": 50, "data": records})
+        elif url.path == "/rest/api/3/myself":
+            self.send_json({"accountId": ACCOUNT_ID, "displayName": "User"})
+        elif url.path == f"/core/3/worklogs/user/{ACCOUNT_ID}":
+            results = list(self.server.tempo_worklogs.values())
+            self.send_json({"metadata": {"count": len(results), "offset": 0, "limit": 1000}, "results": results})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.read_json()
+        self.server.requests.append(("POST", url.path))
+
+        if url.path == f"/reports/api/v3/workspace/{WORKSPACE_ID}/search/time_entries":
+            if self.server.report_status != 200:
+                self.send_json({"error": "failed"}, status=self.server.report_status)
+                return
+
+            self.send_json(self.server.rows)
+        elif url.path == "/core/3/worklogs":
+            self.server.next_tempo_id += 1
+            self.save_tempo_worklog(self.server.next_tempo_id, body)
+            self.send_json({"tempoWorklogId": self.server.next_tempo_id})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_PUT(self):
+        url = urlsplit(self.path)
+        body = self.read_json()
+        self.server.requests.append(("PUT", url.path))
+
+        tempo_id = int(url.path.rsplit("/", 1)[1])
+        if self.server.tempo_worklogs[tempo_id]["issue"]["key"] != body["issueKey"]:
+            # Tempo rejects change of issue of another project
+            self.send_json({"error": "issue can't be changed"}, status=400)
+            return
+
+        self.save_tempo_worklog(tempo_id, body)
+        self.send_json({"tempoWorklogId": tempo_id})
+
+    def do_DELETE(self):
+        url = urlsplit(self.path)
+        self.server.requests.append(("DELETE", url.path))
+
+        del self.server.tempo_worklogs[int(url.path.rsplit("/", 1)[1])]
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def save_tempo_worklog(self, tempo_id: int, body: dict):
+        self.server.tempo_worklogs[tempo_id] = {
+            "tempoWorklogId": tempo_id, "issue": {"key": body["issueKey"]}, "description": body["description"],
+            "timeSpentSeconds": body["timeSpentSeconds"], "startDate": body["startDate"],
+            "startTime": body["startTime"], "attributes": {"values": body["attributes"]}}
+
+    def read_json(self) -> dict:
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def send_json(self, data, status: int = 200):
+        content = json.dumps(data).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AsyncSyncManager_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.storage = SqliteStorage(Path(self._directory.name).joinpath("test.db"))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeServicesHandler)
+        self.server.requests = []
+        self.server.rows = []
+        self.server.report_status = 200
+        self.server.tempo_worklogs = {}
+        self.server.next_tempo_id = 600
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        host = "http://127.0.0.1:{0}".format(self.server.server_address[1])
+
+        self._tempo_url = AsyncTempoClient._tempo_legacy_rest_api_url
+        AsyncTempoClient._tempo_legacy_rest_api_url = host + "/core"
+
+        self.config = Config()
+        self.config.toggl.token = "toggl_token"
+        self.config.toggl.user_agent = "user@example.com"
+        self.config.toggl.api_url = host
+        self.config.jira.host = host
+        self.config.jira.user = "user@example.com"
+        self.config.jira.token = "jira_token"
+        self.config.tempo.token = "tempo_token"
+
+        self.statuses = []
+        self.sync_manager = AsyncSyncManager(self.config, self.storage, self.statuses.append)
+
+    def tearDown(self):
+        AsyncTempoClient._tempo_legacy_rest_api_url = self._tempo_url
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.storage.close()
+        self._directory.cleanup()
+
+    def test_sync_should_record_pushes_in_mappings_fingerprints_and_mirror(self):
+        self.server.rows = [make_row(1001, "TEST-1", 9), make_row(1002, "TEST-2", 10)]
+        self.server.tempo_worklogs = {501: make_tempo_record(501, "TEST-1", 9, description="Old description")}
+        self.add_mapping(1001, 501)
+
+        self.assertTrue(self.sync_manager.run(date(2020, 10, 29), date(2020, 10, 29)))
+
+        self.assertEqual("Result: added 1/2, updated 1/2, skipped 0/2, failed: 0/2.", self.statuses[-1])
+        self.assertEqual("Development", self.server.tempo_worklogs[501]["description"])
+
+        updated, added = self.sync_manager.worklogs
+        self.storage.open()
+        self.assertEqual({(10, 1001): 501, (10, 1002): 601},
+                         self.storage.get_qualified_second_ids([(10, 1001), (10, 1002)]))
+        self.assertEqual({(10, 1001): updated.fingerprint, (10, 1002): added.fingerprint},
+                         self.storage.get_qualified_fingerprints([(10, 1001), (10, 1002)]))
+        self.assertEqual([], self.storage.get_pending_operations())
+
+        mirrored, _ = self.storage.get_mirrored_worklogs(ACCOUNT_ID, date(2020, 10, 29), date(2020, 10, 29))
+        self.assertEqual({501: "Development", 601: "Development"}, {x.second_id: x.description for x in mirrored})
+
+    def test_sync_should_replace_mapping_of_worklog_moved_by_delete_and_add(self):
+        self.server.rows = [make_row(1001, "OTHER-1", 9)]
+        self.server.tempo_worklogs = {501: make_tempo_record(501, "TEST-1", 9)}
+        self.add_mapping(1001, 501)
+
+        self.assertTrue(self.sync_manager.run(date(2020, 10, 29), date(2020, 10, 29)))
+
+        self.assertEqual([601], list(self.server.tempo_worklogs.keys()))
+        self.storage.open()
+        self.assertEqual({(10, 1001): 601}, self.storage.get_qualified_second_ids([(10, 1001)]))
+        mirrored, _ = self.storage.get_mirrored_worklogs(ACCOUNT_ID, date(2020, 10, 29), date(2020, 10, 29))
+        self.assertEqual([601], [x.second_id for x in mirrored])
+
+    def test_load_should_resume_interrupted_add(self):
+        self.server.rows = [make_row(1001, "TEST-1", 9)]
+        # Tempo worklog was added before crash, but its mapping wasn't stored
+        self.server.tempo_worklogs = {501: make_tempo_record(501, "TEST-1", 9)}
+
+        crashed = WorkLog()
+        crashed.state = WorkLogState.New
+        crashed.workspace_id = WORKSPACE_ID
+        crashed.master_id = 1001
+        crashed.key = "TEST-1"
+        crashed.activity = "Development"
+        crashed.description = "Development"
+        crashed.startTime = datetime(2020, 10, 29, 9, 0)
+        crashed.duration = 900
+
+        self.storage.open()
+        SyncJournal(self.storage).begin([crashed])
+        self.storage.close()
+
+        self.assertTrue(self.sync_manager.run(date(2020, 10, 29), date(2020, 10, 29), only_load=True))
+
+        self.assertEqual(WorkLogState.Synced, self.sync_manager.worklogs[0].state)
+        self.storage.open()
+        self.assertEqual({(10, 1001): 501}, self.storage.get_qualified_second_ids([(10, 1001)]))
+        self.assertEqual([], self.storage.get_pending_operations())
+
+    @parameterized.expand([
+        (TogglConfig.REPORTS_API_V2, ("GET", "/reports/api/v2/details")),
+        (TogglConfig.REPORTS_API_V3, ("POST", f"/reports/api/v3/workspace/{WORKSPACE_ID}/search/time_entries")),
+    ])
+    def test_load_should_use_configured_reports_api(self, reports_api: str, expected_request: tuple):
+        self.server.rows = [make_row(1001, "TEST-1", 9)]
+        self.config.toggl.reports_api = reports_api
+
+        self.assertTrue(self.sync_manager.run(date(2020, 10, 29), date(2020, 10, 29), only_load=True))
+
+        self.assertIn(expected_request, self.server.requests)
+        self.assertEqual([(1001, "TEST-1", "Development")],
+                         [(x.master_id, x.key, x.description) for x in self.sync_manager.worklogs])
+
+    @parameterized.expand([(TogglConfig.REPORTS_API_V2,), (TogglConfig.REPORTS_API_V3,)])
+    def test_load_with_failed_report_page_should_fail(self, reports_api: str):
+        self.server.report_status = 500
+        self.config.toggl.reports_api = reports_api
+
+        self.assertFalse(self.sync_manager.run(date(2020, 10, 29), date(2020, 10, 29), only_load=True))
+
+        self.assertIn("Sync error occurred", self.statuses[-1])
+
+    def add_mapping(self, toggl_id: int, tempo_id: int):
+        wl = WorkLog()
+        wl.workspace_id = WORKSPACE_ID
+        wl.master_id = toggl_id
+        wl.second_id = tempo_id
+
+        self.storage.open()
+        self.storage.add(wl)
+        self.storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from parameterized import parameterized
+
+from j2toggl_core.classification_rules import ClassificationRules
+from j2toggl_core.configuration.rules_config import RulesConfig
+
+
+class ClassificationRules_Tests(unittest.TestCase):
+
+    @parameterized.expand([
+        ((), "TEST-1. Development", "TEST-1", "Development"),
+        ((), "TEST-1 Development", None, "TEST-1 Development"),
+        ((), "Call. TEST-1", None, "Call. TEST-1"),
+        (("billable", "key_TEST-2"), "TEST-1. Development", "TEST-2", "TEST-1. Development"),
+        (("key_Call",), "TEST-1. Development", None, "TEST-1. Development"),
+    ])
+    def test_default_rules_should_take_key_from_tag_or_description(self, tags, description, key, expected_description):
+        rules = ClassificationRules()
+
+        self.assertEqual((key, expected_description), rules.parse_key(tags, description))
+
+    @parameterized.expand([
+        ("CodeReview", "Code Review"),
+        ("Unknown project", "Other"),
+        (None, None),
+    ])
+    def test_default_rules_should_give_activity_by_project(self, project, activity):
+        self.assertEqual(activity, ClassificationRules().get_activity(project))
+
+    def test_configured_rules_should_replace_default_ones(self):
+        config = RulesConfig()
+        config.key_tag_prefixes = ["jira:"]
+        config.key_patterns = [r"\[(?P<key>\w+-\d+)\]\s*(?P<description>.*)", r".*\b(?P<key>OPS-\d+)"]
+        config.activities = {"Support": "Support"}
+        config.default_activity = "Development"
+        rules = ClassificationRules(config)
+
+        self.assertEqual(("TEST-3", "Fix", "Support"), rules.classify("Support", ("jira:TEST-3",), "Fix"))
+        self.assertEqual(("TEST-4", "Fix", "Development"), rules.classify("Dev", ("key_TEST-1",), "[TEST-4] Fix"))
+        self.assertEqual(("OPS-5", "Deploy of OPS-5", "Development"), rules.classify("Dev", (), "Deploy of OPS-5"))
+
+    @parameterized.expand([
+        ("TEST-1. Fix", "TEST-1", "Fix"),
+        ("TEST-1", "TEST-1", "TEST-1"),
+    ])
+    def test_configured_pattern_with_optional_description_should_keep_unmatched_description(
+            self, description, key, expected_description):
+        config = RulesConfig()
+        config.key_patterns = [r"(?P<key>\w+-\d+)(?:\.(?P<description>.*))?"]
+        rules = ClassificationRules(config)
+
+        self.assertEqual((key, expected_description, "Other"), rules.classify("P", (), description))
+
+    def test_classify_should_memoize_the_same_entries(self):
+        rules = ClassificationRules()
+
+        for _ in range(3):
+            rules.classify("Development", ("key_TEST-1",), "Development")
+
+        self.assertEqual(2, rules.classify.cache_info().hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
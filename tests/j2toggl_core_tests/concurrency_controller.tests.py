@@ -0,0 +1,76 @@
+import unittest
+
+from j2toggl_core.net.concurrency_controller import ConcurrencyController
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ConcurrencyController_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.controller = ConcurrencyController("api.tempo.io", 1, 8, self.clock)
+
+    def test_limit_should_grow_by_about_one_per_window_of_fast_requests(self):
+        self.send_requests(count=6, latency=0.1)
+
+        self.assertEqual(5, self.controller.limit)
+
+    def test_limit_should_not_exceed_max_bound(self):
+        self.send_requests(count=100, latency=0.1)
+
+        self.assertEqual(8, self.controller.limit)
+
+    def test_throttled_request_should_halve_limit_once_per_window(self):
+        started_at = self.clock.now
+        for _ in range(4):
+            self.controller.acquire()
+
+        self.clock.now += 0.1
+        for _ in range(4):
+            self.controller.release(started_at, is_overloaded=True)
+
+        self.assertEqual(2, self.controller.limit)
+        self.assertEqual(0, self.controller.in_flight)
+
+    def test_slow_request_should_decrease_limit_but_not_below_min_bound(self):
+        self.send_requests(count=1, latency=0.1)
+        self.send_requests(count=3, latency=1.0)
+
+        self.assertEqual(1, self.controller.limit)
+
+    def test_slow_endpoint_should_not_decrease_limit_of_fast_endpoint(self):
+        for _ in range(4):
+            self.send_requests(count=1, latency=0.05, endpoint="PUT /core/3/worklogs/*")
+            self.send_requests(count=1, latency=1.0, endpoint="GET /reports/api/v2/details")
+
+        self.assertEqual(5, self.controller.limit)
+
+        self.send_requests(count=1, latency=0.5, endpoint="PUT /core/3/worklogs/*")
+
+        self.assertEqual(2, self.controller.limit)
+
+    def test_set_bounds_should_clamp_current_limit(self):
+        self.controller.set_bounds(1, 2)
+
+        self.assertEqual(2, self.controller.limit)
+
+        with self.assertRaises(ValueError):
+            self.controller.set_bounds(3, 2)
+
+    def send_requests(self, count: int, latency: float, endpoint: str = ""):
+        for _ in range(count):
+            self.controller.acquire()
+            started_at = self.clock.now
+            self.clock.now += latency
+            self.controller.release(started_at, endpoint=endpoint)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from j2toggl_core.configuration.network_config import NetworkConfig
+from j2toggl_core.net.http_transport import HttpTransport
+from j2toggl_core.net.request_scheduler import RequestScheduler
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+
+        if self.path == "/slow":
+            self.server.release.wait(5)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body) * 2))
+        self.end_headers()
+        self.wfile.write(body * 2)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpTransport_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeApiHandler)
+        self.server.release = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.url = "http://127.0.0.1:{0}".format(self.server.server_address[1])
+
+        config = NetworkConfig()
+        config.read_timeout = 0.2
+        self.transport = HttpTransport(RequestScheduler(), config)
+
+    def tearDown(self):
+        self.server.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_request_should_report_latency_and_bytes_to_hooks(self):
+        metrics = []
+        self.transport.add_hook(metrics.append)
+
+        r = self.transport.post(self.url + "/echo", data=b"12345")
+
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(1, len(metrics))
+        self.assertEqual(("POST", 200, 5, 10),
+                         (metrics[0].method, metrics[0].status_code, metrics[0].sent_bytes, metrics[0].received_bytes))
+        self.assertLess(0, metrics[0].elapsed)
+
+    def test_request_to_hung_server_should_fail_by_read_timeout(self):
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.transport.post(self.url + "/slow", data=b"1")
+
+
+if __name__ == '__main__':
+    unittest.main()
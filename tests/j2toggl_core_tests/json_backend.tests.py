@@ -0,0 +1,32 @@
+import json
+import unittest
+
+from j2toggl_core.utils import json_backend
+
+
+class JsonBackend_Tests(unittest.TestCase):
+
+    def tearDown(self):
+        json_backend.select_backend()
+
+    def test_backends_should_decode_response_bytes_equally(self):
+        data = {"data": [{"id": 1, "description": "TEST-1. Разработка", "dur": 900000, "tags": []}], "next": None}
+        content = json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+        backends = [json_backend.STDLIB_BACKEND]
+        if json_backend.orjson is not None:
+            backends.append(json_backend.ORJSON_BACKEND)
+
+        for backend in backends:
+            json_backend.select_backend(backend)
+
+            self.assertEqual(backend, json_backend.get_backend_name())
+            self.assertEqual(data, json_backend.loads(content))
+
+    def test_select_unknown_backend_should_fail(self):
+        with self.assertRaises(ValueError):
+            json_backend.select_backend("yaml")
+
+
+if __name__ == '__main__':
+    unittest.main()
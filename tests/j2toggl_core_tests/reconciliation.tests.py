@@ -0,0 +1,194 @@
+import unittest
+
+from datetime import datetime, timedelta
+
+from parameterized import parameterized
+
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.reconciliation import WorkLogReconciler, reconcile_batches
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_batch import StringTable, WorkLogBatch, numpy
+from j2toggl_core.worklog_state import WorkLogState
+
+
+class WorkLogReconciler_Tests(unittest.TestCase):
+
+    def test_reconcile_should_classify_all_states(self):
+        synced, synced_tempo = self.create_pair(1, 101)
+        updated, updated_tempo = self.create_pair(2, 102)
+        updated_tempo.description = "Old description"
+        moved, moved_tempo = self.create_pair(3, 103)
+        moved_tempo.key = "TEST-999"
+        new, _ = self.create_pair(4, 104)
+        incomplete, _ = self.create_pair(5, 105)
+        incomplete.key = None
+
+        reconciler = WorkLogReconciler([moved_tempo, updated_tempo, synced_tempo])
+        second_ids = {(None, 1): 101, (None, 2): 102, (None, 3): 103}
+        result = reconciler.reconcile([synced, updated, moved, new, incomplete], second_ids)
+
+        self.assertEqual(WorkLogState.Synced, synced.state)
+        self.assertEqual(WorkLogState.Updated, updated.state)
+        self.assertEqual(WorkLogState.Moved, moved.state)
+        self.assertEqual(WorkLogState.New, new.state)
+        self.assertEqual(WorkLogState.Incomplete, incomplete.state)
+        self.assertTrue(result.has_incomplete_worklog)
+        self.assertEqual(1, result.counters[WorkLogState.Synced])
+
+    def test_reconcile_with_missed_tempo_worklog_should_raise(self):
+        toggl, _ = self.create_pair(1, 101)
+
+        reconciler = WorkLogReconciler([])
+
+        with self.assertRaises(SyncException):
+            reconciler.reconcile([toggl], {(None, 1): 101})
+
+    def test_reconcile_with_same_fingerprint_should_not_consult_tempo(self):
+        toggl, _ = self.create_pair(1, 101)
+
+        reconciler = WorkLogReconciler([])
+        reconciler.reconcile([toggl], {(None, 1): 101}, {(None, 1): toggl.fingerprint})
+
+        self.assertEqual(WorkLogState.Synced, toggl.state)
+
+    def test_reconcile_with_other_fingerprint_should_compare_with_tempo(self):
+        toggl, tempo = self.create_pair(1, 101)
+        tempo.duration = 30 * 60
+        fingerprint = tempo.fingerprint
+
+        reconciler = WorkLogReconciler([tempo])
+        reconciler.reconcile([toggl], {(None, 1): 101}, {(None, 1): fingerprint})
+
+        self.assertEqual(WorkLogState.Updated, toggl.state)
+
+    def test_reconcile_should_map_the_same_id_of_other_workspace_independently(self):
+        synced, tempo = self.create_pair(1, 101)
+        synced.workspace_id = 10
+        new, _ = self.create_pair(1, 101)
+        new.workspace_id = 20
+        new.startTime += timedelta(hours=1)
+
+        reconciler = WorkLogReconciler([tempo])
+        reconciler.reconcile([synced, new], {(10, 1): 101})
+
+        self.assertEqual(WorkLogState.Synced, synced.state)
+        self.assertEqual(WorkLogState.New, new.state)
+        self.assertIsNone(new.second_id)
+
+    def test_reconcile_new_worklog_with_unmapped_tempo_copy_should_set_tooltip(self):
+        toggl, tempo = self.create_pair(1, 101)
+
+        reconciler = WorkLogReconciler([tempo])
+        reconciler.reconcile([toggl], {})
+
+        self.assertEqual(WorkLogState.New, toggl.state)
+        self.assertIn("TempoId=101", toggl.tooltip)
+
+    @staticmethod
+    def create_pair(master_id: int, second_id: int) -> (WorkLog, WorkLog):
+        toggl = WorkLog()
+        toggl.master_id = master_id
+        toggl.key = "TEST-{0}".format(master_id)
+        toggl.project = "Development"
+        toggl.activity = "Development"
+        toggl.description = "Development"
+        toggl.startTime = datetime(2020, 10, 29, 9, 0) + timedelta(hours=master_id)
+        toggl.endTime = toggl.startTime + timedelta(minutes=15)
+        toggl.duration = 15 * 60
+        toggl.tags = []
+
+        tempo = WorkLog()
+        tempo.second_id = second_id
+        tempo.key = toggl.key
+        tempo.activity = toggl.activity
+        tempo.description = toggl.description
+        tempo.startTime = toggl.startTime
+        tempo.endTime = toggl.endTime
+        tempo.duration = toggl.duration
+
+        return toggl, tempo
+
+
+
+class ReconcileBatches_Tests(unittest.TestCase):
+
+    @parameterized.expand([("arrays", False), ("numpy", True)])
+    def test_reconcile_batches_should_match_object_reconciliation(self, _, use_numpy: bool):
+        if use_numpy and numpy is None:
+            self.skipTest("numpy isn't installed")
+
+        toggl_worklogs, tempo_worklogs, second_ids = self.create_worklogs()
+
+        strings = StringTable()
+        toggl_batch = WorkLogBatch(strings)
+        toggl_batch.extend(toggl_worklogs)
+        tempo_batch = WorkLogBatch(strings)
+        tempo_batch.extend(tempo_worklogs)
+
+        result = reconcile_batches(toggl_batch, tempo_batch, second_ids, use_numpy=use_numpy)
+        expected = WorkLogReconciler(tempo_worklogs).reconcile(toggl_worklogs, second_ids)
+
+        self.assertEqual([x.state.value for x in toggl_worklogs], list(result.states))
+        self.assertEqual(expected.counters, result.counters)
+
+    @parameterized.expand([("arrays", False), ("numpy", True)])
+    def test_reconcile_batches_with_missed_tempo_worklog_should_raise(self, _, use_numpy: bool):
+        if use_numpy and numpy is None:
+            self.skipTest("numpy isn't installed")
+
+        toggl_worklogs, tempo_worklogs, second_ids = self.create_worklogs()
+
+        strings = StringTable()
+        toggl_batch = WorkLogBatch(strings)
+        toggl_batch.extend(toggl_worklogs)
+        tempo_batch = WorkLogBatch(strings)
+        tempo_batch.extend(x for x in tempo_worklogs if x.second_id != 102)
+
+        with self.assertRaises(SyncException):
+            reconcile_batches(toggl_batch, tempo_batch, second_ids, use_numpy=use_numpy)
+
+    def test_reconcile_batches_with_different_string_tables_should_fail(self):
+        with self.assertRaises(ValueError):
+            reconcile_batches(WorkLogBatch(), WorkLogBatch(), {})
+
+    def test_batch_should_restore_worklogs(self):
+        toggl_worklogs, _, _ = self.create_worklogs()
+
+        batch = WorkLogBatch()
+        batch.extend(toggl_worklogs)
+        restored = batch.to_worklogs()
+
+        self.assertEqual([x.fingerprint for x in toggl_worklogs], [x.fingerprint for x in restored])
+        self.assertEqual([x.master_id for x in toggl_worklogs], [x.master_id for x in restored])
+
+    @staticmethod
+    def create_worklogs():
+        toggl_worklogs = []
+        tempo_worklogs = []
+        second_ids = {}
+
+        for i in range(1, 61):
+            toggl, tempo = WorkLogReconciler_Tests.create_pair(i, 100 + i)
+            toggl_worklogs.append(toggl)
+
+            kind = i % 6
+            if kind == 0:
+                # New
+                continue
+            if kind == 1:
+                toggl.key = None
+            elif kind == 2:
+                tempo.key = "TEST-999"
+            elif kind == 3:
+                tempo.description = "Old description"
+            elif kind == 4:
+                tempo.startTime -= timedelta(minutes=15)
+
+            tempo_worklogs.append(tempo)
+            second_ids[toggl.qualified_id] = tempo.second_id
+
+        return toggl_worklogs, tempo_worklogs, second_ids
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+import requests
+
+from j2toggl_core.net.request_scheduler import RequestScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeSemaphore:
+    def __init__(self):
+        self.is_held = False
+        self.acquired_count = 0
+
+    def acquire(self):
+        self.is_held = True
+        self.acquired_count += 1
+
+    def release(self):
+        self.is_held = False
+
+
+class RequestScheduler_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = RequestScheduler(self.clock, self.clock.sleep)
+        self.scheduler.backoff_delay = lambda attempt: 0.5 * 2 ** attempt
+
+    def test_token_bucket_should_allow_burst_and_then_keep_rate(self):
+        bucket = TokenBucket(rate=2.0, capacity=3, clock=self.clock, sleep=self.clock.sleep)
+
+        for _ in range(5):
+            bucket.acquire()
+
+        self.assertEqual(1.0, self.clock.now)
+
+    def test_send_should_honour_retry_after_of_throttled_request(self):
+        answers = iter([self.create_response(429, {"Retry-After": "7"}), self.create_response(200)])
+
+        response = self.scheduler.send("POST", "https://api.tempo.io/core/3/worklogs", lambda: next(answers))
+
+        self.assertEqual(200, response.status_code)
+        self.assertLessEqual(7.0, self.clock.now)
+
+        budget = self.scheduler.get_budget("api.tempo.io")
+        self.assertEqual((2, 1, 1), (budget.requests_count, budget.throttled_count, budget.retries_count))
+
+    def test_send_should_retry_transient_error_with_backoff_only_for_idempotent_requests(self):
+        answers = iter([self.create_response(503), self.create_response(503), self.create_response(200)])
+        response = self.scheduler.send("GET", "https://jira.example.com/rest", lambda: next(answers))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([0.5, 1.0], self.clock.sleeps)
+
+        answers = iter([self.create_response(503), self.create_response(200)])
+        response = self.scheduler.send("POST", "https://jira.example.com/rest", lambda: next(answers))
+
+        self.assertEqual(503, response.status_code)
+
+    def test_send_should_return_last_answer_when_retries_are_exhausted(self):
+        calls = []
+
+        def send():
+            calls.append(1)
+            return self.create_response(429)
+
+        response = self.scheduler.send("GET", "https://api.track.toggl.com/api/v9/me", send)
+
+        self.assertEqual(429, response.status_code)
+        self.assertEqual(RequestScheduler.MAX_RETRIES + 1, len(calls))
+
+    def test_send_should_not_hold_shared_limit_while_waiting_for_rate(self):
+        shared_limit = FakeSemaphore()
+        held_while_sleeping = []
+
+        def sleep(seconds: float):
+            held_while_sleeping.append(shared_limit.is_held)
+            self.clock.sleep(seconds)
+
+        scheduler = RequestScheduler(self.clock, sleep)
+        scheduler.set_shared_limit("api.tempo.io", shared_limit)
+
+        for _ in range(15):
+            scheduler.send("GET", "https://api.tempo.io/core/3/worklogs", lambda: self.create_response(200))
+
+        self.assertTrue(held_while_sleeping)
+        self.assertNotIn(True, held_while_sleeping)
+        self.assertEqual(15, shared_limit.acquired_count)
+
+    def test_parse_retry_after_should_support_seconds_and_http_date(self):
+        self.assertEqual(5.0, RequestScheduler.parse_retry_after("5"))
+        self.assertEqual(0.0, RequestScheduler.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"))
+        self.assertIsNone(RequestScheduler.parse_retry_after("soon"))
+
+    def test_endpoint_of_should_not_depend_on_ids(self):
+        self.assertEqual("PUT /core/*/worklogs/*",
+                         RequestScheduler.endpoint_of("put", "https://api.tempo.io/core/3/worklogs/101"))
+        self.assertEqual(RequestScheduler.endpoint_of("PUT", "https://api.tempo.io/core/3/worklogs/101"),
+                         RequestScheduler.endpoint_of("PUT", "https://api.tempo.io/core/3/worklogs/202?x=1"))
+        self.assertNotEqual(RequestScheduler.endpoint_of("GET", "https://api.tempo.io/core/3/worklogs/101"),
+                            RequestScheduler.endpoint_of("PUT", "https://api.tempo.io/core/3/worklogs/101"))
+
+    @staticmethod
+    def create_response(status_code: int, headers: dict = None) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+        response._content = b""
+
+        return response
+
+
+if __name__ == '__main__':
+    unittest.main()
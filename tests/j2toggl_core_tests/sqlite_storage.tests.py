@@ -0,0 +1,161 @@
+import sqlite3
+import tempfile
+import unittest
+
+from datetime import date, datetime
+from pathlib import Path
+
+from j2toggl_core.storage.sqlite_storage import SqliteStorage
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+
+class SqliteStorage_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.storage = SqliteStorage(Path(self._directory.name).joinpath("test.db"))
+        self.storage.open()
+
+    def tearDown(self):
+        self.storage.close()
+        self._directory.cleanup()
+
+    def test_get_second_ids_should_resolve_more_ids_than_query_parameters_limit(self):
+        for i in range(2500):
+            self.storage.add(self.create_worklog(i, 10000 + i))
+
+        result = self.storage.get_second_ids(range(-10, 3000))
+
+        self.assertEqual(2500, len(result))
+        self.assertEqual(10000, result[0])
+        self.assertEqual(12499, result[2499])
+
+    def test_transaction_should_keep_order_of_delete_and_add(self):
+        self.storage.add(self.create_worklog(1, 101))
+
+        with self.storage.transaction():
+            self.storage.delete(self.create_worklog(1, 101))
+            self.storage.add(self.create_worklog(1, 102))
+
+        self.assertEqual(102, self.storage.get_second_id(1))
+
+    def test_transaction_should_commit_by_chunks(self):
+        with self.storage.transaction(chunk_size=2):
+            for i in range(3):
+                self.storage.add(self.create_worklog(i, 100 + i))
+
+            self.assertEqual(2, self.count_committed_mappings())
+
+        self.assertEqual(3, self.count_committed_mappings())
+
+    def test_transaction_interrupted_by_error_should_commit_done_changes(self):
+        with self.assertRaises(ValueError):
+            with self.storage.transaction():
+                self.storage.add(self.create_worklog(1, 101))
+                raise ValueError()
+
+        self.assertEqual(1, self.count_committed_mappings())
+
+    def test_open_should_migrate_legacy_database(self):
+        legacy_path = Path(self._directory.name).joinpath("legacy.db")
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute("CREATE TABLE sync_key (master_key integer NOT NULL, second_key integer NOT NULL)")
+        conn.execute("INSERT INTO sync_key (master_key, second_key) VALUES (1, 101)")
+        conn.commit()
+        conn.close()
+
+        storage = SqliteStorage(legacy_path)
+        storage.open()
+        try:
+            self.assertEqual(101, storage.get_second_id(1))
+            self.assertEqual({101: 1}, storage.get_master_ids([101]))
+            self.assertIsNone(storage.get_mirrored_worklogs("account", date(2020, 10, 29), date(2020, 10, 29)))
+        finally:
+            storage.close()
+
+    def test_interrupted_migration_should_be_rolled_back_and_repeated(self):
+        legacy_path = Path(self._directory.name).joinpath("legacy.db")
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute("CREATE TABLE sync_key (master_key integer NOT NULL, second_key integer NOT NULL)")
+        conn.execute("INSERT INTO sync_key (master_key, second_key) VALUES (1, 101)")
+        conn.commit()
+        conn.close()
+
+        migrations = SqliteStorage._SqliteStorage__migrations
+        try:
+            # The last migration fails after its tables are created
+            SqliteStorage._SqliteStorage__migrations = migrations[:-1] + [migrations[-1] + ["SELECT * FROM crash"]]
+            with self.assertRaises(sqlite3.OperationalError):
+                SqliteStorage(legacy_path).open()
+        finally:
+            SqliteStorage._SqliteStorage__migrations = migrations
+
+        conn = sqlite3.connect(str(legacy_path))
+        try:
+            self.assertEqual(len(migrations) - 1, conn.execute("PRAGMA user_version").fetchone()[0])
+            self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'sync_key_v4'").fetchone())
+        finally:
+            conn.close()
+
+        storage = SqliteStorage(legacy_path)
+        storage.open()
+        try:
+            self.assertEqual(101, storage.get_second_id(1))
+        finally:
+            storage.close()
+
+    def test_assign_unknown_workspace_should_qualify_legacy_mappings(self):
+        self.storage.add(self.create_worklog(1, 101))
+        self.storage.add(self.create_worklog(2, 102, workspace_id=20))
+
+        self.storage.assign_unknown_workspace(10)
+
+        self.assertEqual({1: 101}, self.storage.get_second_ids([1, 2], workspace_id=10))
+        self.assertEqual({2: 102}, self.storage.get_second_ids([1, 2], workspace_id=20))
+        self.assertEqual({}, self.storage.get_second_ids([1, 2]))
+
+    def test_mappings_of_the_same_id_in_different_workspaces_should_be_independent(self):
+        self.storage.add(self.create_worklog(1, 101, workspace_id=10))
+        self.storage.add(self.create_worklog(1, 201, workspace_id=20))
+
+        self.storage.delete(self.create_worklog(1, 101, workspace_id=10))
+
+        self.assertIsNone(self.storage.get_second_id(1, workspace_id=10))
+        self.assertEqual(201, self.storage.get_second_id(1, workspace_id=20))
+
+    def test_operations_of_the_same_id_in_different_workspaces_should_be_independent(self):
+        first = self.create_worklog(1, 101, workspace_id=10)
+        second = self.create_worklog(1, 201, workspace_id=20)
+        for wl in (first, second):
+            wl.state = WorkLogState.Updated
+            wl.startTime = datetime(2020, 10, 29, 9, 0)
+            wl.duration = 15 * 60
+            self.storage.add(wl)
+
+        operation_ids = self.storage.begin_operations([first, second])
+        self.storage.complete_operation(operation_ids[(10, 1)])
+
+        self.assertEqual({(10, 1), (20, 1)}, set(operation_ids.keys()))
+        self.assertEqual([(20, 201)], [(x.workspace_id, x.second_id) for _, x in self.storage.get_pending_operations()])
+        self.assertEqual({(10, 1): 101, (20, 1): 201}, self.storage.get_qualified_second_ids([(10, 1), (20, 1)]))
+
+    def count_committed_mappings(self) -> int:
+        conn = sqlite3.connect(str(Path(self._directory.name).joinpath("test.db")))
+        try:
+            return conn.execute("SELECT COUNT(*) FROM sync_key").fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def create_worklog(master_id: int, second_id: int, workspace_id: int = None) -> WorkLog:
+        wl = WorkLog()
+        wl.workspace_id = workspace_id
+        wl.master_id = master_id
+        wl.second_id = second_id
+
+        return wl
+
+
+if __name__ == '__main__':
+    unittest.main()
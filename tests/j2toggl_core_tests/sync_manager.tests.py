@@ -0,0 +1,395 @@
+import copy
+import tempfile
+import threading
+import unittest
+
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from j2toggl_core.configuration.config import Config
+from j2toggl_core.jira_api_client import JiraUser
+from j2toggl_core.storage.sqlite_storage import SqliteStorage
+from j2toggl_core.sync_journal import SyncJournal
+from j2toggl_core.sync_manager import SyncManager
+from j2toggl_core.sync_plan import SyncPlan
+from j2toggl_core.utils.datetime_utils import get_local_zone
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_batch import WorkLogBatch
+from j2toggl_core.worklog_state import WorkLogState
+
+
+class FakeTogglClient:
+    def __init__(self, pages: list, primary_workspace_id: int = None):
+        self.pages = pages
+        self.primary_workspace_id = primary_workspace_id
+
+    def login(self) -> bool:
+        return True
+
+    def iter_detailed_report(self, start_date: datetime, end_date: datetime = None):
+        yield from self.pages
+
+    def get_detailed_report_batch(self, start_date: datetime, end_date: datetime = None,
+                                  batch: WorkLogBatch = None) -> WorkLogBatch:
+        for page in self.pages:
+            batch.extend(page)
+
+        return batch
+
+
+class FakeTempoClient:
+    def __init__(self, worklogs: list = None):
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self.worklogs = worklogs or []
+        self.calls = []
+        self.user = JiraUser("account", "name", "email")
+
+    def login(self) -> bool:
+        return True
+
+    def iter_worklogs(self, start_date: datetime, end_date: datetime, updated_from: date = None):
+        with self._lock:
+            self.calls.append(("get", updated_from))
+
+        yield self.worklogs
+
+    def get_worklogs_batch(self, start_date: datetime, end_date: datetime, batch: WorkLogBatch = None):
+        batch.extend(self.worklogs)
+
+        return batch
+
+    def add_worklog(self, worklog: WorkLog) -> bool:
+        with self._lock:
+            self.calls.append(("add", worklog.master_id))
+            if worklog.key == "FAIL-1":
+                return False
+
+            self._next_id += 1
+            worklog.second_id = self._next_id
+
+            if worklog.key == "CRASH-1":
+                # Worklog is created in Tempo, but the process dies before the answer is handled
+                self.worklogs.append(copy.copy(worklog))
+                raise RuntimeError("Crash")
+
+        return True
+
+    def update_worklog(self, worklog: WorkLog) -> bool:
+        with self._lock:
+            self.calls.append(("update", worklog.master_id))
+
+        return True
+
+    def move_worklog(self, worklog: WorkLog) -> bool:
+        with self._lock:
+            self.calls.append(("move", worklog.master_id))
+
+        if not worklog.key.startswith("OTHER"):
+            return True
+
+        # Tempo doesn't move worklog to issue of another project by update
+        if not self.delete_worklog(worklog):
+            return False
+
+        worklog.second_id = None
+
+        return self.add_worklog(worklog)
+
+    def delete_worklog(self, worklog: WorkLog) -> bool:
+        with self._lock:
+            self.calls.append(("delete", worklog.master_id))
+
+        return True
+
+
+class SyncManager_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.storage = SqliteStorage(Path(self._directory.name).joinpath("test.db"))
+
+        self.sync_manager = SyncManager(Config(), self.storage)
+        self.sync_manager.tempo_client = FakeTempoClient()
+
+    def tearDown(self):
+        self.storage.close()
+        self._directory.cleanup()
+
+    def test_sync_impl_should_count_results_and_store_mappings(self):
+        moved = self.create_worklog(3, WorkLogState.Moved, second_id=503)
+        worklogs = [
+            self.create_worklog(1, WorkLogState.New),
+            self.create_worklog(2, WorkLogState.New, key="FAIL-1"),
+            moved,
+            self.create_worklog(4, WorkLogState.Updated, second_id=504),
+            self.create_worklog(5, WorkLogState.Synced, second_id=505),
+        ]
+
+        statuses = []
+        self.sync_manager.changeStatus.connect(statuses.append)
+
+        self.storage.open()
+        self.storage.add(moved)
+        self.sync_manager._sync_impl(SyncPlan.create(date(2020, 10, 29), date(2020, 10, 29), worklogs, self.storage))
+
+        self.assertEqual("Result: added 1/5, updated 2/5, skipped 1/5, failed: 1/5.", statuses[-1])
+
+        calls = self.sync_manager.tempo_client.calls
+        self.assertIn(("move", 3), calls)
+        self.assertNotIn(("delete", 3), calls)
+
+        mapping = self.storage.get_second_ids([1, 2, 3])
+        self.assertEqual({1, 3}, set(mapping.keys()))
+        self.assertEqual(503, mapping[3])
+        self.assertEqual(moved.fingerprint, self.storage.get_fingerprints([3])[3])
+
+    def test_sync_impl_should_replace_mapping_of_worklog_moved_by_delete_and_add(self):
+        moved = self.create_worklog(3, WorkLogState.Moved, key="OTHER-3", second_id=503)
+
+        self.storage.open()
+        self.storage.add(moved)
+        self.sync_manager._sync_impl(SyncPlan.create(date(2020, 10, 29), date(2020, 10, 29), [moved], self.storage))
+
+        calls = self.sync_manager.tempo_client.calls
+        self.assertLess(calls.index(("delete", 3)), calls.index(("add", 3)))
+        self.assertEqual({3: 1001}, self.storage.get_second_ids([3]))
+        self.assertIsNone(self.storage.get_master_id(503))
+
+    def test_sync_impl_should_complete_operations_of_the_same_id_in_different_workspaces(self):
+        worklogs = [
+            self.create_worklog(1, WorkLogState.New, workspace_id=10),
+            self.create_worklog(1, WorkLogState.New, workspace_id=20),
+        ]
+
+        self.storage.open()
+        self.sync_manager._sync_impl(SyncPlan.create(date(2020, 10, 29), date(2020, 10, 29), worklogs, self.storage))
+
+        self.assertEqual([], self.storage.get_pending_operations())
+        self.assertEqual({(10, 1): 1001, (20, 1): 1002},
+                         self.storage.get_qualified_second_ids([(10, 1), (20, 1)]))
+
+    def test_sync_should_show_toggl_worklogs_page_by_page(self):
+        synced = self.create_worklog(1, WorkLogState.Unknown)
+        tempo = self.create_worklog(1, WorkLogState.Unknown, second_id=501)
+        pages = [[synced], [self.create_worklog(2, WorkLogState.Unknown)]]
+
+        self.sync_manager.toggl_client = FakeTogglClient(pages)
+        self.sync_manager.tempo_client = FakeTempoClient([tempo])
+
+        self.storage.open()
+        self.storage.add(tempo)
+        self.storage.close()
+
+        batches = []
+        self.sync_manager.appendWorklogList.connect(batches.append)
+
+        result = self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        self.assertTrue(result)
+        self.assertEqual(pages, batches)
+        self.assertEqual(WorkLogState.Synced, synced.state)
+        self.assertEqual(WorkLogState.New, pages[1][0].state)
+
+    def test_sync_should_request_only_changed_tempo_worklogs_of_mirrored_days(self):
+        self.sync_manager.toggl_client = FakeTogglClient([[]])
+        tempo_client = FakeTempoClient([self.create_worklog(1, WorkLogState.Unknown, second_id=501)])
+        self.sync_manager.tempo_client = tempo_client
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 30), only_load=True)
+        tempo_client.worklogs = []
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 30), only_load=True)
+
+        revalidated_on = datetime.now(timezone.utc).astimezone(get_local_zone()).date()
+        self.assertEqual([("get", None), ("get", revalidated_on - timedelta(days=1))], tempo_client.calls)
+
+        self.storage.open()
+        mirrored_worklogs, _ = self.storage.get_mirrored_worklogs("account", date(2020, 10, 29), date(2020, 10, 30))
+        self.assertEqual([501], [x.second_id for x in mirrored_worklogs])
+
+    def test_sync_should_not_apply_plan_made_from_worklogs_deleted_in_tempo(self):
+        tempo = self.create_worklog(1, WorkLogState.Unknown, second_id=501)
+        toggl_client = FakeTogglClient([[]])
+        tempo_client = FakeTempoClient([tempo])
+        self.sync_manager.toggl_client = toggl_client
+        self.sync_manager.tempo_client = tempo_client
+
+        self.storage.open()
+        self.storage.add(tempo)
+        self.storage.close()
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        # Worklog is deleted in Tempo, while its Toggl entry is changed
+        tempo_client.worklogs = []
+        toggl = self.create_worklog(1, WorkLogState.Unknown)
+        toggl.description = "Review"
+        toggl_client.pages = [[toggl]]
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+        self.assertEqual(WorkLogState.Updated, toggl.state)
+
+        result = self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=False)
+
+        self.assertFalse(result)
+        self.assertNotIn(("update", 1), tempo_client.calls)
+        self.assertEqual([None, None], [x[1] for x in tempo_client.calls if x[0] == "get"][-2:])
+
+    def test_sync_should_restore_mapping_of_interrupted_add(self):
+        crashed = self.create_worklog(1, WorkLogState.New, key="CRASH-1")
+
+        self.storage.open()
+        with self.assertRaises(RuntimeError):
+            self.sync_manager._sync_impl(SyncPlan.create(date(2020, 10, 29), date(2020, 10, 29), [crashed],
+                                                         self.storage))
+        self.storage.close()
+
+        toggl = self.create_worklog(1, WorkLogState.Unknown, key="CRASH-1")
+        self.sync_manager.toggl_client = FakeTogglClient([[toggl]])
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        self.assertEqual(WorkLogState.Synced, toggl.state)
+        self.assertEqual(1001, toggl.second_id)
+
+    def test_load_from_mirror_should_keep_interrupted_operations_until_full_reload(self):
+        tempo = self.create_worklog(2, WorkLogState.Unknown, second_id=502)
+        toggl_client = FakeTogglClient([[]])
+        tempo_client = FakeTempoClient([tempo])
+        self.sync_manager.toggl_client = toggl_client
+        self.sync_manager.tempo_client = tempo_client
+
+        self.storage.open()
+        self.storage.add(tempo)
+        self.storage.close()
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        # Move is interrupted after Tempo worklog was deleted
+        moved = self.create_worklog(2, WorkLogState.Moved, key="OTHER-2", second_id=502)
+        self.storage.open()
+        SyncJournal(self.storage).begin([moved])
+        self.storage.close()
+        tempo_client.worklogs = []
+
+        toggl = self.create_worklog(2, WorkLogState.Unknown, key="OTHER-2")
+        toggl_client.pages = [[toggl]]
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        self.storage.open()
+        self.assertEqual(1, len(self.storage.get_pending_operations()))
+        self.assertEqual(502, self.storage.get_second_id(2))
+        self.storage.close()
+
+        result = self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=False)
+
+        self.assertTrue(result)
+        self.assertIn(("add", 2), tempo_client.calls)
+        self.storage.open()
+        self.assertEqual([], self.storage.get_pending_operations())
+        self.assertEqual(1001, self.storage.get_second_id(2))
+
+    def test_sync_of_other_dates_should_keep_interrupted_operations(self):
+        crashed = self.create_worklog(1, WorkLogState.New, key="CRASH-1")
+        moved = self.create_worklog(2, WorkLogState.Moved, second_id=502)
+
+        self.storage.open()
+        self.storage.add(moved)
+        SyncJournal(self.storage).begin([moved])
+        with self.assertRaises(RuntimeError):
+            self.sync_manager._sync_impl(SyncPlan.create(date(2020, 10, 29), date(2020, 10, 29), [crashed],
+                                                         self.storage))
+        self.storage.close()
+
+        self.sync_manager.toggl_client = FakeTogglClient([[]])
+        self.sync_manager.sync(date(2020, 10, 30), date(2020, 10, 30), only_load=True)
+
+        self.storage.open()
+        self.assertEqual(2, len(self.storage.get_pending_operations()))
+        self.assertEqual(502, self.storage.get_second_id(2))
+        self.storage.close()
+
+        toggl = self.create_worklog(1, WorkLogState.Unknown, key="CRASH-1")
+        self.sync_manager.toggl_client = FakeTogglClient([[toggl]])
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        self.assertEqual(WorkLogState.Synced, toggl.state)
+        self.assertEqual(1001, toggl.second_id)
+
+    def test_sync_after_load_should_apply_cached_plan_without_loading(self):
+        toggl_client = FakeTogglClient([[self.create_worklog(1, WorkLogState.Unknown)]])
+        self.sync_manager.toggl_client = toggl_client
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+        toggl_client.pages = []
+        result = self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=False)
+
+        self.assertTrue(result)
+        self.assertIn(("add", 1), self.sync_manager.tempo_client.calls)
+        self.assertIsNone(self.sync_manager.last_plan)
+
+    def test_apply_of_outdated_plan_should_fail(self):
+        self.sync_manager.toggl_client = FakeTogglClient([[self.create_worklog(1, WorkLogState.Unknown)]])
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+        plan = SyncPlan.from_json(self.sync_manager.last_plan.to_json())
+
+        self.assertTrue(self.sync_manager.apply(plan))
+        self.assertFalse(self.sync_manager.apply(plan))
+        self.assertEqual(1, self.sync_manager.tempo_client.calls.count(("add", 1)))
+
+    def test_count_worklog_states_should_reconcile_batches(self):
+        tempo = self.create_worklog(1, WorkLogState.Unknown, second_id=501)
+        self.sync_manager.toggl_client = FakeTogglClient([[self.create_worklog(1, WorkLogState.Unknown)],
+                                                          [self.create_worklog(2, WorkLogState.Unknown)]])
+        self.sync_manager.tempo_client = FakeTempoClient([tempo])
+
+        self.storage.open()
+        self.storage.add(tempo)
+        self.storage.close()
+
+        counters = self.sync_manager.count_worklog_states(date(2020, 10, 29), date(2020, 10, 29))
+
+        self.assertEqual(1, counters[WorkLogState.Synced])
+        self.assertEqual(1, counters[WorkLogState.New])
+
+    def test_sync_should_assign_legacy_mappings_to_primary_workspace(self):
+        legacy = self.create_worklog(1, WorkLogState.Unknown, second_id=501)
+        other_workspace = self.create_worklog(2, WorkLogState.Unknown, second_id=502, workspace_id=30)
+        toggl = self.create_worklog(1, WorkLogState.Unknown, workspace_id=10)
+        other = self.create_worklog(2, WorkLogState.Unknown, workspace_id=20)
+        self.sync_manager.toggl_client = FakeTogglClient([[toggl, other]], primary_workspace_id=10)
+        self.sync_manager.tempo_client = FakeTempoClient([legacy, other_workspace])
+
+        self.storage.open()
+        self.storage.add(legacy)
+        self.storage.add(other_workspace)
+        self.storage.close()
+
+        self.sync_manager.sync(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        self.assertEqual(WorkLogState.Synced, toggl.state)
+        self.assertEqual(WorkLogState.New, other.state)
+
+    @staticmethod
+    def create_worklog(master_id: int, state: WorkLogState, key: str = None, second_id: int = None,
+                       workspace_id: int = None) -> WorkLog:
+        wl = WorkLog()
+        wl.state = state
+        wl.workspace_id = workspace_id
+        wl.master_id = master_id
+        wl.second_id = second_id
+        wl.key = key or "TEST-{0}".format(master_id)
+        wl.project = "Development"
+        wl.activity = "Development"
+        wl.description = "Development"
+        wl.startTime = datetime(2020, 10, 29, 9, 0) + timedelta(hours=master_id)
+        wl.endTime = wl.startTime + timedelta(minutes=15)
+        wl.duration = 15 * 60
+        wl.tags = []
+
+        return wl
+
+
+if __name__ == '__main__':
+    unittest.main()
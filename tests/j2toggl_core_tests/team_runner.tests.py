@@ -0,0 +1,124 @@
+import json
+import tempfile
+import threading
+import unittest
+
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from j2toggl_core.team_runner import TeamSyncRunner, TeamSyncSummary, UserSyncResult
+
+
+class UnauthorizedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(401)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TeamSyncRunner_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = Path(self._directory.name)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), UnauthorizedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.jira_host = "http://127.0.0.1:{0}".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._directory.cleanup()
+
+    def test_load_should_resolve_profile_paths_relative_to_team_file(self):
+        team_file_path = self.write_team_file({
+            "maxProcesses": 2,
+            "hostLimits": {"api.tempo.io": 3},
+            "users": [
+                {"name": "alice", "directory": "alice"},
+                {"name": "bob", "directory": "bob", "database": "shared/bob.db"},
+            ]
+        })
+
+        runner = TeamSyncRunner.load(team_file_path)
+
+        self.assertEqual(2, runner.max_processes)
+        self.assertEqual(["alice", "bob"], [x.name for x in runner.profiles])
+        self.assertEqual(self.path.joinpath("alice", "toggl-sync.db"), runner.profiles[0].database_path)
+        self.assertEqual(self.path.joinpath("shared", "bob.db"), runner.profiles[1].database_path)
+        self.assertEqual(3, runner._get_host_limits()["api.tempo.io"])
+
+    def test_run_should_sync_every_user_and_report_failures(self):
+        self.write_user_config("alice")
+        self.write_user_config("bob")
+        team_file_path = self.write_team_file({
+            "users": [
+                {"name": "alice", "directory": "alice"},
+                {"name": "bob", "directory": "bob"},
+                {"name": "carol", "directory": "carol"},
+            ]
+        })
+
+        runner = TeamSyncRunner.load(team_file_path)
+        summary = runner.run(date(2020, 10, 29), date(2020, 10, 29))
+
+        self.assertEqual(["alice", "bob", "carol"], [x.name for x in summary.results])
+        self.assertEqual(0, summary.succeeded_count)
+        self.assertIn("Toggl authentication failed", summary.results[0].error)
+        self.assertIn("does not exist", summary.results[2].error)
+        self.assertIn("127.0.0.1", runner._get_host_limits())
+
+    def test_run_with_only_load_should_report_failures(self):
+        self.write_user_config("alice")
+        team_file_path = self.write_team_file({
+            "users": [
+                {"name": "alice", "directory": "alice"},
+                {"name": "alice", "directory": "carol"},
+            ]
+        })
+
+        summary = TeamSyncRunner.load(team_file_path).run(date(2020, 10, 29), date(2020, 10, 29), only_load=True)
+
+        self.assertEqual(0, summary.succeeded_count)
+        self.assertIn("Toggl authentication failed", summary.results[0].error)
+        self.assertIn("does not exist", summary.results[1].error)
+
+    def test_summary_should_total_counters_of_users(self):
+        alice = UserSyncResult("alice")
+        alice.is_succeeded = True
+        alice.counters.update(added=2, skipped=1)
+        bob = UserSyncResult("bob")
+        bob.is_succeeded = True
+        bob.counters.update(added=1, failed=1)
+
+        summary = TeamSyncSummary([alice, bob], 1.0)
+
+        self.assertEqual({"added": 3, "updated": 0, "skipped": 1, "failed": 1}, summary.totals)
+        self.assertEqual(2, summary.succeeded_count)
+        self.assertEqual(["Total", "2/2", "3", "0", "1", "1"], summary.format().splitlines()[-1].split()[:6])
+
+    def write_team_file(self, data: dict) -> Path:
+        team_file_path = self.path.joinpath("team.json")
+        team_file_path.write_text(json.dumps(data))
+
+        return team_file_path
+
+    def write_user_config(self, name: str):
+        directory = self.path.joinpath(name)
+        directory.mkdir()
+        directory.joinpath("app-config.json").write_text(json.dumps({
+            "application": {"firstDateOfWeek": 1},
+            "jira": {"host": self.jira_host, "user": name, "token": "jira_token"},
+            "tempo": {"token": "tempo_token", "pageSize": 100},
+            # Toggl token is empty, so login fails without requests
+            "toggl": {"user_agent": name, "token": ""}
+        }))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import requests
+from loguru import logger
+from parameterized import parameterized
+
+from j2toggl_core.configuration.config import Config
+from j2toggl_core.configuration.jira_config import JiraConfig
+from j2toggl_core.configuration.tempo_config import TempoConfig
+from j2toggl_core.exceptions.SyncException import SyncException
+from j2toggl_core.jira_api_client import JiraUser
+from j2toggl_core.storage.sqlite_storage import SqliteStorage
+from j2toggl_core.sync_manager import SyncManager
+from j2toggl_core.sync_plan import SyncPlan
+from j2toggl_core.tempo_api_client import TempoClient
+from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_state import WorkLogState
+
+
+class StubTransport:
+    """
+    Answers requests of HttpTransport interface by statuses queued for every method.
+    """
+
+    def __init__(self, statuses: dict):
+        self.statuses = {method: list(values) for method, values in statuses.items()}
+        self.requests = []
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        self.requests.append(method)
+
+        status = self.statuses[method].pop(0)
+        if isinstance(status, Exception):
+            raise status
+
+        r = requests.Response()
+        r.status_code = status
+        r.url = url
+        r._content = json.dumps({"tempoWorklogId": 2001}).encode() if status == 200 else b"error"
+
+        return r
+
+
+class PagedTransport:
+    """
+    Answers requests of worklogs pages like Tempo: pages after the last one are empty.
+    """
+
+    def __init__(self, worklogs_count: int, failed_offset: int = None):
+        self.worklogs_count = worklogs_count
+        self.failed_offset = failed_offset
+        self.offsets = []
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        offset, limit = params["offset"], params["limit"]
+        with self._lock:
+            self.offsets.append(offset)
+
+        # The later page is answered sooner, so pages arrive out of order
+        time.sleep(0.02 / (1 + offset // limit))
+
+        r = requests.Response()
+        r.url = url
+        if offset == self.failed_offset:
+            r.status_code = 500
+            r._content = b"error"
+            return r
+
+        ids = range(offset, min(offset + limit, self.worklogs_count))
+        metadata = {"count": len(ids), "offset": offset, "limit": limit}
+        if offset + limit < self.worklogs_count:
+            metadata["next"] = f"{url}?offset={offset + limit}"
+
+        r.status_code = 200
+        r._content = json.dumps({"metadata": metadata, "results": [self.make_record(x) for x in ids]}).encode()
+
+        return r
+
+    @staticmethod
+    def make_record(tempo_id: int) -> dict:
+        return {"tempoWorklogId": tempo_id, "issue": {"key": "TEST-1"}, "description": "Development",
+                "timeSpentSeconds": 900, "startDate": "2020-10-29", "startTime": "09:00:00", "attributes": None}
+
+
+class TempoClientPages_Tests(unittest.TestCase):
+
+    @parameterized.expand([("one_page", 2, 1), ("full_pages", 10, 5), ("last_page_incomplete", 11, 6)])
+    def test_iter_worklogs_should_yield_pages_in_offset_order_until_next_is_missing(self, _, worklogs_count: int,
+                                                                                    pages_count: int):
+        transport = PagedTransport(worklogs_count)
+        client = self.create_client(transport)
+
+        pages = list(client.iter_worklogs(datetime(2020, 10, 29), datetime(2020, 10, 30)))
+
+        self.assertEqual(pages_count, len(pages))
+        self.assertEqual(list(range(worklogs_count)), [x.second_id for page in pages for x in page])
+        # Pages requested ahead of the last one are dropped
+        self.assertLessEqual(len(transport.offsets), pages_count + TempoClient._MAX_CONCURRENT_PAGES)
+        self.assertEqual(sorted(set(transport.offsets)), sorted(transport.offsets))
+
+    def test_get_worklogs_batch_should_keep_offset_order(self):
+        client = self.create_client(PagedTransport(11))
+
+        batch = client.get_worklogs_batch(datetime(2020, 10, 29), datetime(2020, 10, 30))
+
+        self.assertEqual(list(range(11)), [x.second_id for x in batch.to_worklogs()])
+
+    def test_failed_page_requested_ahead_should_fail_iteration(self):
+        transport = PagedTransport(20, failed_offset=6)
+        client = self.create_client(transport)
+
+        pages = []
+        with self.assertRaises(SyncException):
+            for page in client.iter_worklogs(datetime(2020, 10, 29), datetime(2020, 10, 30)):
+                pages.append(page)
+
+        self.assertEqual([[0, 1], [2, 3], [4, 5]], [[x.second_id for x in page] for page in pages])
+
+    @staticmethod
+    def create_client(transport: PagedTransport) -> TempoClient:
+        config = TempoConfig()
+        config.page_size = 2
+
+        client = TempoClient(JiraConfig(), config, transport)
+        client._user = JiraUser("account", "name", "email")
+
+        return client
+
+
+class TempoClientMove_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.errors = []
+        self._sink_id = logger.add(self.errors.append, level="ERROR", format="{message}")
+
+    def tearDown(self):
+        logger.remove(self._sink_id)
+
+    def test_move_accepted_by_update_should_keep_worklog(self):
+        transport = StubTransport({"PUT": [200]})
+        worklog = self.create_worklog()
+
+        self.assertTrue(self.create_client(transport).move_worklog(worklog))
+
+        self.assertEqual(["PUT"], transport.requests)
+        self.assertEqual(2001, worklog.second_id)
+        self.assertEqual([], self.errors)
+
+    @parameterized.expand([("bad_request", 400), ("method_not_allowed", 405)])
+    def test_move_rejected_by_update_should_delete_and_add_worklog(self, _, status: int):
+        transport = StubTransport({"PUT": [status], "DELETE": [204], "POST": [200]})
+        worklog = self.create_worklog()
+
+        self.assertTrue(self.create_client(transport).move_worklog(worklog))
+
+        self.assertEqual(["PUT", "DELETE", "POST"], transport.requests)
+        self.assertEqual(2001, worklog.second_id)
+        self.assertEqual([], self.errors)
+
+    def test_move_failed_by_other_status_should_not_delete_worklog(self):
+        transport = StubTransport({"PUT": [500]})
+        worklog = self.create_worklog()
+
+        self.assertFalse(self.create_client(transport).move_worklog(worklog))
+
+        self.assertEqual(["PUT"], transport.requests)
+        self.assertEqual(1001, worklog.second_id)
+        self.assertEqual(1, len(self.errors))
+        self.assertIn("move_worklog", self.errors[0])
+
+    def test_move_with_failed_delete_should_keep_worklog(self):
+        transport = StubTransport({"PUT": [400], "DELETE": [500]})
+        worklog = self.create_worklog()
+
+        self.assertFalse(self.create_client(transport).move_worklog(worklog))
+
+        self.assertEqual(["PUT", "DELETE"], transport.requests)
+        self.assertEqual(1001, worklog.second_id)
+        self.assertIn("delete_worklog", self.errors[0])
+
+    @parameterized.expand([("failed", 500), ("interrupted", requests.ConnectionError())])
+    def test_move_with_failed_add_after_delete_should_drop_tempo_id(self, _, status):
+        transport = StubTransport({"PUT": [400], "DELETE": [204], "POST": [status]})
+        worklog = self.create_worklog()
+
+        self.assertFalse(self.create_client(transport).move_worklog(worklog))
+
+        self.assertEqual(["PUT", "DELETE", "POST"], transport.requests)
+        self.assertIsNone(worklog.second_id)
+        self.assertEqual(1, len(self.errors))
+
+    def test_sync_of_move_with_failed_add_after_delete_should_leave_worklog_to_add_again(self):
+        with tempfile.TemporaryDirectory() as directory:
+            storage = SqliteStorage(Path(directory).joinpath("test.db"))
+            sync_manager = SyncManager(Config(), storage)
+            sync_manager.tempo_client = self.create_client(
+                StubTransport({"PUT": [400], "DELETE": [204], "POST": [requests.ConnectionError()]}))
+
+            storage.open()
+            try:
+                worklog = self.create_worklog()
+                storage.add(worklog)
+
+                sync_manager._sync_impl(SyncPlan.create(date(2020, 10, 29), date(2020, 10, 29), [worklog], storage))
+
+                self.assertEqual(1, sync_manager.last_counters["failed"])
+                # Without mapping the worklog is reconciled as a new one
+                self.assertEqual({}, storage.get_second_ids([1]))
+                self.assertIsNone(storage.get_master_id(1001))
+                self.assertEqual([], storage.get_pending_operations())
+            finally:
+                storage.close()
+
+    @staticmethod
+    def create_client(transport: StubTransport) -> TempoClient:
+        client = TempoClient(JiraConfig(), TempoConfig(), transport)
+        client._user = JiraUser("account", "name", "email")
+
+        return client
+
+    @staticmethod
+    def create_worklog() -> WorkLog:
+        wl = WorkLog()
+        wl.state = WorkLogState.Moved
+        wl.master_id = 1
+        wl.second_id = 1001
+        wl.key = "OTHER-1"
+        wl.activity = "Development"
+        wl.description = "Development"
+        wl.startTime = datetime(2020, 10, 29, 9, 0)
+        wl.endTime = wl.startTime + timedelta(minutes=15)
+        wl.duration = 15 * 60
+
+        return wl
+
+
+if __name__ == '__main__':
+    unittest.main()
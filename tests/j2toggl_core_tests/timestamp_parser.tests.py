@@ -0,0 +1,43 @@
+import unittest
+
+from datetime import datetime, timedelta, timezone
+
+import dateutil.parser
+from parameterized import parameterized
+
+from j2toggl_core.utils.timestamp_parser import parse_date_and_time, parse_timestamp
+
+
+class TimestampParser_Tests(unittest.TestCase):
+
+    @parameterized.expand([
+        ("2020-10-29T17:15:00", ),
+        ("2020-10-29T17:15:00+03:00", ),
+        ("2020-10-29T17:15:00-05:30", ),
+        ("2020-10-29T17:15:00Z", ),
+        ("2020-10-29T17:15:00.123456+03:00", ),
+        ("2020-10-29T17:15:00.123Z", ),
+        ("2020-10-29T17:15:00+0300", ),
+        ("2020-10-29 17:15", ),
+    ])
+    def test_parse_timestamp_should_return_the_same_as_dateutil(self, value: str):
+        expected = dateutil.parser.parse(value)
+
+        result = parse_timestamp(value)
+
+        self.assertEqual(expected, result)
+        self.assertEqual(expected.utcoffset(), result.utcoffset())
+
+    def test_parse_timestamp_should_reuse_offsets(self):
+        first = parse_timestamp("2020-10-29T17:15:00+03:00")
+        second = parse_timestamp("2020-10-30T09:00:00+03:00")
+
+        self.assertIs(first.tzinfo, second.tzinfo)
+        self.assertEqual(timezone(timedelta(hours=3)), first.tzinfo)
+
+    def test_parse_date_and_time_should_join_tempo_fields(self):
+        self.assertEqual(datetime(2020, 10, 29, 17, 15), parse_date_and_time("2020-10-29", "17:15:00"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,17 @@
+import threading
+import time
 import unittest
 
 from datetime import datetime
 from parameterized import parameterized
 
+import requests
+
 from j2toggl_core.configuration.toggl_config import TogglConfig
+from j2toggl_core.exceptions.SyncException import SyncException
 from j2toggl_core.toggl_api_client import TogglClient
 from j2toggl_core.worklog import WorkLog
+from j2toggl_core.worklog_batch import WorkLogBatch
 
 
 class TogglClient_Tests(unittest.TestCase):
@@ -22,6 +28,149 @@ class TogglClient_Tests(unittest.TestCase):
 
         self.assertIsNone(worklog.key, "worklog key should be null.")
 
+    def test_fill_batch_from_report_page_should_give_the_same_worklogs_as_parse_report_record(self):
+        client = TogglClient(TogglConfig())
+        records = [
+            {"id": 1, "project": "Development", "description": "TEST-1. Development", "tags": [],
+             "start": "2020-10-29T17:15:00+03:00", "end": "2020-10-29T17:30:00+03:00", "dur": 900000},
+            {"id": 2, "project": None, "description": "Call", "tags": ["key_TEST-2"],
+             "start": "2020-10-29T18:00:00+03:00", "end": "2020-10-29T19:00:00+03:00", "dur": 3600000},
+        ]
+
+        batch = WorkLogBatch()
+        client._fill_batch_from_report_page(records, batch)
+
+        expected = [client._parse_report_record(tr) for tr in records]
+        actual = batch.to_worklogs()
+        self.assertEqual([(x.master_id, x.key, x.activity, x.project, x.description, x.startTime, x.duration)
+                          for x in expected],
+                         [(x.master_id, x.key, x.activity, x.project, x.description, x.startTime, x.duration)
+                          for x in actual])
+
+    @parameterized.expand([
+        (None, [10, 20, 30]),
+        ([30, 10], [30, 10]),
+        ([20, 40], [20]),
+    ])
+    def test_select_workspaces_should_keep_configured_available_workspaces(self, configured, expected):
+        config = TogglConfig()
+        config.workspaces = configured
+        client = TogglClient(config)
+
+        self.assertTrue(client._select_workspaces([{"id": 10}, {"id": 20}, {"id": 30}]))
+        self.assertEqual(expected, client._workspace_ids)
+        self.assertEqual(10, client.primary_workspace_id)
+
+    def test_select_workspaces_without_available_configured_workspace_should_fail(self):
+        config = TogglConfig()
+        config.workspaces = [40]
+        client = TogglClient(config)
+
+        self.assertFalse(client._select_workspaces([{"id": 10}]))
+
+    def test_detailed_report_should_merge_pages_of_all_workspaces(self):
+        client = TogglClient(TogglConfig())
+        client._select_workspaces([{"id": 10}, {"id": 20}])
+
+        def get_report_page(workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+            records = [{"id": workspace_id * 100 + page_number, "project": "Development",
+                        "description": "TEST-1. Development", "tags": [],
+                        "start": "2020-10-29T17:15:00+03:00", "end": "2020-10-29T17:30:00+03:00", "dur": 900000}]
+
+            return {"total_count": 2 if workspace_id == 10 else 1, "per_page": 1, "data": records}
+
+        client._get_report_page = get_report_page
+
+        worklogs = client.get_detailed_report(datetime(2020, 10, 29))
+        batch = client.get_detailed_report_batch(datetime(2020, 10, 29))
+
+        self.assertEqual([(10, 1001), (10, 1002), (20, 2001)],
+                         sorted((x.workspace_id, x.master_id) for x in worklogs))
+        self.assertEqual([(10, 1001), (10, 1002), (20, 2001)],
+                         sorted((x.workspace_id, x.master_id) for x in batch.to_worklogs()))
+
+    def test_detailed_report_should_fail_if_report_of_any_workspace_fails(self):
+        client = TogglClient(TogglConfig())
+        client._select_workspaces([{"id": 10}, {"id": 20}])
+
+        def get_report_page(workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+            if workspace_id == 20:
+                raise ConnectionError()
+
+            return {"total_count": 0, "per_page": 50, "data": []}
+
+        client._get_report_page = get_report_page
+
+        with self.assertRaises(ConnectionError):
+            client.get_detailed_report(datetime(2020, 10, 29))
+
+    def test_report_page_with_error_status_should_raise(self):
+        class ErrorTransport:
+            def get(self, url: str, **kwargs) -> requests.Response:
+                r = requests.Response()
+                r.status_code = 500
+                r.url = url
+                r._content = b"Internal Server Error"
+
+                return r
+
+        client = TogglClient(TogglConfig(), ErrorTransport())
+        client._select_workspaces([{"id": 10}])
+
+        with self.assertRaises(SyncException):
+            client.get_detailed_report(datetime(2020, 10, 29))
+
+    def test_detailed_report_should_keep_order_of_pages_of_every_workspace(self):
+        client = TogglClient(TogglConfig())
+        client._select_workspaces([{"id": 10}, {"id": 20}])
+
+        pages_counts = {10: 9, 20: 5}
+
+        def get_report_page(workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+            # The later page is answered sooner
+            time.sleep(0.002 * (pages_counts[workspace_id] - page_number))
+            records = [{"id": workspace_id * 100 + page_number, "project": "Development",
+                        "description": "TEST-1. Development", "tags": [],
+                        "start": "2020-10-29T17:15:00+03:00", "end": "2020-10-29T17:30:00+03:00", "dur": 900000}]
+
+            return {"total_count": pages_counts[workspace_id], "per_page": 1, "data": records}
+
+        client._get_report_page = get_report_page
+
+        worklogs = client.get_detailed_report(datetime(2020, 10, 29))
+
+        for workspace_id, pages_count in pages_counts.items():
+            self.assertEqual([workspace_id * 100 + x for x in range(1, pages_count + 1)],
+                             [x.master_id for x in worklogs if x.workspace_id == workspace_id])
+
+    def test_failed_page_in_the_middle_of_report_should_stop_loading_of_other_workspaces(self):
+        client = TogglClient(TogglConfig())
+        client._select_workspaces([{"id": 10}, {"id": 20}])
+
+        lock = threading.Lock()
+        requested_pages = {10: [], 20: []}
+
+        def get_report_page(workspace_id: int, since: datetime, until: datetime, page_number: int) -> dict:
+            with lock:
+                requested_pages[workspace_id].append(page_number)
+
+            if workspace_id == 20 and page_number == 2:
+                raise SyncException("Page failed")
+
+            time.sleep(0.01 if workspace_id == 10 else 0)
+
+            return {"total_count": 40 if workspace_id == 10 else 3, "per_page": 1, "data": []}
+
+        client._get_report_page = get_report_page
+
+        loaded_pages = []
+        with self.assertRaises(SyncException):
+            for page in client.iter_detailed_report(datetime(2020, 10, 29)):
+                loaded_pages.append(page)
+
+        self.assertTrue(loaded_pages)
+        self.assertLess(len(requested_pages[10]), 40)
+
     def create_default_worklog(self) -> WorkLog:
         wl = WorkLog()
         wl.master_id = 100
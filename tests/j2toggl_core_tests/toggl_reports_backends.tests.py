@@ -0,0 +1,172 @@
+import json
+import threading
+import unittest
+
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from j2toggl_core.configuration.toggl_config import TogglConfig
+from j2toggl_core.net.http_transport import HttpTransport
+from j2toggl_core.net.request_scheduler import RequestScheduler
+from j2toggl_core.toggl_api_client import TogglClient, TogglReportsV3Client, create_toggl_client
+
+WORKSPACE_ID = 10
+PROJECTS = [{"id": 1, "name": "Development"}, {"id": 2, "name": "Meetings"}]
+TAGS = [{"id": 5, "name": "key_TEST-7"}, {"id": 6, "name": "billable"}]
+
+# Rows of Reports API v3, the same time entries are reported by Reports API v2 one by one
+ROWS = [
+    {"project_id": 1, "description": "TEST-1. Development", "tag_ids": [], "time_entries": [
+        {"id": 1001, "start": "2020-10-29T09:00:00+03:00", "stop": "2020-10-29T10:00:00+03:00", "seconds": 3600},
+        {"id": 1002, "start": "2020-10-30T11:00:00+03:00", "stop": "2020-10-30T11:30:00+03:00", "seconds": 1800},
+    ]},
+    {"project_id": 2, "description": "Daily", "tag_ids": [5], "time_entries": [
+        {"id": 1003, "start": "2020-10-29T12:00:00+03:00", "stop": "2020-10-29T12:15:00+03:00", "seconds": 900},
+    ]},
+    {"project_id": None, "description": "TEST-3. Miscellaneous", "tag_ids": None, "time_entries": [
+        {"id": 1004, "start": "2020-10-29T13:00:00+03:00", "stop": "2020-10-29T13:20:00+03:00", "seconds": 1200},
+    ]},
+    {"project_id": 1, "description": "TEST-4. Review", "tag_ids": [6], "time_entries": [
+        {"id": 1005, "start": "2020-10-30T14:00:00+03:00", "stop": "2020-10-30T15:00:00+03:00", "seconds": 3600},
+        {"id": 1006, "start": "2020-10-30T15:10:00+03:00", "stop": "2020-10-30T15:40:00+03:00", "seconds": 1800},
+    ]},
+]
+
+V2_PAGE_SIZE = 2
+
+
+def make_v2_records() -> list:
+    projects = {x["id"]: x["name"] for x in PROJECTS}
+    tags = {x["id"]: x["name"] for x in TAGS}
+
+    return [{"id": te["id"], "project": projects.get(row["project_id"]), "description": row["description"],
+             "tags": [tags[x] for x in row["tag_ids"] or ()], "start": te["start"], "end": te["stop"],
+             "dur": te["seconds"] * 1000}
+            for row in ROWS for te in row["time_entries"]]
+
+
+class FakeTogglHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        self.server.requests.append(("GET", url.path))
+
+        if url.path == "/api/v9/workspaces":
+            self.send_json([{"id": WORKSPACE_ID}])
+        elif url.path == f"/api/v9/workspaces/{WORKSPACE_ID}/projects":
+            self.send_json(PROJECTS if params["page"] == ["1"] else [])
+        elif url.path == f"/api/v9/workspaces/{WORKSPACE_ID}/tags":
+            self.send_json(TAGS)
+        elif url.path == "/reports/api/v2/details":
+            records = make_v2_records()
+            offset = (int(params["page"][0]) - 1) * V2_PAGE_SIZE
+            self.send_json({"total_count": len(records), "per_page": V2_PAGE_SIZE,
+                            "data": records[offset:offset + V2_PAGE_SIZE]})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(("POST", url.path))
+        self.server.bodies.append(body)
+
+        if url.path != f"/reports/api/v3/workspace/{WORKSPACE_ID}/search/time_entries":
+            self.send_json({"error": "not found"}, status=404)
+            return
+
+        # Row numbers start from 1
+        offset = body.get("first_row_number", 1) - 1
+        rows = ROWS[offset:offset + body["page_size"]]
+
+        headers = {}
+        next_offset = offset + body["page_size"]
+        if next_offset < len(ROWS):
+            headers = {
+                "X-Next-ID": str(ROWS[next_offset]["time_entries"][0]["id"]),
+                "X-Next-Row-Number": str(next_offset + 1),
+                "X-Next-Timestamp": "1604000000",
+            }
+
+        self.send_json([dict(x, row_number=offset + i + 1) for i, x in enumerate(rows)], headers=headers)
+
+    def send_json(self, data, status: int = 200, headers: dict = None):
+        content = json.dumps(data).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TogglReportsBackends_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTogglHandler)
+        self.server.requests = []
+        self.server.bodies = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.transport = HttpTransport(RequestScheduler())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_create_toggl_client_should_select_backend_by_config(self):
+        config = TogglConfig()
+        self.assertIsInstance(create_toggl_client(config), TogglReportsV3Client)
+
+        config.reports_api = TogglConfig.REPORTS_API_V2
+        self.assertIs(TogglClient, type(create_toggl_client(config)))
+
+    def test_both_backends_should_load_the_same_worklogs(self):
+        v2_worklogs = self.load_worklogs(TogglConfig.REPORTS_API_V2)
+        v2_requests = self.count_report_requests()
+        self.server.requests.clear()
+
+        v3_worklogs = self.load_worklogs(TogglConfig.REPORTS_API_V3)
+        v3_requests = self.count_report_requests()
+
+        self.assertEqual(6, len(v2_worklogs))
+        self.assertEqual(v2_worklogs, v3_worklogs)
+        self.assertLess(v3_requests, v2_requests)
+
+    def test_v3_backend_should_continue_pages_by_cursor(self):
+        self.load_worklogs(TogglConfig.REPORTS_API_V3)
+
+        self.assertEqual([None, 3], [x.get("first_row_number") for x in self.server.bodies])
+        self.assertEqual([None, 1004], [x.get("first_id") for x in self.server.bodies])
+        self.assertEqual({"2020-10-29"}, {x["start_date"] for x in self.server.bodies})
+        self.assertEqual({"2020-10-30"}, {x["end_date"] for x in self.server.bodies})
+
+    def load_worklogs(self, reports_api: str) -> list:
+        config = TogglConfig()
+        config.token = "token"
+        config.user_agent = "user@example.com"
+        config.reports_api = reports_api
+        config.page_size = 2
+        config.api_url = "http://127.0.0.1:{0}/".format(self.server.server_address[1])
+
+        client = create_toggl_client(config, self.transport)
+        self.assertTrue(client.login())
+
+        worklogs = client.get_detailed_report(datetime(2020, 10, 29), datetime(2020, 10, 30))
+
+        return sorted((x.workspace_id, x.master_id, x.key, x.activity, x.project, x.description,
+                       x.startTime, x.endTime, x.duration, x.tags)
+                      for x in worklogs)
+
+    def count_report_requests(self) -> int:
+        return sum(1 for _, path in self.server.requests if path.startswith("/reports/"))
+
+
+if __name__ == '__main__':
+    unittest.main()